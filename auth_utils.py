@@ -13,6 +13,7 @@ from database import get_db
 from models import Module, PasswordHistory, PasswordResetToken, Plan, Role, RoleModulePrivilege, User, UserRole, UserSecurity, UserSession
 from security_utils import get_password_hash, verify_password
 from services import user_service
+from services.token_version_service import TokenVersionService
 from utils.common_service import UTCDateTimeMixin
 from utils.email_service import EmailService
 
@@ -97,6 +98,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def build_access_claims(db: Session, user: User) -> dict:
+    """
+    Signed claims embedded in access tokens so the auth middleware can
+    skip the User / UserRole lookups while "pv" is still current.
+    """
+    role_ids = [r.role_id for r in db.query(UserRole.role_id).filter(UserRole.user_id == user.id).all()]
+
+    return {
+        "sub": str(user.id),
+        "roles": role_ids,
+        "active": bool(user.isactive),
+        "plan": str(user.plan_id) if user.plan_id else None,
+        "pv": TokenVersionService.issue_version(db, user.id),
+    }
+
+
 def decode_access_token(token: str):
     """Decode JWT access token."""
     try:
@@ -288,7 +305,7 @@ def login_user(db: Session, email: str, password: str):
  
         # Step 9: Login success
         return {
-            "access_token": create_access_token({"sub": str(user.id)}),
+            "access_token": create_access_token(build_access_claims(db, user)),
             "refresh_token": create_refresh_token(str(user.id)),
             "user": {
                 "id": str(user.id),
@@ -379,7 +396,7 @@ def authenticate_user(db: Session, username: str, password: str, request=None):
     # -----------------------------
     # Create a user session (JWT tracking)
     # -----------------------------
-    access_token = create_access_token({"sub": str(user.id)})
+    access_token = create_access_token(build_access_claims(db, user))
     refresh_token = create_refresh_token(str(user.id))
 
     session = UserSession(
@@ -409,11 +426,33 @@ def authenticate_user(db: Session, username: str, password: str, request=None):
 # ==============================
 from fastapi import Depends, HTTPException, Request, status
 
+def get_token_claims(request: Request, token: str) -> Optional[dict]:
+    """
+    Decode the bearer token once per request. Re-uses the payload the
+    auth middleware already decoded (request.state.token_claims).
+    """
+    payload = getattr(request.state, "token_claims", None)
+    if payload is None:
+        payload = decode_access_token(token)
+        request.state.token_claims = payload
+    return payload
+
+
 def get_current_user(
     request: Request,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
+    """
+    Request-scoped identity: the token is decoded once and the User is
+    loaded at most once per request, no matter how many dependencies
+    (router-level + endpoint-level) ask for it.
+    """
+    # Already resolved earlier in this request
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is not None:
+        return current_user
+
     # Standard credentials exception used on decode/lookup failures
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -422,21 +461,23 @@ def get_current_user(
     )
 
     # Decode JWT
+    payload = get_token_claims(request, token)
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_str = payload.get("sub")
-        if not user_id_str:
-            raise credentials_exception
-        user_id = uuid.UUID(user_id_str)
+        user_id = uuid.UUID(payload.get("sub"))
     except Exception:
         raise credentials_exception
 
-    # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    # Re-use the row the middleware loaded (no SQL), attached to this session
+    user = getattr(request.state, "user", None)
+    if user is not None and user.id == user_id:
+        user = db.merge(user, load=False)
+    else:
+        user = db.query(User).filter(User.id == user_id).first()
+
     if not user:
         raise credentials_exception
 
-    # Allow everything else
+    request.state.current_user = user
     return user
 
 
@@ -0,0 +1,79 @@
+"""
+Count SQL statements issued per authenticated request.
+
+Compares a legacy access token ({"sub"} only → middleware + dependency
+load the User from the DB) with a signed-claims token (roles/pv trusted,
+User loaded once and shared through request.state).
+
+Usage:
+    python bench_auth_queries.py admin@relu.com /users/me /products/1 /zohoquotes/my
+"""
+import sys
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from auth_utils import build_access_claims, create_access_token
+from database import VendorSessionLocal, vendor_engine
+from main import app
+from models import User
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@contextmanager
+def count_statements():
+    counter = StatementCounter()
+    event.listen(vendor_engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(vendor_engine, "before_cursor_execute", counter)
+
+
+def build_tokens(email: str) -> dict:
+    db = VendorSessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        if not user:
+            raise SystemExit(f"User not found: {email}")
+        return {
+            "legacy": create_access_token({"sub": str(user.id)}),
+            "claims": create_access_token(build_access_claims(db, user)),
+        }
+    finally:
+        db.close()
+
+
+def run(email: str, paths: list[str], repeat: int = 3):
+    tokens = build_tokens(email)
+    client = TestClient(app)
+
+    # Warm the privilege / token-version caches
+    for token in tokens.values():
+        for path in paths:
+            client.get(path, headers={"Authorization": f"Bearer {token}"})
+
+    print(f"{'path':40} {'legacy':>8} {'claims':>8}")
+    for path in paths:
+        row = {}
+        for mode, token in tokens.items():
+            with count_statements() as counter:
+                for _ in range(repeat):
+                    client.get(path, headers={"Authorization": f"Bearer {token}"})
+            row[mode] = counter.count / repeat
+        print(f"{path:40} {row['legacy']:>8.1f} {row['claims']:>8.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    run(sys.argv[1], sys.argv[2:])
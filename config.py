@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -37,6 +38,32 @@ POSTGRES_CONFIG = {
 POSTGRES_MIN_SIZE = int(os.getenv("POSTGRES_MIN_SIZE", 1))
 POSTGRES_MAX_SIZE = int(os.getenv("POSTGRES_MAX_SIZE", 10))
 
+# Background ERP sync jobs (/erp/sync_* → /erp/jobs/{id})
+ERP_SYNC_WORKERS = int(os.getenv("ERP_SYNC_WORKERS", 3))
+ERP_SYNC_BATCH_SIZE = int(os.getenv("ERP_SYNC_BATCH_SIZE", 100))
+ERP_SYNC_POLL_SECONDS = float(os.getenv("ERP_SYNC_POLL_SECONDS", 5))
+# A running job without a heartbeat for this long is resumed by another worker
+ERP_SYNC_STALE_SECONDS = int(os.getenv("ERP_SYNC_STALE_SECONDS", 300))
+ERP_SYNC_WAIT_SECONDS = float(os.getenv("ERP_SYNC_WAIT_SECONDS", 300))
+
+# ERP primary keys are reserved in blocks (erp_id_allocations) per process
+ERP_ID_BLOCK_SIZE = int(os.getenv("ERP_ID_BLOCK_SIZE", 50))
+
+# insert_data switches to COPY + staging table from this many rows per table
+ERP_BULK_INSERT_THRESHOLD = int(os.getenv("ERP_BULK_INSERT_THRESHOLD", 500))
+
+# Change outbox (erp_change_outbox): changed users/products are synced
+# every ERP_OUTBOX_POLL_SECONDS (0 = only on request)
+ERP_OUTBOX_POLL_SECONDS = float(os.getenv("ERP_OUTBOX_POLL_SECONDS", 30))
+ERP_OUTBOX_SETTLE_SECONDS = float(os.getenv("ERP_OUTBOX_SETTLE_SECONDS", 5))
+ERP_OUTBOX_BATCH_SIZE = int(os.getenv("ERP_OUTBOX_BATCH_SIZE", 1000))
+
+# Vendor document sync pipeline (DB reader → Mongo uploaders → ERP writer):
+# documents per batch, batches buffered between stages, parallel uploads
+ERP_DOC_SYNC_BATCH_SIZE = int(os.getenv("ERP_DOC_SYNC_BATCH_SIZE", 25))
+ERP_DOC_SYNC_QUEUE_SIZE = int(os.getenv("ERP_DOC_SYNC_QUEUE_SIZE", 4))
+ERP_DOC_SYNC_UPLOADERS = int(os.getenv("ERP_DOC_SYNC_UPLOADERS", 2))
+
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
@@ -96,6 +123,14 @@ OTP_LOCK_DURATION_MIN = int(os.getenv("OTP_LOCK_DURATION_MIN", 15))
 MAX_LOGIN_ATTEMPTS = int(os.getenv("MAX_LOGIN_ATTEMPTS", 5))
 LOGIN_LOCK_DURATION_MIN = int(os.getenv("LOGIN_LOCK_DURATION_MIN", 15))
 
+# Signed-claims access tokens (roles / active / plan / permission version)
+TOKEN_VERSION_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_VERSION_CACHE_TTL_SECONDS", 30))
+
+# Privilege cache (auth middleware); invalidation is per worker, so by
+# default other workers see changes within the token version window
+PRIVILEGE_CACHE_TTL_SECONDS = int(os.getenv("PRIVILEGE_CACHE_TTL_SECONDS", TOKEN_VERSION_CACHE_TTL_SECONDS))
+PRIVILEGE_CACHE_MAX_ENTRIES = int(os.getenv("PRIVILEGE_CACHE_MAX_ENTRIES", 50000))
+
 
 # ==============================
 # PASSWORD & RESET POLICY
@@ -137,6 +172,74 @@ ZOHO_OAUTH_TOKEN_URL = f"{ZOHO_ACCOUNTS_BASE}/oauth/v2/token"
 if not all([ZOHO_CLIENT_ID, ZOHO_CLIENT_SECRET, ZOHO_REFRESH_TOKEN, ZOHO_ORG_ID]):
     raise RuntimeError("Zoho Books environment variables are not fully configured")
 
+# Shared HTTP transport (connection pool + keep-alive)
+ZOHO_HTTP_POOL_SIZE = int(os.getenv("ZOHO_HTTP_POOL_SIZE", 20))
+ZOHO_ASYNC_POOL_SIZE = int(os.getenv("ZOHO_ASYNC_POOL_SIZE", 100))
+ZOHO_CONNECT_TIMEOUT = float(os.getenv("ZOHO_CONNECT_TIMEOUT", 5))
+ZOHO_TIMEOUT = float(os.getenv("ZOHO_TIMEOUT", 15))
+ZOHO_PDF_TIMEOUT = float(os.getenv("ZOHO_PDF_TIMEOUT", 30))
+ZOHO_UPLOAD_TIMEOUT = float(os.getenv("ZOHO_UPLOAD_TIMEOUT", 30))
+ZOHO_OAUTH_TIMEOUT = float(os.getenv("ZOHO_OAUTH_TIMEOUT", 10))
+
+# Client-side rate limit (org quota) and retry on 429 / 5xx
+ZOHO_RATE_LIMIT_PER_MINUTE = float(os.getenv("ZOHO_RATE_LIMIT_PER_MINUTE", 100))
+ZOHO_RATE_LIMIT_BURST = int(os.getenv("ZOHO_RATE_LIMIT_BURST", 10))
+ZOHO_RATE_LIMIT_BULK_RESERVE = int(os.getenv("ZOHO_RATE_LIMIT_BULK_RESERVE", 3))
+ZOHO_MAX_RETRIES = int(os.getenv("ZOHO_MAX_RETRIES", 4))
+ZOHO_BACKOFF_BASE_SECONDS = float(os.getenv("ZOHO_BACKOFF_BASE_SECONDS", 0.5))
+ZOHO_BACKOFF_MAX_SECONDS = float(os.getenv("ZOHO_BACKOFF_MAX_SECONDS", 30))
+
+# OAuth access token: proactive refresh + store shared by all workers
+# (set ZOHO_TOKEN_STORE_PATH="" to keep the token per process)
+ZOHO_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("ZOHO_TOKEN_REFRESH_MARGIN_SECONDS", 300))
+ZOHO_TOKEN_STORE_PATH = os.getenv(
+    "ZOHO_TOKEN_STORE_PATH",
+    os.path.join(tempfile.gettempdir(), "zoho_access_token.json")
+)
+
+# Rendered Zoho PDFs cached on disk, keyed by document version
+# (statements have no version: cached per ZOHO_PDF_STATEMENT_TTL_SECONDS)
+ZOHO_PDF_CACHE_ENABLED = os.getenv("ZOHO_PDF_CACHE_ENABLED", "True").lower() == "true"
+ZOHO_PDF_CACHE_DIR = os.getenv(
+    "ZOHO_PDF_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "zoho_pdf_cache")
+)
+ZOHO_PDF_CACHE_MAX_BYTES = int(os.getenv("ZOHO_PDF_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+ZOHO_PDF_STATEMENT_TTL_SECONDS = int(os.getenv("ZOHO_PDF_STATEMENT_TTL_SECONDS", 900))
+
+# List endpoints: records per page (Zoho maximum is 200)
+ZOHO_PAGE_SIZE = int(os.getenv("ZOHO_PAGE_SIZE", 200))
+
+# Concurrent GET /items/{id} calls when pricing line items
+ZOHO_ITEM_LOOKUP_CONCURRENCY = int(os.getenv("ZOHO_ITEM_LOOKUP_CONCURRENCY", 10))
+
+# Local mirror of the Zoho item catalog (search, rates, taxes)
+ZOHO_ITEM_CATALOG_ENABLED = os.getenv("ZOHO_ITEM_CATALOG_ENABLED", "True").lower() == "true"
+ZOHO_ITEM_CATALOG_REFRESH_SECONDS = float(os.getenv("ZOHO_ITEM_CATALOG_REFRESH_SECONDS", 300))
+ZOHO_ITEM_CATALOG_FULL_REFRESH_SECONDS = float(os.getenv("ZOHO_ITEM_CATALOG_FULL_REFRESH_SECONDS", 21600))
+
+# Document comment threads (portal comment feeds)
+ZOHO_COMMENT_CACHE_TTL_SECONDS = int(os.getenv("ZOHO_COMMENT_CACHE_TTL_SECONDS", 30))
+ZOHO_COMMENT_CACHE_MAX_ENTRIES = int(os.getenv("ZOHO_COMMENT_CACHE_MAX_ENTRIES", 5000))
+ZOHO_COMMENT_FETCH_CONCURRENCY = int(os.getenv("ZOHO_COMMENT_FETCH_CONCURRENCY", 8))
+ZOHO_COMMENT_BULK_MAX_DOCUMENTS = int(os.getenv("ZOHO_COMMENT_BULK_MAX_DOCUMENTS", 100))
+
+# Customer email → Zoho contact resolution cache
+ZOHO_CONTACT_CACHE_TTL_SECONDS = int(os.getenv("ZOHO_CONTACT_CACHE_TTL_SECONDS", 3600))
+ZOHO_CONTACT_NEGATIVE_TTL_SECONDS = int(os.getenv("ZOHO_CONTACT_NEGATIVE_TTL_SECONDS", 60))
+ZOHO_CONTACT_CACHE_MAX_ENTRIES = int(os.getenv("ZOHO_CONTACT_CACHE_MAX_ENTRIES", 10000))
+# Also persist / read the mapping through users.zoho_erp_id
+ZOHO_CONTACT_PERSIST = os.getenv("ZOHO_CONTACT_PERSIST", "True").lower() == "true"
+
+# Per-source time budget for the customer dashboard fan-out
+ZOHO_DASHBOARD_SOURCE_TIMEOUT = float(os.getenv("ZOHO_DASHBOARD_SOURCE_TIMEOUT", 8))
+
+# Per-contact dashboard summary cache (stale-while-revalidate)
+ZOHO_DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("ZOHO_DASHBOARD_CACHE_TTL_SECONDS", 60))
+ZOHO_DASHBOARD_STALE_SECONDS = float(os.getenv("ZOHO_DASHBOARD_STALE_SECONDS", 600))
+ZOHO_DASHBOARD_FULL_REFRESH_SECONDS = float(os.getenv("ZOHO_DASHBOARD_FULL_REFRESH_SECONDS", 3600))
+ZOHO_DASHBOARD_CACHE_MAX_CONTACTS = int(os.getenv("ZOHO_DASHBOARD_CACHE_MAX_CONTACTS", 5000))
+
 # ==============================
 # ZOHO EMAIL SETTINGS
 # ==============================
@@ -4,6 +4,11 @@ from fastapi.security import HTTPBearer
 from database import Base, engine
 from middleware.auth_privilege import auth_and_privilege_middleware
 from routers.file_download import router as file_download_router
+import config
+from services.erp_sync_jobs import erp_sync_jobs
+from services.zoho_auth_service import start_zoho_token_refresher, stop_zoho_token_refresher
+from services.zoho_item_catalog import zoho_item_catalog
+from services.zoho_transport import zoho_async_http
 
 
 
@@ -49,6 +54,7 @@ from routers import (
     category_details,
     cities,
     zoho_auth,
+    zoho_comments,
     zoho_dashboard,
     zoho_items,
     zoho_register,
@@ -152,6 +158,7 @@ app.include_router(contacts.router)
 app.include_router(retainerinvoices.router)
 app.include_router(sales_orders.router)
 app.include_router(zoho_dashboard.router)
+app.include_router(zoho_comments.router)
 app.include_router(statements.router)
 
 app.include_router(zoho_register.router)
@@ -160,3 +167,39 @@ app.include_router(zoho_register.router)
 # @app.on_event("startup")
 # async def startup_event():
 #     Base.metadata.create_all(bind=engine)
+
+
+@app.on_event("startup")
+async def start_zoho_token_refresh():
+    start_zoho_token_refresher()
+
+
+@app.on_event("shutdown")
+async def stop_zoho_token_refresh():
+    await stop_zoho_token_refresher()
+
+
+@app.on_event("startup")
+async def start_zoho_item_catalog():
+    if config.ZOHO_ITEM_CATALOG_ENABLED:
+        zoho_item_catalog.start()
+
+
+@app.on_event("shutdown")
+async def stop_zoho_item_catalog():
+    await zoho_item_catalog.stop()
+
+
+@app.on_event("startup")
+async def start_erp_sync_workers():
+    erp_sync_jobs.start()
+
+
+@app.on_event("shutdown")
+async def stop_erp_sync_workers():
+    await erp_sync_jobs.stop()
+
+
+@app.on_event("shutdown")
+async def close_zoho_async_client():
+    await zoho_async_http.aclose()
@@ -1,8 +1,15 @@
 from fastapi import Request, HTTPException
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from models import Module, UserRole, RoleModulePrivilege, User
+from models import User
 import auth_utils
+from services.token_version_service import TokenVersionService
+from utils.privilege_cache import (
+    ALLOWED,
+    MODULE_NOT_FOUND,
+    NO_ROLES,
+    privilege_cache,
+)
 
 # --------------------------------------------------
 # Public endpoints (NO authentication required)
@@ -33,6 +40,134 @@ METHOD_ACTION_MAP = {
 }
 
 
+def _authenticate_and_authorize(request: Request, db: Session, path: str):
+    """
+    Validate the bearer token and the module privilege for the request.
+    Raises HTTPException on failure.
+    """
+    # --------------------------------------------------
+    # AUTHENTICATION
+    # --------------------------------------------------
+    auth_header = (
+        request.headers.get("Authorization")
+        or request.headers.get("authorization")
+    )
+
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(
+            status_code=401,
+            detail="Unauthorized: Missing or invalid token header",
+        )
+
+    token = auth_header.split(" ", 1)[1]
+    payload = auth_utils.decode_access_token(token)
+
+    if not payload:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+        )
+
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid token payload",
+        )
+
+    # --------------------------------------------------
+    # Signed-claims fast path: trust roles from the token
+    # while its permission version ("pv") is current
+    # --------------------------------------------------
+    role_ids = None
+    request.state.token_claims = payload
+
+    if payload.get("active") and TokenVersionService.is_current(
+        db, user_id, payload.get("pv")
+    ):
+        role_ids = payload.get("roles") or []
+    else:
+        user = db.query(User).filter_by(id=user_id).first()
+        if not user:
+            raise HTTPException(
+                status_code=401,
+                detail="User not found",
+            )
+
+        request.state.user = user
+
+    # --------------------------------------------------
+    # Skip privilege check for KYC
+    # --------------------------------------------------
+    if path.startswith("/kyc/"):
+        return
+
+    # --------------------------------------------------
+    # Extract module name
+    # Example:
+    #   /addresses/5 -> addresses
+    #   /products   -> products
+    # --------------------------------------------------
+    parts = path.strip("/").split("/")
+    module_name = parts[0] if parts else None
+
+    if not module_name:
+        return
+
+    # --------------------------------------------------
+    # Skip privilege check for /modules/**
+    # --------------------------------------------------
+    if module_name == "modules":
+        return
+
+    # --------------------------------------------------
+    # Allow list endpoints (GET /products)
+    # --------------------------------------------------
+    if request.method == "GET" and len(parts) == 1:
+        return
+
+    # --------------------------------------------------
+    # Determine privilege action
+    # --------------------------------------------------
+    endpoint = request.scope.get("endpoint")
+    endpoint_name = endpoint.__name__ if endpoint else ""
+
+    if "search" in endpoint_name:
+        action = "can_search"
+    elif "export" in endpoint_name:
+        action = "can_export"
+    else:
+        action = METHOD_ACTION_MAP.get(request.method)
+
+    if not action:
+        return
+
+    # --------------------------------------------------
+    # PRIVILEGE CHECK (cached role → module → action matrix)
+    # --------------------------------------------------
+    outcome = privilege_cache.resolve(
+        db, user_id, module_name, action, role_ids=role_ids
+    )
+
+    if outcome == MODULE_NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail=f'Module "{module_name}" not registered',
+        )
+
+    if outcome == NO_ROLES:
+        raise HTTPException(
+            status_code=403,
+            detail="User has no assigned roles",
+        )
+
+    if outcome != ALLOWED:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Access denied for '{action}' on '{module_name}'",
+        )
+
+
 async def auth_and_privilege_middleware(request: Request, call_next):
     """
     Global authentication + privilege middleware
@@ -76,136 +211,10 @@ async def auth_and_privilege_middleware(request: Request, call_next):
     db: Session = SessionLocal()
 
     try:
-        # --------------------------------------------------
-        # AUTHENTICATION
-        # --------------------------------------------------
-        auth_header = (
-            request.headers.get("Authorization")
-            or request.headers.get("authorization")
-        )
-
-        if not auth_header or not auth_header.startswith("Bearer "):
-            raise HTTPException(
-                status_code=401,
-                detail="Unauthorized: Missing or invalid token header",
-            )
-
-        token = auth_header.split(" ", 1)[1]
-        payload = auth_utils.decode_access_token(token)
-
-        if not payload:
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid or expired token",
-            )
-
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid token payload",
-            )
-
-        user = db.query(User).filter_by(id=user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=401,
-                detail="User not found",
-            )
-
-        request.state.user = user
-
-        # --------------------------------------------------
-        # Skip privilege check for KYC
-        # --------------------------------------------------
-        if path.startswith("/kyc/"):
-            return await call_next(request)
-
-        # --------------------------------------------------
-        # Extract module name
-        # Example:
-        #   /addresses/5 -> addresses
-        #   /products   -> products
-        # --------------------------------------------------
-        parts = path.strip("/").split("/")
-        module_name = parts[0] if parts else None
-
-        if not module_name:
-            return await call_next(request)
-
-        # --------------------------------------------------
-        # Skip privilege check for /modules/**
-        # --------------------------------------------------
-        if module_name == "modules":
-            return await call_next(request)
-
-        # --------------------------------------------------
-        # Allow list endpoints (GET /products)
-        # --------------------------------------------------
-        if request.method == "GET" and len(parts) == 1:
-            return await call_next(request)
-
-        # --------------------------------------------------
-        # Determine privilege action
-        # --------------------------------------------------
-        endpoint = request.scope.get("endpoint")
-        endpoint_name = endpoint.__name__ if endpoint else ""
-
-        if "search" in endpoint_name:
-            action = "can_search"
-        elif "export" in endpoint_name:
-            action = "can_export"
-        else:
-            action = METHOD_ACTION_MAP.get(request.method)
-
-        if not action:
-            return await call_next(request)
-
-        # --------------------------------------------------
-        # MODULE CHECK
-        # --------------------------------------------------
-        module = db.query(Module).filter_by(path=module_name).first()
-        if not module:
-            raise HTTPException(
-                status_code=404,
-                detail=f'Module "{module_name}" not registered',
-            )
-
-        # --------------------------------------------------
-        # USER ROLES
-        # --------------------------------------------------
-        user_roles = db.query(UserRole).filter_by(user_id=user.id).all()
-        if not user_roles:
-            raise HTTPException(
-                status_code=403,
-                detail="User has no assigned roles",
-            )
-
-        role_ids = [r.role_id for r in user_roles]
-
-        # --------------------------------------------------
-        # PRIVILEGE CHECK
-        # --------------------------------------------------
-        allowed = (
-            db.query(RoleModulePrivilege)
-            .filter(
-                RoleModulePrivilege.role_id.in_(role_ids),
-                RoleModulePrivilege.module_id == module.id,
-                getattr(RoleModulePrivilege, action) == True,
-            )
-            .first()
-        )
-
-        if not allowed:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Access denied for '{action}' on '{module_name}'",
-            )
-
-        # --------------------------------------------------
-        # ALL GOOD
-        # --------------------------------------------------
-        return await call_next(request)
-
+        _authenticate_and_authorize(request, db, path)
     finally:
+        # Release the connection before the endpoint runs; the endpoint
+        # gets its own session (get_db) and re-uses request.state.user
         db.close()
+
+    return await call_next(request)
@@ -4,9 +4,9 @@ from sqlalchemy import Enum
 
 import uuid
 from sqlalchemy import (
-    Column, Float, LargeBinary, Numeric, String, Boolean, DateTime, Integer, ForeignKey, UniqueConstraint, func,Text
+    BigInteger, Column, Float, Index, LargeBinary, Numeric, String, Boolean, DateTime, Integer, ForeignKey, UniqueConstraint, func,Text, text
 )
-from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
+from sqlalchemy.dialects.postgresql import JSONB, UUID, TIMESTAMP
 from sqlalchemy.orm import relationship
 from database import Base
 from utils.common_service import UTCDateTimeMixin
@@ -431,6 +431,95 @@ class UserSession(Base):
 
 
 
+class UserTokenVersion(Base):
+    """
+    Per-user permission version embedded in access tokens ("pv" claim).
+    Bumped whenever roles, active flag, plan or sessions change so that
+    previously issued signed claims are no longer trusted.
+    """
+    __tablename__ = "user_token_versions"
+    __table_args__ = {"schema": "public"}
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("public.users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    mts = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+
+class ErpSyncJob(Base):
+    """
+    One background ERP sync run (services/erp_sync_jobs.py).
+    checkpoint carries the counters of an interrupted run to the worker
+    that resumes it; the synced rows' erp_sync_status decides what is
+    left to do.
+    """
+    __tablename__ = "erp_sync_jobs"
+    __table_args__ = (
+        # At most one queued and one running job per entity, across
+        # processes (enqueue dedupe and claim both rely on these)
+        Index(
+            "uq_erp_sync_jobs_queued_entity", "entity",
+            unique=True, postgresql_where=text("status = 'queued'")
+        ),
+        Index(
+            "uq_erp_sync_jobs_running_entity", "entity",
+            unique=True, postgresql_where=text("status = 'running'")
+        ),
+        {"schema": "public"},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    entity = Column(String(50), nullable=False, index=True)
+    params = Column(JSONB, nullable=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued | running | completed | failed
+
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+    checkpoint = Column(JSONB, nullable=True)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    requested_by = Column(UUID(as_uuid=True), ForeignKey("public.users.id", ondelete="SET NULL"), nullable=True)
+    cts = Column(DateTime(timezone=True), server_default=func.now())
+    mts = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ErpChangeOutbox(Base):
+    """
+    Change log for ERP sync (services/erp_change_outbox.py): one row per
+    write to a synced entity, appended in the writer's transaction and
+    read by sync consumers in seq order from their erp_sync_cursors row.
+    """
+    __tablename__ = "erp_change_outbox"
+    __table_args__ = (
+        Index("ix_erp_change_outbox_entity_seq", "entity", "seq"),
+        {"schema": "public"},
+    )
+
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)
+    entity = Column(String(30), nullable=False)  # user | product
+    entity_id = Column(String(64), nullable=False)
+    cts = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ErpSyncCursor(Base):
+    """
+    Last erp_change_outbox seq a sync consumer has applied.
+    """
+    __tablename__ = "erp_sync_cursors"
+    __table_args__ = {"schema": "public"}
+
+    consumer = Column(String(50), primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
+    mts = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 # ------------------------------
 # Module Model
 # ------------------------------
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
 from routers.totp import get_current_user
 from services.erp_service import ERPService
 
@@ -32,7 +32,10 @@ async def health_postgres():
 # ---------- INSERT -----------
 
 @router.post("/insert")
-async def data_insert(payload: List[dict]):
+async def data_insert(
+    payload: List[dict],
+    bulk: Optional[bool] = Query(None, description="Force (true) or disable (false) the COPY bulk path")
+):
     if not payload:
         raise HTTPException(400, "Payload cannot be empty")
 
@@ -40,7 +43,7 @@ async def data_insert(payload: List[dict]):
     if not await ERPService.safe_init_pool():
         fail_unavailable()
 
-    result = await ERPService.insert_data(payload)
+    result = await ERPService.insert_data(payload, bulk=bulk)
     return success("Inserted successfully", result)
 
 
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException , Body
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Response, status, HTTPException , Body, Query
 from auth_utils import get_current_user
 import schemas
 from services.invoice_services import InvoiceService
-from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_auth_service import get_zoho_access_token_async
 import zohoschemas
+import config
+from utils.page_cursor import decode_page_cursor, next_page_cursor
 
 router = APIRouter(
     prefix="/zohoinvoices",
@@ -15,14 +18,14 @@ invoice_service = InvoiceService()
 
 
 @router.post("/create", response_model=zohoschemas.InvoiceResponse, status_code=status.HTTP_201_CREATED)
-def create_invoice(payload: zohoschemas.RequestInvoice, current_user=Depends(get_current_user)):
+async def create_invoice(payload: zohoschemas.RequestInvoice, current_user=Depends(get_current_user)):
     """
     Create Invoice:
     - Creates a new invoice in Zoho Books
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        invoice = invoice_service.create_invoice(access_token, payload)
+        invoice = await invoice_service.create_invoice(access_token, payload)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -37,29 +40,37 @@ def create_invoice(payload: zohoschemas.RequestInvoice, current_user=Depends(get
 
 
 @router.get("/my", status_code=status.HTTP_200_OK)
-def list_my_invoices(current_user=Depends(get_current_user)):
+async def list_my_invoices(
+    cursor: Optional[str] = None,
+    limit: int = Query(config.ZOHO_PAGE_SIZE, ge=1, le=config.ZOHO_PAGE_SIZE),
+    current_user=Depends(get_current_user)
+):
     """
     List Invoices for the logged-in customer.
+    Pass next_cursor back as ?cursor= for the following page.
     """
-    access_token = get_zoho_access_token()
+    page, per_page = decode_page_cursor(cursor, limit)
+    access_token = await get_zoho_access_token_async()
     try:
-        invoices = invoice_service.list_invoices_for_customer(access_token, current_user.email)
+        invoices, page_context = await invoice_service.list_invoices_for_customer(
+            access_token, current_user.email, page, per_page
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching invoices: {str(e)}")
 
-    return {"invoices": invoices}
+    return {"invoices": invoices, "next_cursor": next_page_cursor(page_context, page, per_page)}
 
 
 @router.put("/review/{invoice_id}", response_model=zohoschemas.InvoiceResponse, status_code=status.HTTP_200_OK)
-def review_invoice(invoice_id: str, payload: zohoschemas.ReviewInvoice, current_user=Depends(get_current_user)):
+async def review_invoice(invoice_id: str, payload: zohoschemas.ReviewInvoice, current_user=Depends(get_current_user)):
     """
     ERP Review Invoice:
     - Approve or reject draft invoice
     - Add comments or adjustments
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        updated = invoice_service.review_invoice(
+        updated = await invoice_service.review_invoice(
             access_token=access_token,
             invoice_id=invoice_id,
             payload=payload,
@@ -78,14 +89,14 @@ def review_invoice(invoice_id: str, payload: zohoschemas.ReviewInvoice, current_
 
 
 @router.put("/approve/{invoice_id}", response_model=zohoschemas.InvoiceResponse, status_code=status.HTTP_200_OK)
-def approve_invoice(invoice_id: str, payload: zohoschemas.ApproveInvoice, current_user=Depends(get_current_user)):
+async def approve_invoice(invoice_id: str, payload: zohoschemas.ApproveInvoice, current_user=Depends(get_current_user)):
     """
     Customer Approval:
     - Approve or reject reviewed invoice
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = invoice_service.customer_approve_invoice(
+        result = await invoice_service.customer_approve_invoice(
             access_token=access_token,
             invoice_id=invoice_id,
             payload=payload,
@@ -103,13 +114,13 @@ def approve_invoice(invoice_id: str, payload: zohoschemas.ApproveInvoice, curren
 
 
 @router.get("/{invoice_id}", status_code=status.HTTP_200_OK)
-def get_invoice(invoice_id: str, current_user=Depends(get_current_user)):
+async def get_invoice(invoice_id: str, current_user=Depends(get_current_user)):
     """
     Get Invoice Details
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        invoice = invoice_service.get_invoice(
+        invoice = await invoice_service.get_invoice(
             access_token=access_token,
             invoice_id=invoice_id,
             contact_id=current_user.email
@@ -119,29 +130,36 @@ def get_invoice(invoice_id: str, current_user=Depends(get_current_user)):
 
     return invoice
 @router.get("/{invoice_id}/pdf", status_code=status.HTTP_200_OK)
-def get_invoice_pdf(invoice_id: str, current_user=Depends(get_current_user)):
+async def get_invoice_pdf(
+    invoice_id: str,
+    if_none_match: str | None = Header(None),
+    current_user=Depends(get_current_user),
+):
     """
     Get Invoice PDF:
     - Returns the PDF view of a Zoho Books invoice
+    - 304 when If-None-Match matches the cached version
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        pdf_bytes = invoice_service.get_invoice_pdf(access_token, invoice_id)
+        pdf = await invoice_service.get_invoice_pdf(
+            access_token, invoice_id, stream=True, if_none_match=if_none_match
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching invoice PDF: {str(e)}")
 
-    # Return raw PDF stream with correct headers
-    return Response(content=pdf_bytes, media_type="application/pdf")
+    # Cached file, 304, or Zoho's PDF body piped through chunk by chunk
+    return pdf.to_response()
 # =====================================================
 # GET ALL COMMENTS FOR INVOICE
 # =====================================================
 @router.get("/{invoice_id}/comments", status_code=status.HTTP_200_OK)
-def get_invoice_comments(invoice_id: str, current_user=Depends(get_current_user)):
-    access_token = get_zoho_access_token()
+async def get_invoice_comments(invoice_id: str, current_user=Depends(get_current_user)):
+    access_token = await get_zoho_access_token_async()
     try:
-        comments = invoice_service.get_invoice_comments(access_token, invoice_id)
+        comments = await invoice_service.get_invoice_comments(access_token, invoice_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching invoice comments: {str(e)}")
     return {"comments": comments}
@@ -151,12 +169,12 @@ def get_invoice_comments(invoice_id: str, current_user=Depends(get_current_user)
 # ADD NEW COMMENT
 # =====================================================
 @router.post("/{invoice_id}/comments", status_code=status.HTTP_201_CREATED)
-def add_invoice_comment(
+async def add_invoice_comment(
     invoice_id: str,
     payload: dict = Body(...),
     current_user=Depends(get_current_user)
 ):
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     description = payload.get("description")
     if not description:
@@ -166,7 +184,7 @@ def add_invoice_comment(
         )
 
     try:
-        created = invoice_service.add_invoice_comment(
+        created = await invoice_service.add_invoice_comment(
             access_token=access_token,
             invoice_id=invoice_id,
             description=description,
@@ -188,15 +206,15 @@ def add_invoice_comment(
 # UPDATE A COMMENT
 # =====================================================
 @router.put("/{invoice_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def update_invoice_comment(
+async def update_invoice_comment(
     invoice_id: str,
     comment_id: str,
     payload: dict = Body(...),
     current_user=Depends(get_current_user),
 ):
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        updated = invoice_service.update_invoice_comment(
+        updated = await invoice_service.update_invoice_comment(
             access_token, invoice_id, comment_id, payload
         )
     except Exception as e:
@@ -208,10 +226,10 @@ def update_invoice_comment(
 # DELETE A COMMENT
 # =====================================================
 @router.delete("/{invoice_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def delete_invoice_comment(invoice_id: str, comment_id: str, current_user=Depends(get_current_user)):
-    access_token = get_zoho_access_token()
+async def delete_invoice_comment(invoice_id: str, comment_id: str, current_user=Depends(get_current_user)):
+    access_token = await get_zoho_access_token_async()
     try:
-        invoice_service.delete_invoice_comment(access_token, invoice_id, comment_id)
+        await invoice_service.delete_invoice_comment(access_token, invoice_id, comment_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting comment: {str(e)}")
     return {"message": "Comment deleted"}
\ No newline at end of file
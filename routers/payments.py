@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, status, HTTPException,Response
+from typing import Optional
+from fastapi import APIRouter, Depends, status, HTTPException,Response, Query
 from auth_utils import get_current_user
 import schemas
 from services.payment_service import PaymentService
-from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_auth_service import get_zoho_access_token_async
 import zohoschemas
+import config
+from utils.page_cursor import decode_page_cursor, next_page_cursor
 
 router = APIRouter(
     prefix="/zohopayments",
@@ -15,14 +18,14 @@ payment_service = PaymentService()
 
 
 @router.post("/create", response_model=zohoschemas.PaymentResponse, status_code=status.HTTP_201_CREATED)
-def create_payment(payload: zohoschemas.RequestPayment, current_user=Depends(get_current_user)):
+async def create_payment(payload: zohoschemas.RequestPayment, current_user=Depends(get_current_user)):
     """
     Create Customer Payment:
     - Records a payment against an invoice in Zoho Books
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        payment = payment_service.create_payment(access_token, payload)
+        payment = await payment_service.create_payment(access_token, payload)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -37,27 +40,35 @@ def create_payment(payload: zohoschemas.RequestPayment, current_user=Depends(get
 
 
 @router.get("/my", status_code=status.HTTP_200_OK)
-def list_my_payments(current_user=Depends(get_current_user)):
+async def list_my_payments(
+    cursor: Optional[str] = None,
+    limit: int = Query(config.ZOHO_PAGE_SIZE, ge=1, le=config.ZOHO_PAGE_SIZE),
+    current_user=Depends(get_current_user)
+):
     """
     List Payments for the logged-in customer.
+    Pass next_cursor back as ?cursor= for the following page.
     """
-    access_token = get_zoho_access_token()
+    page, per_page = decode_page_cursor(cursor, limit)
+    access_token = await get_zoho_access_token_async()
     try:
-        payments = payment_service.list_payments_for_customer(access_token, current_user.email)
+        payments, page_context = await payment_service.list_payments_for_customer(
+            access_token, current_user.email, page, per_page
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching payments: {str(e)}")
 
-    return {"payments": payments}
+    return {"payments": payments, "next_cursor": next_page_cursor(page_context, page, per_page)}
 
 
 @router.get("/{payment_id}", status_code=status.HTTP_200_OK)
-def get_payment(payment_id: str, current_user=Depends(get_current_user)):
+async def get_payment(payment_id: str, current_user=Depends(get_current_user)):
     """
     Get Payment Details
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        payment = payment_service.get_payment(
+        payment = await payment_service.get_payment(
             access_token=access_token,
             payment_id=payment_id,
             contact_id=current_user.email
@@ -69,15 +80,15 @@ def get_payment(payment_id: str, current_user=Depends(get_current_user)):
 
 
 @router.put("/review/{payment_id}", response_model=zohoschemas.PaymentResponse, status_code=status.HTTP_200_OK)
-def review_payment(payment_id: str, payload: zohoschemas.ReviewPayment, current_user=Depends(get_current_user)):
+async def review_payment(payment_id: str, payload: zohoschemas.ReviewPayment, current_user=Depends(get_current_user)):
     """
     ERP Review Payment:
     - Approve or reject recorded payment
     - Add comments or adjustments
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        updated = payment_service.review_payment(
+        updated = await payment_service.review_payment(
             access_token=access_token,
             payment_id=payment_id,
             payload=payload,
@@ -96,14 +107,14 @@ def review_payment(payment_id: str, payload: zohoschemas.ReviewPayment, current_
 
 
 @router.put("/approve/{payment_id}", response_model=zohoschemas.PaymentResponse, status_code=status.HTTP_200_OK)
-def approve_payment(payment_id: str, payload: zohoschemas.ApprovePayment, current_user=Depends(get_current_user)):
+async def approve_payment(payment_id: str, payload: zohoschemas.ApprovePayment, current_user=Depends(get_current_user)):
     """
     Customer Approval:
     - Approve or reject reviewed payment
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = payment_service.customer_approve_payment(
+        result = await payment_service.customer_approve_payment(
             access_token=access_token,
             payment_id=payment_id,
             payload=payload,
@@ -119,10 +130,10 @@ def approve_payment(payment_id: str, payload: zohoschemas.ApprovePayment, curren
         status=result["status"]
     )
 @router.get("/payment/{payment_id}/pdf", status_code=status.HTTP_200_OK)
-def get_payment_pdf(payment_id: str, current_user=Depends(get_current_user)):
-    access_token = get_zoho_access_token()
+async def get_payment_pdf(payment_id: str, current_user=Depends(get_current_user)):
+    access_token = await get_zoho_access_token_async()
     try:
-        pdf_bytes = payment_service.get_payment_pdf(access_token, payment_id)
+        pdf = await payment_service.get_payment_pdf(access_token, payment_id, stream=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching payment PDF: {str(e)}")
-    return Response(content=pdf_bytes, media_type="application/pdf")
+    return pdf.to_response()
@@ -1,10 +1,12 @@
-from typing import List
-from fastapi import APIRouter, Depends, File, Form, Response, UploadFile, status, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Form, Header, Response, UploadFile, status, HTTPException, Query
 from auth_utils import get_current_user
 import schemas
 from services.quote_service import QuoteService
-from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_auth_service import get_zoho_access_token_async
 import zohoschemas
+import config
+from utils.page_cursor import decode_page_cursor, next_page_cursor
 
 router = APIRouter(
     prefix="/zohoquotes",
@@ -18,16 +20,16 @@ quote_service = QuoteService()
 # Request Quote (Customer)
 # -----------------------------
 @router.post("/request", response_model=zohoschemas.QuoteResponse, status_code=status.HTTP_201_CREATED)
-def request_quote(payload: zohoschemas.RequestQuote, current_user=Depends(get_current_user)):
+async def request_quote(payload: zohoschemas.RequestQuote, current_user=Depends(get_current_user)):
     """
     Request Quote:
     - Creates DRAFT quote in Zoho Books
     - Sales team completes & sends
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        estimate = quote_service.create_draft_quote(access_token, payload)
+        estimate = await quote_service.create_draft_quote(access_token, payload)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -46,7 +48,7 @@ def request_quote(payload: zohoschemas.RequestQuote, current_user=Depends(get_cu
     "/{estimate_id}/attachment",
     status_code=status.HTTP_201_CREATED
 )
-def upload_quote_attachment(
+async def upload_quote_attachment(
     estimate_id: str,
     file: UploadFile = File(...),
     current_user=Depends(get_current_user)
@@ -54,10 +56,10 @@ def upload_quote_attachment(
     """
     Upload attachment to a Zoho Books Estimate (Quote)
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        result = quote_service.upload_attachment(
+        result = await quote_service.upload_attachment(
             access_token=access_token,
             estimate_id=estimate_id,
             file=file,
@@ -79,7 +81,7 @@ def upload_quote_attachment(
     response_model=zohoschemas.QuoteResponse,
     status_code=status.HTTP_201_CREATED
 )
-def request_quote_with_attachments(
+async def request_quote_with_attachments(
     contact_id: str = Form(...),
     enquiry_description: str = Form(...),
     notes: str | None = Form(None),
@@ -89,7 +91,7 @@ def request_quote_with_attachments(
     """
     Create enquiry draft quote + upload attachments
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
         # 1️⃣ Create enquiry quote
@@ -99,7 +101,7 @@ def request_quote_with_attachments(
             notes=notes
         )
 
-        estimate = quote_service.create_draft_quote_enquiry(
+        estimate = await quote_service.create_draft_quote_enquiry(
             access_token=access_token,
             payload=payload
         )
@@ -124,31 +126,39 @@ def request_quote_with_attachments(
 # List Quotes (Customer)
 # -----------------------------
 @router.get("/my", status_code=status.HTTP_200_OK)
-def list_my_quotes(current_user=Depends(get_current_user)):
+async def list_my_quotes(
+    cursor: Optional[str] = None,
+    limit: int = Query(config.ZOHO_PAGE_SIZE, ge=1, le=config.ZOHO_PAGE_SIZE),
+    current_user=Depends(get_current_user)
+):
     """
     List Quotes for the logged-in customer.
+    Pass next_cursor back as ?cursor= for the following page.
     """
-    access_token = get_zoho_access_token()
+    page, per_page = decode_page_cursor(cursor, limit)
+    access_token = await get_zoho_access_token_async()
     try:
-        quotes = quote_service.list_quotes_for_customer(access_token, current_user.email)
+        quotes, page_context = await quote_service.list_quotes_for_customer(
+            access_token, current_user.email, page, per_page
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching quotes: {str(e)}")
 
-    return {"quotes": quotes}
+    return {"quotes": quotes, "next_cursor": next_page_cursor(page_context, page, per_page)}
 
 # -----------------------------
 # ERP Review Quote
 # -----------------------------
 @router.put("/review/{estimate_id}", response_model=zohoschemas.QuoteResponse, status_code=status.HTTP_200_OK)
-def review_quote(estimate_id: str, payload: zohoschemas.ReviewQuote, current_user=Depends(get_current_user)):
+async def review_quote(estimate_id: str, payload: zohoschemas.ReviewQuote, current_user=Depends(get_current_user)):
     """
     ERP Review Quote:
     - Approve or reject draft quote
     - Add comments or adjustments
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        updated = quote_service.review_quote(
+        updated = await quote_service.review_quote(
             access_token,
             estimate_id,
             payload,
@@ -169,14 +179,14 @@ def review_quote(estimate_id: str, payload: zohoschemas.ReviewQuote, current_use
 # Customer Approval
 # -----------------------------
 @router.put("/approve/{estimate_id}", response_model=zohoschemas.QuoteResponse, status_code=status.HTTP_200_OK)
-def approve_quote(estimate_id: str, payload: zohoschemas.ApproveQuote, current_user=Depends(get_current_user)):
+async def approve_quote(estimate_id: str, payload: zohoschemas.ApproveQuote, current_user=Depends(get_current_user)):
     """
     Customer Approval:
     - Approve or reject reviewed quote
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = quote_service.customer_approve_quote(
+        result = await quote_service.customer_approve_quote(
             access_token,
             estimate_id,
             payload,
@@ -192,13 +202,13 @@ def approve_quote(estimate_id: str, payload: zohoschemas.ApproveQuote, current_u
     )       
 
 @router.get("/{estimate_id}", status_code=status.HTTP_200_OK)
-def get_quote(estimate_id: str, current_user=Depends(get_current_user)):
+async def get_quote(estimate_id: str, current_user=Depends(get_current_user)):
         """
         Get Quote Details
         """
-        access_token = get_zoho_access_token()
+        access_token = await get_zoho_access_token_async()
         try:
-            quote = quote_service.get_quote(
+            quote = await quote_service.get_quote(
                 access_token=access_token,
                 estimate_id=estimate_id,
                 contact_id=current_user.email
@@ -208,15 +218,15 @@ def get_quote(estimate_id: str, current_user=Depends(get_current_user)):
 
         return quote
 @router.put("/{estimate_id}/decline", response_model=zohoschemas.QuoteResponse, status_code=status.HTTP_200_OK)
-def decline_quote(estimate_id: str, current_user=Depends(get_current_user)):
+async def decline_quote(estimate_id: str, current_user=Depends(get_current_user)):
     """
     Decline Quote:
     - Marks a Zoho Books estimate as declined
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = quote_service.update_quote_status(access_token, estimate_id, "declined")
-        quote_service.add_comment(
+        result = await quote_service.update_quote_status(access_token, estimate_id, "declined")
+        await quote_service.add_comment(
             access_token=access_token,  
             estimate_id=estimate_id,
             description="Quote declined by customer.",
@@ -234,15 +244,15 @@ def decline_quote(estimate_id: str, current_user=Depends(get_current_user)):
 
 
 @router.put("/{estimate_id}/accept", response_model=zohoschemas.QuoteResponse, status_code=status.HTTP_200_OK)
-def accept_quote(estimate_id: str, current_user=Depends(get_current_user)):
+async def accept_quote(estimate_id: str, current_user=Depends(get_current_user)):
     """
     Accept Quote:
     - Marks a Zoho Books estimate as accepted
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = quote_service.update_quote_status(access_token, estimate_id, "accepted")
-        quote_service.add_comment(
+        result = await quote_service.update_quote_status(access_token, estimate_id, "accepted")
+        await quote_service.add_comment(
             access_token=access_token,  
             estimate_id=estimate_id,
             description="Quote accepted by customer.",
@@ -258,30 +268,37 @@ def accept_quote(estimate_id: str, current_user=Depends(get_current_user)):
         status=result["status"]
     )
 @router.get("/{estimate_id}/pdf", status_code=status.HTTP_200_OK)
-def get_quote_pdf(estimate_id: str, current_user=Depends(get_current_user)):
+async def get_quote_pdf(
+    estimate_id: str,
+    if_none_match: str | None = Header(None),
+    current_user=Depends(get_current_user),
+):
     """
     Get Quote (Estimate) PDF:
     - Returns the PDF view of a Zoho Books estimate
+    - 304 when If-None-Match matches the cached version
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        pdf_bytes = quote_service.get_quote_pdf(access_token, estimate_id)
+        pdf = await quote_service.get_quote_pdf(
+            access_token, estimate_id, stream=True, if_none_match=if_none_match
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching quote PDF: {str(e)}")
 
-    # Return raw PDF stream with correct headers
-    return Response(content=pdf_bytes, media_type="application/pdf")
+    # Cached file, 304, or Zoho's PDF body piped through chunk by chunk
+    return pdf.to_response()
 @router.post("/{estimate_id}/comments", status_code=status.HTTP_201_CREATED)
-def add_comment(
+async def add_comment(
     estimate_id: str,
     payload: zohoschemas.CommentCreate,
     current_user=Depends(get_current_user)
 ):
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        created = quote_service.add_comment(
+        created = await quote_service.add_comment(
             access_token=access_token,
             estimate_id=estimate_id,
             description=payload.description,
@@ -297,15 +314,15 @@ def add_comment(
 # Update Comment
 # -----------------------------
 @router.put("/{estimate_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def update_comment(
+async def update_comment(
     estimate_id: str,
     comment_id: str,
     payload: zohoschemas.CommentUpdate,
     current_user=Depends(get_current_user)
 ):
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        updated = quote_service.update_comment(
+        updated = await quote_service.update_comment(
             access_token=access_token,
             estimate_id=estimate_id,
             comment_id=comment_id,
@@ -320,14 +337,14 @@ def update_comment(
 # Delete Comment
 # -----------------------------
 @router.delete("/{estimate_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def delete_comment(
+async def delete_comment(
     estimate_id: str,
     comment_id: str,
     current_user=Depends(get_current_user)
 ):
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = quote_service.delete_comment(
+        result = await quote_service.delete_comment(
             access_token=access_token,
             estimate_id=estimate_id,
             comment_id=comment_id,
@@ -338,13 +355,13 @@ def delete_comment(
         )
     return {"message": "Comment deleted"}
 @router.get("/{estimate_id}/comments", status_code=status.HTTP_200_OK)
-def list_comments(estimate_id: str, current_user=Depends(get_current_user)):
+async def list_comments(estimate_id: str, current_user=Depends(get_current_user)):
     """
     List All Comments for a Quote (Customer)
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        comments = quote_service.get_comments(access_token, estimate_id)
+        comments = await quote_service.get_comments(access_token, estimate_id)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Response, status, HTTPException, Query
 from auth_utils import get_current_user
 import schemas
 from services.retainer_invoice_service import RetainerInvoiceService
-from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_auth_service import get_zoho_access_token_async
 import zohoschemas
+import config
+from utils.page_cursor import decode_page_cursor, next_page_cursor
 
 router = APIRouter(
     prefix="/zohoretainerinvoices",
@@ -15,14 +18,14 @@ retainer_invoice_service = RetainerInvoiceService()
 
 
 @router.post("/create", response_model=zohoschemas.RetainerInvoiceResponse, status_code=status.HTTP_201_CREATED)
-def create_retainer_invoice(payload: zohoschemas.RequestRetainerInvoice, current_user=Depends(get_current_user)):
+async def create_retainer_invoice(payload: zohoschemas.RequestRetainerInvoice, current_user=Depends(get_current_user)):
     """
     Create Retainer Invoice:
     - Creates a new retainer invoice in Zoho Books
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        invoice = retainer_invoice_service.create_retainer_invoice(access_token, payload)
+        invoice = await retainer_invoice_service.create_retainer_invoice(access_token, payload)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -37,29 +40,37 @@ def create_retainer_invoice(payload: zohoschemas.RequestRetainerInvoice, current
 
 
 @router.get("/my", status_code=status.HTTP_200_OK)
-def list_my_retainer_invoices(current_user=Depends(get_current_user)):
+async def list_my_retainer_invoices(
+    cursor: Optional[str] = None,
+    limit: int = Query(config.ZOHO_PAGE_SIZE, ge=1, le=config.ZOHO_PAGE_SIZE),
+    current_user=Depends(get_current_user)
+):
     """
     List Retainer Invoices for the logged-in customer.
+    Pass next_cursor back as ?cursor= for the following page.
     """
-    access_token = get_zoho_access_token()
+    page, per_page = decode_page_cursor(cursor, limit)
+    access_token = await get_zoho_access_token_async()
     try:
-        invoices = retainer_invoice_service.list_retainer_invoices_for_customer(access_token, current_user.email)
+        invoices, page_context = await retainer_invoice_service.list_retainer_invoices_for_customer(
+            access_token, current_user.email, page, per_page
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching retainer invoices: {str(e)}")
 
-    return {"retainer_invoices": invoices}
+    return {"retainer_invoices": invoices, "next_cursor": next_page_cursor(page_context, page, per_page)}
 
 
 @router.put("/review/{retainerinvoice_id}", response_model=zohoschemas.RetainerInvoiceResponse, status_code=status.HTTP_200_OK)
-def review_retainer_invoice(retainerinvoice_id: str, payload: zohoschemas.ReviewRetainerInvoice, current_user=Depends(get_current_user)):
+async def review_retainer_invoice(retainerinvoice_id: str, payload: zohoschemas.ReviewRetainerInvoice, current_user=Depends(get_current_user)):
     """
     ERP Review Retainer Invoice:
     - Approve or reject draft retainer invoice
     - Add comments or adjustments
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        updated = retainer_invoice_service.review_retainer_invoice(
+        updated = await retainer_invoice_service.review_retainer_invoice(
             access_token=access_token,
             retainerinvoice_id=retainerinvoice_id,
             payload=payload,
@@ -78,14 +89,14 @@ def review_retainer_invoice(retainerinvoice_id: str, payload: zohoschemas.Review
 
 
 @router.put("/approve/{retainerinvoice_id}", response_model=zohoschemas.RetainerInvoiceResponse, status_code=status.HTTP_200_OK)
-def approve_retainer_invoice(retainerinvoice_id: str, payload: zohoschemas.ApproveRetainerInvoice, current_user=Depends(get_current_user)):
+async def approve_retainer_invoice(retainerinvoice_id: str, payload: zohoschemas.ApproveRetainerInvoice, current_user=Depends(get_current_user)):
     """
     Customer Approval:
     - Approve or reject reviewed retainer invoice
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = retainer_invoice_service.customer_approve_retainer_invoice(
+        result = await retainer_invoice_service.customer_approve_retainer_invoice(
             access_token=access_token,
             retainerinvoice_id=retainerinvoice_id,
             payload=payload,
@@ -103,13 +114,13 @@ def approve_retainer_invoice(retainerinvoice_id: str, payload: zohoschemas.Appro
 
 
 @router.get("/{retainerinvoice_id}", status_code=status.HTTP_200_OK)
-def get_retainer_invoice(retainerinvoice_id: str, current_user=Depends(get_current_user)):
+async def get_retainer_invoice(retainerinvoice_id: str, current_user=Depends(get_current_user)):
     """
     Get Retainer Invoice Details
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        invoice = retainer_invoice_service.get_retainer_invoice(
+        invoice = await retainer_invoice_service.get_retainer_invoice(
             access_token=access_token,
             retainerinvoice_id=retainerinvoice_id,
             contact_id=current_user.email
@@ -120,24 +131,24 @@ def get_retainer_invoice(retainerinvoice_id: str, current_user=Depends(get_curre
     return invoice
 
 @router.get("/retainerinvoice/{retainerinvoice_id}/pdf", status_code=status.HTTP_200_OK)
-def get_retainer_invoice_pdf(retainerinvoice_id: str, current_user=Depends(get_current_user)):
-    access_token = get_zoho_access_token()
+async def get_retainer_invoice_pdf(retainerinvoice_id: str, current_user=Depends(get_current_user)):
+    access_token = await get_zoho_access_token_async()
     try:
-        pdf_bytes = retainer_invoice_service.get_retainer_invoice_pdf(access_token, retainerinvoice_id)
+        pdf = await retainer_invoice_service.get_retainer_invoice_pdf(access_token, retainerinvoice_id, stream=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching retainer invoice PDF: {str(e)}")
-    return Response(content=pdf_bytes, media_type="application/pdf")
+    return pdf.to_response()
 # -----------------------------
 # LIST COMMENTS
 # -----------------------------
 @router.get("/{retainerinvoice_id}/comments", status_code=status.HTTP_200_OK)
-def list_retainer_invoice_comments(retainerinvoice_id: str, current_user=Depends(get_current_user)):
+async def list_retainer_invoice_comments(retainerinvoice_id: str, current_user=Depends(get_current_user)):
     """
     Get list of comments for a Retainer Invoice
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        comments = retainer_invoice_service.list_comments(
+        comments = await retainer_invoice_service.list_comments(
             access_token,
             retainerinvoice_id
         )
@@ -151,7 +162,7 @@ def list_retainer_invoice_comments(retainerinvoice_id: str, current_user=Depends
 # ADD COMMENT
 # -----------------------------
 @router.post("/{retainerinvoice_id}/comments", status_code=status.HTTP_201_CREATED)
-def add_retainer_invoice_comment(
+async def add_retainer_invoice_comment(
     retainerinvoice_id: str,
     payload: dict,
     current_user=Depends(get_current_user)
@@ -159,7 +170,7 @@ def add_retainer_invoice_comment(
     """
     Add a comment to Retainer Invoice
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     description = payload.get("description")
     if not description:
@@ -169,7 +180,7 @@ def add_retainer_invoice_comment(
         )
 
     try:
-        comment = retainer_invoice_service.add_comment(
+        comment = await retainer_invoice_service.add_comment(
             access_token=access_token,
             retainerinvoice_id=retainerinvoice_id,
             description=description,
@@ -192,7 +203,7 @@ def add_retainer_invoice_comment(
 # UPDATE COMMENT
 # -----------------------------
 @router.put("/{retainerinvoice_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def update_retainer_invoice_comment(
+async def update_retainer_invoice_comment(
     retainerinvoice_id: str,
     comment_id: str,
     payload: dict,
@@ -201,10 +212,10 @@ def update_retainer_invoice_comment(
     """
     Update an existing comment in a Retainer Invoice
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        updated = retainer_invoice_service.update_comment(
+        updated = await retainer_invoice_service.update_comment(
             access_token,
             retainerinvoice_id,
             comment_id,
@@ -223,7 +234,7 @@ def update_retainer_invoice_comment(
 # DELETE COMMENT
 # -----------------------------
 @router.delete("/{retainerinvoice_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def delete_retainer_invoice_comment(
+async def delete_retainer_invoice_comment(
     retainerinvoice_id: str,
     comment_id: str,
     current_user=Depends(get_current_user)
@@ -231,10 +242,10 @@ def delete_retainer_invoice_comment(
     """
     Delete a comment from Retainer Invoice
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        deleted = retainer_invoice_service.delete_comment(
+        deleted = await retainer_invoice_service.delete_comment(
             access_token,
             retainerinvoice_id,
             comment_id
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Response, status, HTTPException, Query
 from auth_utils import get_current_user
 import schemas
 from services.sales_order_service import SalesOrderService
-from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_auth_service import get_zoho_access_token_async
 import zohoschemas
+import config
+from utils.page_cursor import decode_page_cursor, next_page_cursor
 
 router = APIRouter(
     prefix="/zohoorders",
@@ -15,15 +18,15 @@ sales_order_service = SalesOrderService()
 
 
 @router.post("/request", response_model=zohoschemas.SalesOrderResponse, status_code=status.HTTP_201_CREATED)
-def request_sales_order(payload: zohoschemas.RequestSalesOrder, current_user=Depends(get_current_user)):
+async def request_sales_order(payload: zohoschemas.RequestSalesOrder, current_user=Depends(get_current_user)):
     """
     Request Sales Order:
     - Creates DRAFT sales order in Zoho Books
     - ERP/Sales team completes & sends
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        order = sales_order_service.create_draft_order(access_token, payload)
+        order = await sales_order_service.create_draft_order(access_token, payload)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -38,29 +41,37 @@ def request_sales_order(payload: zohoschemas.RequestSalesOrder, current_user=Dep
 
 
 @router.get("/my", status_code=status.HTTP_200_OK)
-def list_my_orders(current_user=Depends(get_current_user)):
+async def list_my_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(config.ZOHO_PAGE_SIZE, ge=1, le=config.ZOHO_PAGE_SIZE),
+    current_user=Depends(get_current_user)
+):
     """
     List Sales Orders for the logged-in customer.
+    Pass next_cursor back as ?cursor= for the following page.
     """
-    access_token = get_zoho_access_token()
+    page, per_page = decode_page_cursor(cursor, limit)
+    access_token = await get_zoho_access_token_async()
     try:
-        orders = sales_order_service.list_orders_for_customer(access_token, current_user.email)
+        orders, page_context = await sales_order_service.list_orders_for_customer(
+            access_token, current_user.email, page, per_page
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching sales orders: {str(e)}")
 
-    return {"orders": orders}
+    return {"orders": orders, "next_cursor": next_page_cursor(page_context, page, per_page)}
 
 
 @router.put("/review/{salesorder_id}", response_model=zohoschemas.SalesOrderResponse, status_code=status.HTTP_200_OK)
-def review_order(salesorder_id: str, payload: zohoschemas.ReviewSalesOrder, current_user=Depends(get_current_user)):
+async def review_order(salesorder_id: str, payload: zohoschemas.ReviewSalesOrder, current_user=Depends(get_current_user)):
     """
     ERP Review Sales Order:
     - Approve or reject draft order
     - Add comments or adjustments
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        updated = sales_order_service.review_order(
+        updated = await sales_order_service.review_order(
             access_token=access_token,
             salesorder_id=salesorder_id,
             payload=payload,
@@ -79,14 +90,14 @@ def review_order(salesorder_id: str, payload: zohoschemas.ReviewSalesOrder, curr
 
 
 @router.put("/approve/{salesorder_id}", response_model=zohoschemas.SalesOrderResponse, status_code=status.HTTP_200_OK)
-def approve_order(salesorder_id: str, payload: zohoschemas.ApproveSalesOrder, current_user=Depends(get_current_user)):
+async def approve_order(salesorder_id: str, payload: zohoschemas.ApproveSalesOrder, current_user=Depends(get_current_user)):
     """
     Customer Approval:
     - Approve or reject reviewed sales order
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        result = sales_order_service.customer_approve_order(
+        result = await sales_order_service.customer_approve_order(
             access_token=access_token,
             salesorder_id=salesorder_id,
             payload=payload,
@@ -104,13 +115,13 @@ def approve_order(salesorder_id: str, payload: zohoschemas.ApproveSalesOrder, cu
 
 
 @router.get("/{salesorder_id}", status_code=status.HTTP_200_OK)
-def get_order(salesorder_id: str, current_user=Depends(get_current_user)):
+async def get_order(salesorder_id: str, current_user=Depends(get_current_user)):
     """
     Get Sales Order Details
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        order = sales_order_service.get_order(
+        order = await sales_order_service.get_order(
             access_token=access_token,
             salesorder_id=salesorder_id,
             contact_id=current_user.email
@@ -125,17 +136,17 @@ def get_order(salesorder_id: str, current_user=Depends(get_current_user)):
 # COMMENTS: ADD
 # ------------------------------------
 @router.post("/{salesorder_id}/comments", status_code=status.HTTP_201_CREATED)
-def add_comment(salesorder_id: str, payload: dict, current_user=Depends(get_current_user)):
+async def add_comment(salesorder_id: str, payload: dict, current_user=Depends(get_current_user)):
     """
     Add a comment to a Sales Order
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     
     description = payload.get("description", "")
     show_to_client = payload.get("show_comment_to_clients", True)
     
     try:
-        result = sales_order_service.add_comment(
+        result = await sales_order_service.add_comment(
             access_token=access_token,
             salesorder_id=salesorder_id,
             description=description,
@@ -150,15 +161,15 @@ def add_comment(salesorder_id: str, payload: dict, current_user=Depends(get_curr
 # COMMENTS: UPDATE
 # ------------------------------------
 @router.put("/{salesorder_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def update_comment(salesorder_id: str, comment_id: str, payload: dict, current_user=Depends(get_current_user)):
+async def update_comment(salesorder_id: str, comment_id: str, payload: dict, current_user=Depends(get_current_user)):
     """
     Update an existing comment
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     desc = payload.get("description", "")
 
     try:
-        result = sales_order_service.update_comment(
+        result = await sales_order_service.update_comment(
             access_token=access_token,
             salesorder_id=salesorder_id,
             comment_id=comment_id,
@@ -172,14 +183,14 @@ def update_comment(salesorder_id: str, comment_id: str, payload: dict, current_u
 # COMMENTS: DELETE
 # ------------------------------------
 @router.delete("/{salesorder_id}/comments/{comment_id}", status_code=status.HTTP_200_OK)
-def delete_comment(salesorder_id: str, comment_id: str, current_user=Depends(get_current_user)):
+async def delete_comment(salesorder_id: str, comment_id: str, current_user=Depends(get_current_user)):
     """
     Delete a comment from Sales Order
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        result = sales_order_service.delete_comment(
+        result = await sales_order_service.delete_comment(
             access_token=access_token,
             salesorder_id=salesorder_id,
             comment_id=comment_id
@@ -192,14 +203,14 @@ def delete_comment(salesorder_id: str, comment_id: str, current_user=Depends(get
 # COMMENTS: LIST
 # ------------------------------------
 @router.get("/{salesorder_id}/comments", status_code=status.HTTP_200_OK)
-def get_comments(salesorder_id: str, current_user=Depends(get_current_user)):
+async def get_comments(salesorder_id: str, current_user=Depends(get_current_user)):
     """
     Get all comments for a Sales Order
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        comments = sales_order_service.get_comments(
+        comments = await sales_order_service.get_comments(
             access_token=access_token,
             salesorder_id=salesorder_id
         )
@@ -208,15 +219,21 @@ def get_comments(salesorder_id: str, current_user=Depends(get_current_user)):
 
     return {"comments": comments}
 @router.get("/{salesorder_id}/pdf", status_code=status.HTTP_200_OK)
-def get_order_pdf(salesorder_id: str, current_user=Depends(get_current_user)):
+async def get_order_pdf(
+    salesorder_id: str,
+    if_none_match: str | None = Header(None),
+    current_user=Depends(get_current_user),
+):
     """
     Get Sales Order PDF
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        pdf_bytes = sales_order_service.get_order_pdf(
+        pdf = await sales_order_service.get_order_pdf(
             access_token=access_token,
-            salesorder_id=salesorder_id
+            salesorder_id=salesorder_id,
+            stream=True,
+            if_none_match=if_none_match
         )
     except HTTPException as e:
         raise e
@@ -226,4 +243,5 @@ def get_order_pdf(salesorder_id: str, current_user=Depends(get_current_user)):
             detail=f"Error fetching sales order PDF: {str(e)}"
         )
 
-    return Response(content=pdf_bytes, media_type="application/pdf")
+    # Cached file, 304, or Zoho's PDF body piped through chunk by chunk
+    return pdf.to_response()
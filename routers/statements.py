@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException
+from fastapi import APIRouter, Depends, Header, Response, status, HTTPException
 from fastapi.params import Query
 from auth_utils import get_current_user
 from services.statement_service import StatementService
-from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_auth_service import get_zoho_access_token_async
 
 router = APIRouter(
     prefix="/zohostatements",
@@ -13,7 +13,7 @@ router = APIRouter(
 statement_service = StatementService()
 
 @router.post("/email", status_code=status.HTTP_200_OK)
-def email_statement(
+async def email_statement(
     start_date: str | None = Query(None),
     end_date: str | None = Query(None),
     current_user=Depends(get_current_user)
@@ -22,10 +22,10 @@ def email_statement(
     Sends Customer Statement Email.
     Uses current_user.email as the customer identifier.
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        result = statement_service.email_customer_statement(
+        result = await statement_service.email_customer_statement(
             access_token=access_token,
             contact_id=current_user.email,
             start_date=start_date,
@@ -39,14 +39,14 @@ def email_statement(
             detail=f"Error emailing statement: {str(e)}"
         )
 @router.get("/email/history", status_code=status.HTTP_200_OK)
-def get_statement_email_history(current_user=Depends(get_current_user)):
+async def get_statement_email_history(current_user=Depends(get_current_user)):
     """
     Returns statement email history for current_user.email
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        history = statement_service.get_statement_email_history(
+        history = await statement_service.get_statement_email_history(
             access_token,
             current_user.email
         )
@@ -61,49 +61,51 @@ def get_statement_email_history(current_user=Depends(get_current_user)):
 
 
 @router.get("/{contact_id}/email", status_code=status.HTTP_200_OK)
-def get_statement_email_history(contact_id: str, current_user=Depends(get_current_user)):
+async def get_statement_email_history(contact_id: str, current_user=Depends(get_current_user)):
     """
     Get Statement Email History:
     - Returns list of statement emails sent to the customer
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
     try:
-        history = statement_service.get_statement_email_history(access_token, current_user.email)
+        history = await statement_service.get_statement_email_history(access_token, current_user.email)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching statement email history: {str(e)}")
     return {"history": history}
 
 @router.post("/statement/{contact_id}/email", status_code=status.HTTP_200_OK)
-def email_statement_pdf(contact_id: str, current_user=Depends(get_current_user)):
-    access_token = get_zoho_access_token()
+async def email_statement_pdf(contact_id: str, current_user=Depends(get_current_user)):
+    access_token = await get_zoho_access_token_async()
     try:
-        result = statement_service.email_customer_statement(access_token, current_user.email)
+        result = await statement_service.email_customer_statement(access_token, current_user.email)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error emailing statement PDF: {str(e)}")
     return {"message": "Statement emailed successfully", "result": result}
 @router.get("/pdf", status_code=200)
-def get_statement_pdf(
+async def get_statement_pdf(
     start_date: str | None = Query(None),
     end_date: str | None = Query(None),
+    if_none_match: str | None = Header(None),
     current_user=Depends(get_current_user),
 ):
     """
     Returns Customer Statement PDF (inline browser preview).
     Uses current_user.email as contact ID.
     """
-    access_token = get_zoho_access_token()
+    access_token = await get_zoho_access_token_async()
 
     try:
-        pdf_bytes = statement_service.get_statement_pdf(
+        pdf = await statement_service.get_statement_pdf(
             access_token=access_token,
             contact_id=current_user.email,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            stream=True,
+            if_none_match=if_none_match
         )
 
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
+        # Cached file, 304, or Zoho's PDF body piped through chunk by chunk
+        return pdf.to_response(
             headers={
                 "Content-Disposition": f"inline; filename=statement_{current_user.email}.pdf"
             }
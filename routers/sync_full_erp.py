@@ -1,522 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from auth_utils import get_current_user
-from database import get_db
-from services.erp_service import ERPService
-from services.syn_full_erp_service import  ERPSyncService
+from services.erp_sync_jobs import JOB_COMPLETED, JOB_FAILED, SYNC_ENTITIES, erp_sync_jobs
 from fastapi import Query
-
-from models import Division, Product, ProductCategory, ProductSubCategory, User, UserDocument
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from database import SessionLocal
+from services.syn_full_erp_service import ERPSyncService
 
 router = APIRouter(prefix="/erp", tags=["ERP Sync"],dependencies=[Depends(get_current_user)])
 
+
+async def start_sync_job(entity: str, response: Response, current_user, wait: bool, params: Optional[dict] = None):
+    """
+    Queue a background ERP sync (202 + job id).
+    wait=true blocks until it finishes (up to ERP_SYNC_WAIT_SECONDS)
+    and returns the sync result like the old inline endpoints.
+    """
+    job = await erp_sync_jobs.enqueue(entity, params, requested_by=getattr(current_user, "id", None))
+
+    if wait:
+        job = await erp_sync_jobs.wait(job["job_id"])
+        if job["status"] == JOB_COMPLETED:
+            return job["result"]
+        if job["status"] == JOB_FAILED:
+            raise HTTPException(status_code=400, detail=job["error"])
+
+    response.status_code = status.HTTP_202_ACCEPTED
+    return {
+        "status": job["status"],
+        "job_id": job["job_id"],
+        "entity": entity,
+        "status_url": f"/erp/jobs/{job['job_id']}"
+    }
+
+
 @router.post(
     "/sync_erp_vendor",
     summary="Sync pending vendor data to ERP",
-    description="Sync all users whose ERP status is pending or NULL."
+    description="Sync all users whose ERP status is pending or NULL (background job)."
 )
-async def sync_erp_vendor(db: Session = Depends(get_db)):
+async def sync_erp_vendor(
+    response: Response,
+    wait: bool = Query(False),
+    changes_only: bool = Query(False, description="Only users changed since the last outbox sync"),
+    current_user=Depends(get_current_user),
+):
     """
     Sync ERP vendor data for all users whose ERP sync status is pending or NULL.
     Handles INSERT and UPDATE separately.
     """
-    try:
-        await ERPService.init_pool()  # ensure asyncpg pool is ready
-
-        payload = ERPSyncService.build_party_json(db)
-
-        insert_payload = payload.get("insert", [])
-        update_payload = payload.get("update", [])
-
-        insert_result = []
-        update_result = []
-
-        # ------------------------------------------------------------------
-        # INSERT LOGIC (No erp_external_id)
-        # ------------------------------------------------------------------
-        if insert_payload:
-            insert_result = await ERPService.insert_data(insert_payload)
-
-            # Save returned ERP IDs to user table
-            for rec in insert_result:
-                if "partymast" in rec:
-                    new_id = rec["partymast"]["partymastid"]
-                    user_id = rec["partymast"]["versionid"]
+    params = {"changes_only": True} if changes_only else None
+    return await start_sync_job("vendor", response, current_user, wait, params)
 
-                    user = db.query(User).filter(User.id == user_id).first()
-                    if user:
-                        user.erp_external_id = new_id
-                        user.erp_sync_status = "completed"
-                        db.add(user)
-
-            db.commit()
-
-        # ------------------------------------------------------------------
-        # UPDATE LOGIC (Has erp_external_id)
-        # ------------------------------------------------------------------
-        if update_payload:
-            update_result = await ERPService.update_data(update_payload)
-
-            # Mark these users as completed
-            update_user_ids = [
-                item["partymast"]["versionid"]
-                for item in update_payload
-            ]
-            db.query(User).filter(User.id.in_(update_user_ids)).update(
-                {User.erp_sync_status: "completed"},
-                synchronize_session=False
-            )
-            db.commit()
-
-        # ------------------------------------------------------------------
-        # FINAL RESPONSE
-        # ------------------------------------------------------------------
-        return {
-            "status": "success",
-            "inserted": insert_result,
-            "updated": update_result
-        }
-
-    except HTTPException as e:
-        if e.status_code == status.HTTP_404_NOT_FOUND:
-            return {
-                "status": "no-pending-users",
-                "inserted": [],
-                "updated": []
-            }
-        raise e
-
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get(
     "/sync_products",
     summary="Sync products to ERP",
-    description="Fetch all products in ERP Itemmaster format and sync."
+    description="Fetch all products in ERP Itemmaster format and sync (background job)."
 )
-async def sync_erp_products(db: Session = Depends(get_db)):
-    try:
-        # Ensure PostgreSQL pool is ready
-        await ERPService.init_pool()
-
-        # Build ERP payload
-        payload = await ERPSyncService.build_itemmaster_json(db)
-        insert_payload = payload.get("insert", [])
-        update_payload = payload.get("update", [])
-
-        insert_result = []
-        update_result = []
-        synced_product_ids = []
-
-        # ------------------ INSERT ------------------
-        if insert_payload:
-            insert_result = await ERPService.insert_item_with_tax(insert_payload)
-
-            for rec in insert_result:
-                item = rec.get("itemmaster")
-                if not item:
-                    continue
-
-                erp_id = item.get("itemmasterid")
-                sku = item.get("sku")       # ✅ Correct mapping
-
-                if not sku or not erp_id:
-                    continue
-
-                product = (
-                    db.query(Product)
-                    .filter(Product.sku == sku)
-                    .first()
-                )
-
-                if product:
-                    product.erp_external_id = erp_id
-                    synced_product_ids.append(product.id)
-
-            db.commit()
-
-        # ------------------ UPDATE ------------------
-        if update_payload:
-            update_result = await ERPService.update_data(update_payload)
-
-            for rec in update_result:
-                item = rec.get("itemmaster")
-                if not item:
-                    continue
-
-                sku = item.get("sku")      # ✅ Correct mapping
-
-                if not sku:
-                    continue
-
-                product = (
-                    db.query(Product)
-                    .filter(Product.sku == sku)
-                    .first()
-                )
-
-                if product:
-                    synced_product_ids.append(product.id)
-
-        # ----------- MARK SYNC COMPLETED ------------
-        if synced_product_ids:
-            db.query(Product).filter(
-                Product.id.in_(synced_product_ids)
-            ).update(
-                {"erp_sync_status": "completed"},
-                synchronize_session=False
-            )
-            db.commit()
-
-        return {
-            "status": "success",
-            "inserted": insert_result,
-            "updated": update_result
-        }
-
-    except HTTPException as e:
-        if e.status_code == status.HTTP_404_NOT_FOUND:
-            return {
-                "status": "success",
-                "message": "No pending products to sync",
-                "inserted": [],
-                "updated": []
-            }
-        raise e
-
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail=str(e))
-
+async def sync_erp_products(
+    response: Response,
+    wait: bool = Query(False),
+    changes_only: bool = Query(False, description="Only products changed since the last outbox sync"),
+    current_user=Depends(get_current_user),
+):
+    params = {"changes_only": True} if changes_only else None
+    return await start_sync_job("products", response, current_user, wait, params)
 
 
 @router.get("/sync_ombasic")
-async def sync_erp_ombasic(db: Session = Depends(get_db)):
-    try:
-        await ERPService.init_pool()
-
-        payload = ERPSyncService.build_ombasic_json(db)
-        insert_payload = payload.get("insert", [])
-        update_payload = payload.get("update", [])
-
-        inserted = []
-        updated = []
-        omdetail_inserted = []
-        omdetail_updated = []
-        synced_doc_ids = []
-
-        # ================== INSERT ==================
-        if insert_payload:
-            inserted_list = await ERPService.insert_data(insert_payload)
-
-            for item in inserted_list:
-                if "ombasic" not in item:
-                    continue
-
-                rec = item["ombasic"]
-                omno = rec.get("omno")
-                ombasicid = rec.get("ombasicid")
-
-                doc = db.query(UserDocument).filter(
-                    UserDocument.om_number == omno
-                ).first()
-
-                if not doc:
-                    continue
-
-                # Save ERP ID
-                doc.erp_external_id = ombasicid
-                doc.erp_sync_status = "completed"
-                synced_doc_ids.append(doc.id)
-                user_id = doc.user_id
-
-                db.commit()
-                inserted.append(rec)
-
-                # -------- OMDDETAIL INSERT (BATCH) --------
-                details = ERPSyncService.build_omdetail(
-                    db=db,
-                    ombasic_id=ombasicid,
-                    company_id=user_id
-                )
-
-                if details:
-                    import asyncio
-                    await asyncio.sleep(0.5)  # allow ERP to commit OMBASIC
-
-                    result = await ERPService.insert_data(details)
-                    omdetail_inserted.extend(result)
-
-        # ================== UPDATE ==================
-        if update_payload:
-            updated_list = await ERPService.update_data(update_payload)
-
-            for item in updated_list:
-                if "ombasic" not in item:
-                    continue
-
-                rec = item["ombasic"]
-                omno = rec.get("omno")
-
-                doc = db.query(UserDocument).filter(
-                    UserDocument.om_number == omno
-                ).first()
-
-                if not doc:
-                    continue
-
-                doc.erp_sync_status = "completed"
-                synced_doc_ids.append(doc.id)
-                user_id = doc.user_id
-                ombasicid = doc.erp_external_id
-
-                db.commit()
-                updated.append(rec)
-
-                # -------- OMDDETAIL UPDATE (BATCH) --------
-                details = ERPSyncService.build_omdetail(
-                    db=db,
-                    ombasic_id=ombasicid,
-                    company_id=user_id
-                )
-
-                if details:
-                    import asyncio
-                    await asyncio.sleep(0.5)
-
-                    result = await ERPService.update_data(details)
-                    omdetail_updated.extend(result)
-
-        return {
-            "status": "success",
-            "ombasic_inserted": inserted,
-            "ombasic_updated": updated,
-            "omdetail_inserted": omdetail_inserted,
-            "omdetail_updated": omdetail_updated,
-            "synced_document_ids": synced_doc_ids
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
+async def sync_erp_ombasic(
+    response: Response,
+    wait: bool = Query(False),
+    current_user=Depends(get_current_user),
+):
+    return await start_sync_job("ombasic", response, current_user, wait)
 
 
 @router.post("/sync_erp_vendor_documents")
 async def sync_erp_vendor_documents(
+    response: Response,
     folder_name: str = "vendor",
-    db: Session = Depends(get_db)
+    wait: bool = Query(False),
+    current_user=Depends(get_current_user),
 ):
-    try:
-        await ERPService.init_pool()  # always initialize connection pool
+    return await start_sync_job(
+        "vendor_documents", response, current_user, wait,
+        params={"folder_name": folder_name}
+    )
 
-        # MUST await because the service method is async
-        data = await ERPSyncService.fetch_and_insert_partymastdoc(
-            db=db,
-            folder_name=folder_name
-        )
 
-        return {
-            "status": "success",
-            "message": f"{len(data)} documents synced",
-            "inserted": data
-        }
+@router.get(
+    "/vendor_documents/export",
+    summary="Stream pending vendor documents (NDJSON)",
+    description="One line per pending vendor with its bank, tax and user documents (file_data base64). Read-only: sync status is left to the sync jobs."
+)
+def export_vendor_documents(folder_name: str = "vendor"):
+    def lines():
+        # Own session: the stream outlives the request dependencies
+        db = SessionLocal()
+        try:
+            yield from ERPSyncService.iter_vendor_documents(db, folder_name=folder_name)
+        finally:
+            db.close()
 
-    except AttributeError:
-        raise HTTPException(
-            status_code=500,
-            detail="Error: fetch_and_insert_partymastdoc() not found or not marked async"
-        )
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sync_branchmast")
-async def sync_erp_branchmast(db: Session = Depends(get_db)):
-    try:
-        # Ensure PostgreSQL pool is ready
-        await ERPService.init_pool()
-
-        # Build ERP payload
-        payload = ERPSyncService.build_branchmast_json(db)
-        insert_payload = payload.get("insert", [])
-        update_payload = payload.get("update", [])
-
-        insert_result = []
-        update_result = []
-
-        synced_division_ids = []
-
-        # ---------- INSERT ----------
-        if insert_payload:
-            insert_result = await ERPService.insert_data(insert_payload)
-
-            # Save returned erp_external_id into Division table
-            for rec in insert_result:
-                branch = rec.get("branchmast")
-                if branch:
-                    branch_id = branch.get("branchmastid")
-                    branch_name = branch.get("branchname")
-
-                    division = db.query(Division).filter(
-                        Division.division_name == branch_name
-                    ).first()
-
-                    if division:
-                        division.erp_external_id = branch_id
-                        synced_division_ids.append(division.id)
-                        db.add(division)
-
-            db.commit()
-
-        # ---------- UPDATE ----------
-        if update_payload:
-            update_result = await ERPService.update_data(update_payload)
-
-            # Mark divisions updated as synced
-            for rec in update_result:
-                branch = rec.get("branchmast")
-                if branch:
-                    branch_name = branch.get("branchname")
-                    division = db.query(Division).filter(
-                        Division.division_name == branch_name
-                    ).first()
-                    if division:
-                        synced_division_ids.append(division.id)
-
-        # ---------- MARK ERP SYNC COMPLETED ----------
-        if synced_division_ids:
-            db.query(Division).filter(Division.id.in_(synced_division_ids)).update(
-                {"erp_sync_status": "completed"},
-                synchronize_session=False
-            )
-            db.commit()
+async def sync_erp_branchmast(
+    response: Response,
+    wait: bool = Query(False),
+    current_user=Depends(get_current_user),
+):
+    return await start_sync_job("branchmast", response, current_user, wait)
 
-        return {
-            "status": "success",
-            "inserted": insert_result,
-            "updated": update_result
-        }
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
 @router.get("/sync_igdetail")
-async def sync_erp_igdetail(db: Session = Depends(get_db)):
-    try:
-        await ERPService.init_pool()
-
-        igdetail_inserted = []
-        igdetail_updated = []
-        igsdetail_inserted = []
-
-        # ================= IGDETAIL =================
-        payload = ERPSyncService.build_igdetail_json(db)
-        insert_payload = payload["insert"]
-        update_payload = payload["update"]
-
-        # -------- INSERT IGDETAIL --------
-        if insert_payload:
-            inserted = await ERPService.insert_data(insert_payload)
-
-            for item in inserted:
-                rec = item.get("igdetail")
-                if not rec:
-                    continue
-
-                subgroup = rec["subgroup"]
-                igdetailid = rec["igdetailid"]
-
-                category = db.query(ProductCategory).filter(
-                    ProductCategory.name == subgroup
-                ).first()
-
-                if not category:
-                    continue
-
-                category.erp_external_id = igdetailid
-                category.erp_sync_status = "completed"
-                db.commit()
-
-                igdetail_inserted.append(rec)
-
-                # -------- IGSDETAIL (NEW CATEGORY) --------
-                details = ERPSyncService.build_igsdetail_json(
-                    db=db,
-                    igdetail_id=igdetailid,
-                    category_id=category.id
-                )
-
-                if details:
-                    import asyncio
-                    await asyncio.sleep(0.5)
-
-                    result = await ERPService.insert_data(details)
-
-                    for res in result:
-                        igs = res.get("igsdetail")
-                        if not igs:
-                            continue
-
-                        sub = db.query(ProductSubCategory).filter(
-                            ProductSubCategory.name == igs["subgroup2"],
-                            ProductSubCategory.category_id == category.id
-                        ).first()
-
-                        if sub:
-                            sub.erp_external_id = igs["igsdetailid"]
-                            sub.erp_sync_status = "completed"
-                            db.commit()
-
-                    igsdetail_inserted.extend(result)
-
-        # -------- UPDATE IGDETAIL --------
-        if update_payload:
-            updated = await ERPService.update_data(update_payload)
-
-            for item in updated:
-                rec = item.get("igdetail")
-                if not rec:
-                    continue
-
-                category = db.query(ProductCategory).filter(
-                    ProductCategory.name == rec["subgroup"]
-                ).first()
-
-                if category:
-                    category.erp_sync_status = "completed"
-                    db.commit()
-                    igdetail_updated.append(rec)
-
-        # ================= IGSDETAIL ONLY (EXISTING CATEGORY) =================
-        igs_only_payload = ERPSyncService.build_igsdetail_only(db)
-
-        if igs_only_payload:
-            result = await ERPService.insert_data(igs_only_payload)
-
-            for item in result:
-                igs = item.get("igsdetail")
-                if not igs:
-                    continue
-
-                sub = db.query(ProductSubCategory).filter(
-                    ProductSubCategory.name == igs["subgroup2"]
-                ).first()
+async def sync_erp_igdetail(
+    response: Response,
+    wait: bool = Query(False),
+    current_user=Depends(get_current_user),
+):
+    return await start_sync_job("igdetail", response, current_user, wait)
 
-                if sub:
-                    sub.erp_external_id = igs["igsdetailid"]
-                    sub.erp_sync_status = "completed"
-                    db.commit()
 
-            igsdetail_inserted.extend(result)
+# ------------------------------------------------------------------
+# JOB STATUS
+# ------------------------------------------------------------------
+@router.get("/jobs", summary="Recent ERP sync jobs")
+async def list_erp_sync_jobs(
+    entity: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+):
+    if entity and entity not in SYNC_ENTITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown ERP sync entity: {entity}")
+    return {"jobs": await run_in_threadpool(erp_sync_jobs.recent, entity, limit)}
 
-        return {
-            "status": "success",
-            "igdetail_inserted": igdetail_inserted,
-            "igdetail_updated": igdetail_updated,
-            "igsdetail_inserted": igsdetail_inserted
-        }
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+@router.get("/jobs/{job_id}", summary="ERP sync job status")
+async def get_erp_sync_job(job_id: str):
+    """
+    Status, progress (done / total), error and, once completed,
+    the sync result of a background ERP sync job.
+    """
+    job = await run_in_threadpool(erp_sync_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ERP sync job not found")
+    return job
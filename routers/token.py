@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Form, HTTPException
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from database import get_db
-from auth_utils import authenticate_user, create_access_token, create_refresh_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth_utils import authenticate_user, build_access_claims, create_access_token, create_refresh_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter(tags=["Auth"])
 
@@ -20,7 +20,7 @@ def login_for_access_token(
     user = result["user"]
 
     access_token = create_access_token(
-        data={"sub": str(user.id)},
+        data=build_access_claims(db, user),
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
@@ -7,7 +7,7 @@ from pydantic import BaseModel,EmailStr
 from pytest import Session
 
 #from auth import decode_access_token
-from auth_utils import decode_access_token,get_current_user
+from auth_utils import get_current_user,get_token_claims
 from database import get_db
 #from services import user_service,user_security_service
 
@@ -58,7 +58,7 @@ async def get_current_user(request: Request):
                             detail="Missing or invalid authorization header")
 
     token = auth_header.split(" ")[1]
-    payload = decode_access_token(token)
+    payload = get_token_claims(request, token)
     if not payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Invalid or expired token")
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Form
 from typing import Optional
-import requests
 import jwt  # PyJWT
 import os
 
+from services.zoho_transport import zoho_http, zoho_timeout
 from config import (
     ZOHO_CLIENT_ID, 
     ZOHO_CLIENT_SECRET,
@@ -39,11 +39,11 @@ def exchange_zoho_code(code: str = Form(...)):
     }
 
     try:
-        res = requests.post(
+        res = zoho_http.post(
             ZOHO_OAUTH_TOKEN_URL,
             data=data,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
-            timeout=10
+            timeout=zoho_timeout("oauth")
         )
 
         if res.status_code != 200:
@@ -0,0 +1,57 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from auth_utils import get_current_user
+from services.zoho_auth_service import get_zoho_access_token_async
+from services.zoho_comment_feed import COMMENT_DOCUMENTS, zoho_comment_feed
+import config
+
+router = APIRouter(
+    prefix="/zohocomments",
+    tags=["Zoho Comments"],
+    dependencies=[Depends(get_current_user)]
+)
+
+# Same comment_type rules as the per-document endpoints
+COMMENT_TYPES = {"salesorders": None}
+
+
+@router.get("/bulk", status_code=status.HTTP_200_OK)
+async def get_comment_threads(
+    document_type: str = Query(..., description="estimates | invoices | salesorders | retainerinvoices"),
+    document_ids: List[str] = Query(..., alias="document_id"),
+    include_comments: bool = Query(True),
+):
+    """
+    Comment threads of many documents in one call (list pages showing
+    comment counts). Threads load concurrently and are cached per document;
+    documents that fail are reported under "errors".
+    """
+    if document_type not in COMMENT_DOCUMENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported document_type: {document_type}"
+        )
+    if len(document_ids) > config.ZOHO_COMMENT_BULK_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {config.ZOHO_COMMENT_BULK_MAX_DOCUMENTS} documents per request"
+        )
+
+    access_token = await get_zoho_access_token_async()
+    threads, errors = await zoho_comment_feed.get_many(
+        access_token,
+        document_type,
+        document_ids,
+        comment_type=COMMENT_TYPES.get(document_type, "client"),
+    )
+
+    return {
+        "threads": {
+            document_id: {
+                "comment_count": len(comments),
+                **({"comments": comments} if include_comments else {}),
+            }
+            for document_id, comments in threads.items()
+        },
+        "errors": errors,
+    }
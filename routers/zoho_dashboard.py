@@ -9,12 +9,12 @@ router = APIRouter(prefix="/zoho/dashboard", tags=["Zoho Dashboard"])
 contact_service = ZohoContactService()
 
 @router.get("/my")
-def get_dashboard_summary(current_user = Depends(get_current_user)):
-    contact = contact_service.get_contact_id_by_email(current_user.email)
+async def get_dashboard_summary(current_user = Depends(get_current_user)):
+    contact = await contact_service.get_contact_id_by_email(current_user.email)
     contact_id = contact.get("contact_id")
 
     return {
         "code": 0,
         "message": "success",
-        "data": zoho_dashboard_service.build_dashboard_summary(contact_id)
+        "data": await zoho_dashboard_service.get_dashboard_summary(contact_id)
     }
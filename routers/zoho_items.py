@@ -1,5 +1,8 @@
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from auth_utils import get_current_user
+import config
+from services.zoho_item_catalog import zoho_item_catalog
 from services.zoho_item_service import ZohoItemService
 
 router = APIRouter(
@@ -11,23 +14,38 @@ item_service = ZohoItemService()
 
 
 @router.get("/")
-def list_items(
+async def list_items(
     page: int = 1,
     per_page: int = 200,
     search: str | None = None
 ):
     """
     Fetch Zoho Books items (products/services)
+    Served from the local item catalog once its startup load completes;
+    Zoho is queried directly until then
     """
-    return item_service.get_items(
+    if config.ZOHO_ITEM_CATALOG_ENABLED and zoho_item_catalog.loaded:
+        try:
+            return await zoho_item_catalog.search(
+                search_text=search,
+                page=page,
+                per_page=per_page
+            )
+        except Exception as e:
+            print(f"[WARN] Item catalog unavailable, querying Zoho: {e}")
+
+    return await run_in_threadpool(
+        item_service.get_items,
         page=page,
         per_page=per_page,
         search_text=search
     )
 @router.get("/taxes")
-def list_taxes():
+async def list_taxes():
     """
     Fetch all taxes configured in Zoho Books.
     Useful for retrieving tax_id values required in quotes/invoices.
     """
-    return item_service.get_taxes()
+    if config.ZOHO_ITEM_CATALOG_ENABLED:
+        return await zoho_item_catalog.get_taxes()
+    return await run_in_threadpool(item_service.get_taxes)
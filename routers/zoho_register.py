@@ -8,6 +8,7 @@ from services.contact_service import ContactService
 from typing import List
 
 from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_rate_limiter import zoho_bulk_priority
 
 # We reuse your existing UserService for email/phone checks
 from services.user_service import UserService 
@@ -78,7 +79,9 @@ def sync_zoho_customers(
     try:
         access_token = get_zoho_access_token()
         sync_service = ZohoUserSyncService(db, access_token)
-        result = sync_service.sync_customers()
+        # Bulk lane: portal calls keep priority on the Zoho rate limiter
+        with zoho_bulk_priority():
+            result = sync_service.sync_customers()
 
         return {
             "message": "Zoho customers synced successfully",
@@ -3,8 +3,8 @@ from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from datetime import timedelta
 
-from auth_utils import create_access_token, create_refresh_token
-from models import UserSession
+from auth_utils import build_access_claims, create_access_token, create_refresh_token
+from models import User, UserSession
 from utils.common_service import UTCDateTimeMixin
 from config import SECRET_KEY, ALGORITHM, REFRESH_TOKEN_EXPIRE_DAYS
 #from security import create_access_token, create_refresh_token
@@ -63,8 +63,15 @@ class AuthService:
                 detail="Session expired"
             )
 
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+
         # 4️⃣ Generate new tokens (ROTATION ENABLED)
-        new_access_token = create_access_token({"sub": str(user_id)})
+        new_access_token = create_access_token(build_access_claims(db, user))
         new_refresh_token = create_refresh_token(str(user_id))
 
         session.access_token = new_access_token
@@ -2,6 +2,7 @@ from fastapi import HTTPException, status
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from models import CompanyTaxInfo
+from services.erp_change_outbox import record_change
 from uuid import UUID
 
 class CompanyTaxService:
@@ -37,6 +38,7 @@ class CompanyTaxService:
             financial_year=financial_year
         )
         db.add(tax_info)
+        record_change(db, "user", company_id)
         db.commit()
         db.refresh(tax_info)
         return tax_info
@@ -50,6 +52,7 @@ class CompanyTaxService:
         for key, value in updates.items():
             setattr(tax_info, key, value)
 
+        record_change(db, "user", tax_info.company_id)
         db.commit()
         db.refresh(tax_info)
         return tax_info
@@ -59,6 +62,7 @@ class CompanyTaxService:
         tax_info = cls.get_tax_info(db, tax_id)
         if tax_info:
             db.delete(tax_info)
+            record_change(db, "user", tax_info.company_id)
             db.commit()
         return tax_info
 
@@ -118,6 +122,7 @@ class CompanyTaxService:
         )
 
         db.add(tax_info)
+        record_change(db, "user", company_id)
         db.commit()
         db.refresh(tax_info)
         return tax_info
@@ -135,6 +140,7 @@ class CompanyTaxService:
         for key, value in updates.items():
             setattr(tax_info, key, value)
 
+        record_change(db, "user", tax_info.company_id)
         db.commit()
         db.refresh(tax_info)
         return tax_info
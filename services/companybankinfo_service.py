@@ -2,6 +2,7 @@ from uuid import UUID
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from models import CompanyBankInfo
+from services.erp_change_outbox import record_change
 
 
 class CompanyBankInfoService:
@@ -29,6 +30,7 @@ class CompanyBankInfoService:
             **data,
         )
         db.add(bank_info)
+        record_change(db, "user", company_id)
         db.commit()
         db.refresh(bank_info)
         return bank_info
@@ -47,6 +49,7 @@ class CompanyBankInfoService:
             if hasattr(bank_info, key):
                 setattr(bank_info, key, value)
 
+        record_change(db, "user", bank_info.company_id)
         db.commit()
         db.refresh(bank_info)
         return bank_info
@@ -56,5 +59,6 @@ class CompanyBankInfoService:
         bank_info = cls.get_bank_info(db, bank_info_id)
         if bank_info:
             db.delete(bank_info)
+            record_change(db, "user", bank_info.company_id)
             db.commit()
         return bank_info
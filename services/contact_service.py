@@ -1,4 +1,4 @@
-import requests
+from services.zoho_transport import zoho_http, zoho_timeout
 from fastapi import HTTPException, status
 import config
 
@@ -50,7 +50,7 @@ class ContactService:
         page: int = 1,
         per_page: int = 200,
     ) -> dict:
-        response = requests.get(
+        response = zoho_http.get(
             f"{self.base_url}/contacts",
             headers=self._get_headers(access_token),
             params={
@@ -59,7 +59,7 @@ class ContactService:
                 "page": page,
                 "per_page": per_page,
             },
-            timeout=15,
+            timeout=zoho_timeout(),
         )
 
         if response.status_code != status.HTTP_200_OK:
@@ -77,12 +77,12 @@ class ContactService:
     # Create contact in Zoho
     # -------------------------------------------------
     def create_contact(self, access_token: str, payload):
-        response = requests.post(
+        response = zoho_http.post(
             f"{self.base_url}/contacts",
             headers=self._get_headers(access_token),
             params={"organization_id": self.org_id},
             json=payload.dict(),
-            timeout=15,
+            timeout=zoho_timeout(),
         )
 
         if response.status_code != status.HTTP_201_CREATED:
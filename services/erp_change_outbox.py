@@ -0,0 +1,110 @@
+import uuid
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+import config
+from models import ErpChangeOutbox, ErpSyncCursor, Product, User
+
+# Outbox entity → (model whose erp_sync_status goes back to pending, id type)
+CHANGE_ENTITIES = {
+    "user": (User, uuid.UUID),
+    "product": (Product, int),
+}
+
+# Columns the ERP sync writes itself; an update touching only these is
+# not a change to sync
+ERP_SYNC_FIELDS = {"erp_sync_status", "erp_external_id", "mts"}
+
+
+def record_change(db: Session, entity: str, *entity_ids, fields=None):
+    """
+    Append changed rows to the outbox and mark them pending again, in the
+    caller's transaction (they commit together with the write).
+    fields: the updated field names, when known.
+    """
+    if fields is not None and not set(fields) - ERP_SYNC_FIELDS:
+        return
+
+    ids = [entity_id for entity_id in entity_ids if entity_id is not None]
+    if not ids:
+        return
+
+    model, _ = CHANGE_ENTITIES[entity]
+    db.query(model).filter(model.id.in_(ids)).update(
+        {model.erp_sync_status: "pending"},
+        synchronize_session=False
+    )
+    db.add_all(ErpChangeOutbox(entity=entity, entity_id=str(entity_id)) for entity_id in ids)
+
+
+class ErpChangeFeed:
+    """
+    Reads erp_change_outbox by cursor, one cursor per sync consumer.
+
+    Rows younger than settle_seconds are left for the next read: seq is
+    assigned at insert, so a transaction committing late can land below
+    rows already visible. Changes missed that way are still pending and
+    picked up by the next full sync.
+    """
+
+    def __init__(self, settle_seconds: float, batch_size: int):
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+
+    def cursor(self, db: Session, consumer: str) -> int:
+        last_seq = db.query(ErpSyncCursor.last_seq).filter(ErpSyncCursor.consumer == consumer).scalar()
+        return last_seq or 0
+
+    def _changes(self, db: Session, consumer: str, entity: str):
+        return db.query(ErpChangeOutbox.seq, ErpChangeOutbox.entity_id).filter(
+            ErpChangeOutbox.entity == entity,
+            ErpChangeOutbox.seq > self.cursor(db, consumer),
+            ErpChangeOutbox.cts <= func.now() - timedelta(seconds=self.settle_seconds)
+        )
+
+    def read(self, db: Session, consumer: str, entity: str) -> Tuple[List, Optional[int]]:
+        """
+        Distinct changed ids (typed like the model's id) after the
+        consumer's cursor, and the seq to advance to once they are synced.
+        """
+        rows = self._changes(db, consumer, entity).order_by(ErpChangeOutbox.seq).limit(self.batch_size).all()
+        if not rows:
+            return [], None
+
+        _, id_type = CHANGE_ENTITIES[entity]
+        ids = list(dict.fromkeys(id_type(row.entity_id) for row in rows))
+        return ids, rows[-1].seq
+
+    def has_changes(self, db: Session, consumer: str, entity: str) -> bool:
+        return db.query(self._changes(db, consumer, entity).exists()).scalar()
+
+    def advance(self, db: Session, consumer: str, seq: int):
+        """Move the cursor forward (never back); the caller commits."""
+        table = ErpSyncCursor.__table__
+        db.execute(
+            pg_insert(table)
+            .values(consumer=consumer, last_seq=seq)
+            .on_conflict_do_update(
+                index_elements=[table.c.consumer],
+                set_={"last_seq": func.greatest(table.c.last_seq, seq), "mts": func.now()}
+            )
+        )
+
+    def prune(self, db: Session, consumer: str, entity: str) -> int:
+        """Delete rows the (only) consumer of entity has applied."""
+        deleted = db.query(ErpChangeOutbox).filter(
+            ErpChangeOutbox.entity == entity,
+            ErpChangeOutbox.seq <= self.cursor(db, consumer)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+
+erp_change_feed = ErpChangeFeed(
+    settle_seconds=config.ERP_OUTBOX_SETTLE_SECONDS,
+    batch_size=config.ERP_OUTBOX_BATCH_SIZE,
+)
@@ -0,0 +1,173 @@
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+import config
+
+ALLOCATION_TABLE = "erp_id_allocations"
+
+_RESERVE_SQL = f'''
+    UPDATE "{ALLOCATION_TABLE}"
+    SET "next_id" = "next_id" + $2
+    WHERE "allocation_key" = $1
+    RETURNING "next_id" - $2
+'''
+
+
+class ErpIdAllocator:
+    """
+    Hands out ERP primary keys from ranges reserved in erp_id_allocations
+    (one row per table + id prefix) instead of MAX() scans.
+
+    - each process reserves block_size ids at a time and serves the next
+      inserts from memory
+    - a reservation is its own single-statement transaction, so workers
+      syncing the same table never wait on each other's inserts
+    - the first reservation for a key seeds the row from the table's
+      current MAX, so ids continue where existing data ends; rows written
+      by anything else later are caught by insert_with_ids, which
+      re-seeds past them on a unique violation
+
+    Ids reserved by a process that exits, or by a failed insert, are
+    skipped, not reused.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._table_ready = False
+
+    async def allocate(
+        self,
+        pool,
+        table: str,
+        id_field: str,
+        count: int,
+        *,
+        prefix: Optional[str] = None,
+        start_id: int,
+    ) -> List[int]:
+        """
+        count new ids for table.id_field. With prefix, only ids whose
+        first digits match it are considered when seeding (ERP ids start
+        with the year); start_id is used when there are none yet.
+        """
+        key = self._key(table, prefix)
+
+        async with self._locks[key]:
+            ids = []
+            while len(ids) < count:
+                start, end = self._ranges.get(key, (0, 0))
+                if start >= end:
+                    size = max(count - len(ids), self.block_size)
+                    start = await self._reserve(pool, key, table, id_field, size, prefix, start_id)
+                    end = start + size
+
+                take = min(end - start, count - len(ids))
+                ids.extend(range(start, start + take))
+                self._ranges[key] = (start + take, end)
+
+            return ids
+
+    async def insert_with_ids(
+        self,
+        pool,
+        table: str,
+        id_field: str,
+        count: int,
+        insert: Callable[[List[int]], Awaitable],
+        *,
+        prefix: Optional[str] = None,
+        start_id: int,
+    ):
+        """
+        allocate() count ids and return await insert(ids). If the insert
+        hits a unique violation (the ids were taken by rows this allocator
+        didn't hand out), re-seed from MAX and retry once with fresh ids.
+        Don't hold a pool connection when calling this: reserving needs
+        one of its own.
+        """
+        for attempt in range(2):
+            ids = await self.allocate(pool, table, id_field, count, prefix=prefix, start_id=start_id)
+            try:
+                return await insert(ids)
+            except asyncpg.UniqueViolationError:
+                if attempt:
+                    raise
+                await self.reseed(pool, table, id_field, prefix=prefix, start_id=start_id)
+
+    async def reseed(self, pool, table: str, id_field: str, *, prefix: Optional[str] = None, start_id: int):
+        """Move the key past the table's current MAX and drop the cached range."""
+        key = self._key(table, prefix)
+
+        async with self._locks[key]:
+            self._ranges.pop(key, None)
+            async with pool.acquire() as conn:
+                await self._ensure_table(conn)
+                await self._seed(conn, key, table, id_field, prefix, start_id)
+
+    @staticmethod
+    def _key(table: str, prefix: Optional[str]) -> str:
+        return f"{table}:{prefix}" if prefix else table
+
+    async def _reserve(self, pool, key: str, table: str, id_field: str, size: int, prefix: Optional[str], start_id: int) -> int:
+        async with pool.acquire() as conn:
+            await self._ensure_table(conn)
+
+            first_id = await conn.fetchval(_RESERVE_SQL, key, size)
+            if first_id is not None:
+                return first_id
+
+            # First use of this key: seed it from the existing rows
+            await self._seed(conn, key, table, id_field, prefix, start_id)
+
+            return await conn.fetchval(_RESERVE_SQL, key, size)
+
+    async def _seed(self, conn, key: str, table: str, id_field: str, prefix: Optional[str], start_id: int):
+        """Set next_id to at least MAX(id_field) + 1 (start_id on an empty table)."""
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", key)
+
+            prefix_filter = (
+                f'AND substring(CAST("{id_field}" AS TEXT), 1, {len(prefix)}) = $1'
+                if prefix else ""
+            )
+            max_id = await conn.fetchval(
+                f'''
+                SELECT MAX(CAST("{id_field}" AS BIGINT))
+                FROM "{table}"
+                WHERE "{id_field}" IS NOT NULL
+                {prefix_filter}
+                ''',
+                *([prefix] if prefix else [])
+            )
+
+            await conn.execute(
+                f'''
+                INSERT INTO "{ALLOCATION_TABLE}" ("allocation_key", "next_id")
+                VALUES ($1, $2)
+                ON CONFLICT ("allocation_key")
+                DO UPDATE SET "next_id" = GREATEST("{ALLOCATION_TABLE}"."next_id", EXCLUDED."next_id")
+                ''',
+                key,
+                max_id + 1 if max_id else start_id
+            )
+
+    async def _ensure_table(self, conn):
+        if self._table_ready:
+            return
+        await conn.execute(
+            f'''
+            CREATE TABLE IF NOT EXISTS "{ALLOCATION_TABLE}" (
+                "allocation_key" TEXT PRIMARY KEY,
+                "next_id" BIGINT NOT NULL
+            )
+            '''
+        )
+        self._table_ready = True
+
+
+erp_id_allocator = ErpIdAllocator(block_size=config.ERP_ID_BLOCK_SIZE)
@@ -1,6 +1,7 @@
 import asyncpg
-from config import POSTGRES_CONFIG
+from config import POSTGRES_CONFIG, ERP_BULK_INSERT_THRESHOLD
 from datetime import datetime
+from services.erp_id_allocator import erp_id_allocator
 
 class ERPService:
     pool = None
@@ -8,6 +9,12 @@ class ERPService:
 
     STARTING_ID = int(f"{datetime.utcnow().year}{datetime.utcnow().month:02d}0000001")
 
+    # hsncode → hsncodesid, kept for the life of the process (codes never change id)
+    _hsn_cache = {}
+
+    # asyncpg/Postgres bind parameter limit per statement
+    MAX_QUERY_PARAMS = 32767
+
 
     # ==================================================
     # SAFE INIT POOL (Never crashes)
@@ -33,50 +40,79 @@ class ERPService:
         If exists, returns hsncodesid.
         If not, generates a new ID, inserts, and returns it.
         """
-        if not hsn_code:
+        ids = await cls.get_or_create_hsncode_ids({hsn_code: hsndesc})
+        return ids[hsn_code]
+
+    @classmethod
+    async def get_or_create_hsncode_ids(cls, hsn_codes: dict) -> dict:
+        """
+        Batch version: {hsn_code: hsndesc} → {hsn_code: hsncodesid}.
+        - ids already seen by this process come from _hsn_cache
+        - the rest: one SELECT ... = ANY($1), then one multi-row INSERT
+          (unnest of arrays) for the codes ERP doesn't have yet, re-checked
+          under an advisory lock
+        """
+        if not all(hsn_codes):
             raise ValueError("hsn_code is required")
 
+        result = {code: cls._hsn_cache[code] for code in hsn_codes if code in cls._hsn_cache}
+        missing = [code for code in hsn_codes if code not in result]
+        if not missing:
+            return result
+
         if not await cls.safe_init_pool():
             raise Exception("ERP unavailable")
 
-        hsndesc = hsndesc or hsn_code
+        # Codes ERP already has need no id: look them up before reserving
+        rows = await cls.pool.fetch(
+            'SELECT "hsncode", "hsncodesid" FROM "hsncodes" WHERE "hsncode" = ANY($1::text[])',
+            missing
+        )
+        found = {row["hsncode"]: row["hsncodesid"] for row in rows}
+        missing = [code for code in missing if code not in found]
 
-        async with cls.pool.acquire() as conn:
-            async with conn.transaction():
-                # Check if already exists
-                result = await conn.fetchrow(
-                    'SELECT "hsncodesid" FROM "hsncodes" WHERE "hsncode"=$1',
-                    hsn_code
-                )
-                if result:
-                    return result["hsncodesid"]
-
-                # Generate unique ID
-                # Using STARTING_ID as base; could also have separate sequence for HSN if desired
-                #prefix = str(cls.STARTING_ID)[:4]
-                max_id = await conn.fetchval(
-                    f'''
-                    SELECT MAX(CAST("hsncodesid" AS BIGINT))
-                    FROM "hsncodes"
-                    WHERE "hsncodesid" IS NOT NULL
-                  
-                    '''
-                )
-                next_id = max_id + 1 if max_id else cls.STARTING_ID
-
-                # Insert new record
-                await conn.execute(
-                   '''
-                   INSERT INTO "hsncodes"
-                   ("hsncodesid", "hsncode", "hsndesc", "activeyn")
-                   VALUES ($1, $2, $3, 'YES')
-                   ''',
-
-                    next_id,
-                    hsn_code,
-                    hsndesc
-                )
-                return next_id
+        async def create(new_ids):
+            async with cls.pool.acquire() as conn:
+                async with conn.transaction():
+                    # Two concurrent syncs must not both create the same codes
+                    await conn.execute("SELECT pg_advisory_xact_lock(hashtext('hsncodes'))")
+
+                    rows = await conn.fetch(
+                        'SELECT "hsncode", "hsncodesid" FROM "hsncodes" WHERE "hsncode" = ANY($1::text[])',
+                        missing
+                    )
+                    created = {row["hsncode"]: row["hsncodesid"] for row in rows}
+                    to_create = [code for code in missing if code not in created]
+                    new_ids = new_ids[:len(to_create)]
+
+                    if to_create:
+                        await conn.execute(
+                            '''
+                            INSERT INTO "hsncodes"
+                            ("hsncodesid", "hsncode", "hsndesc", "activeyn")
+                            SELECT id, code, descr, 'YES'
+                            FROM unnest($1::bigint[], $2::text[], $3::text[]) AS t(id, code, descr)
+                            ''',
+                            new_ids,
+                            to_create,
+                            [hsn_codes[code] or code for code in to_create]
+                        )
+                        created.update(zip(to_create, new_ids))
+            return created
+
+        if missing:
+            # Ids are reserved before create() takes its connection (the
+            # allocator needs one of its own); the few left unused if
+            # another sync created a code meanwhile are skipped
+            found.update(await erp_id_allocator.insert_with_ids(
+                cls.pool, "hsncodes", "hsncodesid", len(missing), create,
+                start_id=cls.STARTING_ID
+            ))
+
+        # Cache only after commit
+        cls._hsn_cache.update(found)
+        result.update(found)
+        return result
 
 
     @classmethod
@@ -170,7 +206,12 @@ class ERPService:
     # INSERT LOGIC (unchanged)
     # ==================================================
     @classmethod
-    async def insert_data(cls, payload: list):
+    async def insert_data(cls, payload: list, bulk: bool = None):
+        """
+        bulk=True loads through COPY + a staging table, False uses
+        multi-row INSERT; None picks COPY for large tables
+        (ERP_BULK_INSERT_THRESHOLD rows).
+        """
         if not await cls.safe_init_pool():
             raise Exception("ERP unavailable")
 
@@ -186,93 +227,146 @@ class ERPService:
         child_tables = table_names[1:]
         table_order = [parent_table] + child_tables
 
-        async with cls.pool.acquire() as conn:
-            async with conn.transaction():
+        # Ids come from blocks reserved per table (no MAX() scan); they
+        # keep the year prefix of STARTING_ID. Reserved before a connection
+        # is taken; retried once with fresh ids if they collide with rows
+        # written outside this service
+        async def insert(new_ids):
+            async with cls.pool.acquire() as conn:
+                async with conn.transaction():
 
-                prefix = str(cls.STARTING_ID)[:4]
+                    all_inserts = {table: [] for table in table_order}
+                    id_to_index = {}
+                    results = [{} for _ in payload]
 
-                max_id = await conn.fetchval(
-                    f'''
-                    SELECT MAX(CAST("{id_field_name}" AS BIGINT))
-                    FROM "{parent_table}"
-                    WHERE "{id_field_name}" IS NOT NULL
-                    AND substring(CAST("{id_field_name}" AS TEXT), 1, 4) = '{prefix}'
-                    '''
-                )
+                    for idx, item in enumerate(payload):
+                        generated_id = new_ids[idx]
+                        id_to_index[generated_id] = idx
 
-                next_id = max_id + 1 if max_id else cls.STARTING_ID
+                        for table_name in table_order:
+                            if table_name not in item:
+                                continue
 
-                all_inserts = {table: [] for table in table_order}
-                id_to_index = {}
-                results = [{} for _ in payload]
+                            row = item[table_name].copy()
+                            row[id_field_name] = generated_id
 
-                for idx, item in enumerate(payload):
-                    generated_id = next_id
-                    next_id += 1
-                    id_to_index[generated_id] = idx
+                            if table_name in child_tables:
+                                row[f"{table_name}id"] = generated_id
 
-                    for table_name in table_order:
-                        if table_name not in item:
-                            continue
+                            id_fields = [id_field_name]
+                            if table_name in child_tables:
+                                id_fields.append(f"{table_name}id")
 
-                        row = item[table_name].copy()
-                        row[id_field_name] = generated_id
+                            cols, vals = cls.process_row_data(row, id_fields)
 
-                        if table_name in child_tables:
-                            row[f"{table_name}id"] = generated_id
+                            if cols:
+                                all_inserts[table_name].append((cols, vals))
 
-                        id_fields = [id_field_name]
-                        if table_name in child_tables:
-                            id_fields.append(f"{table_name}id")
+                    for table_name in table_order:
+                        grouped = {}
 
-                        cols, vals = cls.process_row_data(row, id_fields)
+                        for cols, vals in all_inserts[table_name]:
+                            grouped.setdefault(tuple(cols), []).append(vals)
 
-                        if cols:
-                            all_inserts[table_name].append((cols, vals))
+                        use_copy = (
+                            bulk if bulk is not None
+                            else len(all_inserts[table_name]) >= ERP_BULK_INSERT_THRESHOLD
+                        )
 
-                for table_name in table_order:
-                    grouped = {}
+                        for cols, values_list in grouped.items():
+                            if use_copy:
+                                rows = await cls._copy_insert(conn, table_name, cols, values_list)
+                            else:
+                                rows = await cls._values_insert(conn, table_name, cols, values_list)
 
-                    for cols, vals in all_inserts[table_name]:
-                        grouped.setdefault(tuple(cols), []).append(vals)
+                            for r in rows:
+                                rec = dict(r)
+                                results[id_to_index[rec[id_field_name]]][table_name] = rec
 
-                    for cols, values_list in grouped.items():
-                        col_str = ", ".join(cols)
-                        num_cols = len(cols)
+            return results
 
-                        placeholders = []
-                        p = 1
-                        for _ in values_list:
-                            placeholders.append(
-                                "(" + ", ".join(f'${p + i}' for i in range(num_cols)) + ")"
-                            )
-                            p += num_cols
+        return await erp_id_allocator.insert_with_ids(
+            cls.pool, parent_table, id_field_name, len(payload), insert,
+            prefix=str(cls.STARTING_ID)[:4],
+            start_id=cls.STARTING_ID
+        )
 
-                        sql = f'''
-                            INSERT INTO "{table_name}" ({col_str})
-                            VALUES {", ".join(placeholders)}
-                            RETURNING *
-                        '''
 
-                        flat_vals = [v for row in values_list for v in row]
-                        rows = await conn.fetch(sql, *flat_vals)
+    @classmethod
+    async def _values_insert(cls, conn, table_name: str, cols: tuple, values_list: list):
+        """Multi-row INSERT ... VALUES, chunked under the bind parameter limit"""
+        col_str = ", ".join(cols)
+        num_cols = len(cols)
+        chunk_size = max(1, cls.MAX_QUERY_PARAMS // num_cols)
+
+        rows = []
+        for start in range(0, len(values_list), chunk_size):
+            chunk = values_list[start:start + chunk_size]
+
+            placeholders = []
+            p = 1
+            for _ in chunk:
+                placeholders.append(
+                    "(" + ", ".join(f'${p + i}' for i in range(num_cols)) + ")"
+                )
+                p += num_cols
 
-                        for r in rows:
-                            rec = dict(r)
-                            results[id_to_index[rec[id_field_name]]][table_name] = rec
+            sql = f'''
+                INSERT INTO "{table_name}" ({col_str})
+                VALUES {", ".join(placeholders)}
+                RETURNING *
+            '''
 
-        return results
+            flat_vals = [v for row in chunk for v in row]
+            rows.extend(await conn.fetch(sql, *flat_vals))
+
+        return rows
+
+    @staticmethod
+    async def _copy_insert(conn, table_name: str, cols: tuple, values_list: list):
+        """
+        Streams rows into a temp staging table with COPY, then moves them
+        into the real table with one INSERT ... SELECT ... RETURNING.
+        Must run inside a transaction (the staging table drops on commit).
+        """
+        col_str = ", ".join(cols)
+        stage = f"_stage_{table_name}"
+
+        await conn.execute(f'DROP TABLE IF EXISTS "{stage}"')
+        # Same column types as the target, no constraints
+        await conn.execute(
+            f'CREATE TEMP TABLE "{stage}" ON COMMIT DROP AS '
+            f'SELECT {col_str} FROM "{table_name}" WITH NO DATA'
+        )
+
+        await conn.copy_records_to_table(
+            stage,
+            records=values_list,
+            columns=[c.strip('"') for c in cols],
+        )
+
+        return await conn.fetch(
+            f'''
+            INSERT INTO "{table_name}" ({col_str})
+            SELECT {col_str} FROM "{stage}"
+            RETURNING *
+            '''
+        )
 
 
     # ==================================================
-    # UPDATE LOGIC (unchanged)
+    # UPDATE LOGIC
     # ==================================================
     @classmethod
     async def update_data(cls, payload: list):
+        """
+        Updates in bulk: one existence check for all ids, one prepared
+        UPDATE per (table, column set) run with executemany, and one
+        SELECT per table for the updated rows.
+        """
         if not await cls.safe_init_pool():
             raise Exception("ERP unavailable")
 
-        # keep all your original update logic EXACTLY as-is...
         first_item = payload[0]
         table_names = list(first_item.keys())
 
@@ -281,72 +375,77 @@ class ERPService:
         child_tables = table_names[1:]
         table_order = [parent_table] + child_tables
 
+        record_ids = []
+        for item in payload:
+            if id_field_name not in item[parent_table]:
+                raise Exception(f"{id_field_name} missing")
+            record_ids.append(item[parent_table][id_field_name])
+
         async with cls.pool.acquire() as conn:
             async with conn.transaction():
 
-                results = [{} for _ in payload]
-
-                for idx, item in enumerate(payload):
-
-                    if id_field_name not in item[parent_table]:
-                        raise Exception(f"{id_field_name} missing")
-
-                    record_id = item[parent_table][id_field_name]
-
-                    exists = await conn.fetchval(
-                        f'SELECT 1 FROM "{parent_table}" WHERE "{id_field_name}"=$1',
-                        record_id
+                existing = {
+                    row[0] for row in await conn.fetch(
+                        f'SELECT "{id_field_name}" FROM "{parent_table}" WHERE "{id_field_name}" = ANY($1)',
+                        record_ids
                     )
-
-                    if not exists:
+                }
+                for record_id in record_ids:
+                    if record_id not in existing:
                         raise Exception(f"Record {record_id} not found")
 
-                    for table_name in table_order:
-                        if table_name not in item:
-                            continue
-
-                        row = item[table_name].copy()
-                        row[id_field_name] = record_id
+                results = [{} for _ in payload]
 
-                        if table_name in child_tables:
-                            row[f"{table_name}id"] = record_id
+                for table_name in table_order:
+                    id_fields = [id_field_name]
+                    if table_name in child_tables:
+                        id_fields.append(f"{table_name}id")
 
-                        id_fields = [id_field_name]
-                        if table_name in child_tables:
-                            id_fields.append(f"{table_name}id")
+                    # column set → [(values..., record_id)]
+                    grouped = {}
+                    touched = []
 
-                        cols, vals = cls.process_row_data(row, id_fields)
+                    for idx, item in enumerate(payload):
+                        if table_name not in item:
+                            continue
 
-                        set_parts = []
-                        params = []
-                        p = 1
+                        record_id = record_ids[idx]
+                        touched.append((idx, record_id))
 
+                        cols, vals = cls.process_row_data(item[table_name], id_fields)
+                        set_cols, set_vals = [], []
                         for c, v in zip(cols, vals):
-                            c_name = c.replace('"', '')
-                            if c_name in id_fields:
+                            if c.replace('"', '') in id_fields:
                                 continue
-                            set_parts.append(f"{c}=${p}")
-                            params.append(v)
-                            p += 1
-
-                        if not set_parts:
-                            rec = await conn.fetchrow(
-                                f'SELECT * FROM "{table_name}" WHERE "{id_field_name}"=$1',
-                                record_id
-                            )
-                            results[idx][table_name] = dict(rec)
-                            continue
+                            set_cols.append(c)
+                            set_vals.append(v)
 
-                        sql = f'''
-                            UPDATE "{table_name}"
-                            SET {", ".join(set_parts)}
-                            WHERE "{id_field_name}"=${p}
-                            RETURNING *
-                        '''
+                        if set_cols:
+                            grouped.setdefault(tuple(set_cols), []).append((*set_vals, record_id))
 
-                        params.append(record_id)
-                        rec = await conn.fetchrow(sql, *params)
+                    if not touched:
+                        continue
 
-                        results[idx][table_name] = dict(rec)
+                    for set_cols, rows in grouped.items():
+                        set_parts = ", ".join(f"{c}=${i}" for i, c in enumerate(set_cols, start=1))
+                        await conn.executemany(
+                            f'''
+                            UPDATE "{table_name}"
+                            SET {set_parts}
+                            WHERE "{id_field_name}"=${len(set_cols) + 1}
+                            ''',
+                            rows
+                        )
+
+                    updated = {
+                        rec[id_field_name]: dict(rec)
+                        for rec in await conn.fetch(
+                            f'SELECT * FROM "{table_name}" WHERE "{id_field_name}" = ANY($1)',
+                            list({record_id for _, record_id in touched})
+                        )
+                    }
+                    for idx, record_id in touched:
+                        if record_id in updated:
+                            results[idx][table_name] = updated[record_id]
 
         return results
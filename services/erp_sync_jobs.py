@@ -0,0 +1,873 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import config
+from database import SessionLocal
+from models import Division, ErpSyncJob, Product, ProductCategory, ProductSubCategory, User, UserDocument
+from services.erp_change_outbox import erp_change_feed
+from services.erp_service import ERPService
+from services.syn_full_erp_service import ERPSyncService
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _batches(rows: list, size: int = None):
+    size = size or config.ERP_SYNC_BATCH_SIZE
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def job_view(job: ErpSyncJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "entity": job.entity,
+        "status": job.status,
+        "params": job.params or {},
+        "progress": {
+            "done": job.progress_done,
+            "total": job.progress_total,
+        },
+        "attempts": job.attempts,
+        "error": job.error,
+        "result": job.result,
+        "created_at": job.cts,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "heartbeat_at": job.heartbeat_at,
+    }
+
+
+class SyncJobContext:
+    """
+    Handed to an entity sync: reports progress and checkpoint counters.
+    """
+
+    def __init__(self, job_id: uuid.UUID, checkpoint: Optional[dict] = None):
+        self.job_id = job_id
+        self.checkpoint = dict(checkpoint or {})
+
+    def count(self, key: str) -> int:
+        return self.checkpoint.get(key, 0)
+
+    async def report(self, done: int, total: Optional[int] = None, **counters):
+        """
+        Persist progress; counters are added to the checkpoint totals.
+        """
+        for key, value in counters.items():
+            self.checkpoint[key] = self.checkpoint.get(key, 0) + value
+
+        fields = {
+            "progress_done": done,
+            "checkpoint": jsonable_encoder(self.checkpoint),
+            "heartbeat_at": _utc_now(),
+        }
+        if total is not None:
+            fields["progress_total"] = total
+        await run_in_threadpool(_update_job, self.job_id, **fields)
+
+
+def _update_job(job_id: uuid.UUID, **fields):
+    db = SessionLocal()
+    try:
+        db.query(ErpSyncJob).filter(ErpSyncJob.id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _ack_changes(db: Session, consumer: str, seq: Optional[int]):
+    """Advance the consumer's outbox cursor past the changes just synced."""
+    if seq is not None:
+        erp_change_feed.advance(db, consumer, seq)
+        db.commit()
+
+
+# ==================================================
+# ENTITY SYNCS
+# (each returns the response the old inline endpoint returned)
+# ==================================================
+async def sync_vendor(ctx: SyncJobContext, db: Session, changes_only: bool = False) -> dict:
+    """
+    Users whose ERP status is pending or NULL → partymast.
+    changes_only: just the users in the change outbox since the last run.
+    """
+    await ERPService.init_pool()  # ensure asyncpg pool is ready
+
+    user_ids = seq = None
+    if changes_only:
+        user_ids, seq = await run_in_threadpool(erp_change_feed.read, db, "vendor", "user")
+        if not user_ids:
+            return {"status": "no-changes", "inserted": [], "updated": []}
+
+    try:
+        payload = await run_in_threadpool(ERPSyncService.build_party_json, db, user_ids=user_ids)
+    except HTTPException as e:
+        if e.status_code == status.HTTP_404_NOT_FOUND:
+            await run_in_threadpool(_ack_changes, db, "vendor", seq)
+            return {"status": "no-pending-users", "inserted": [], "updated": []}
+        raise
+
+    insert_payload = payload.get("insert", [])
+    update_payload = payload.get("update", [])
+    total = len(insert_payload) + len(update_payload)
+    done = 0
+
+    insert_result = []
+    update_result = []
+    await ctx.report(done, total)
+
+    def save_new_ids(result: list):
+        new_ids = {
+            rec["partymast"]["versionid"]: rec["partymast"]["partymastid"]
+            for rec in result
+            if "partymast" in rec
+        }
+        if new_ids:
+            for user in db.query(User).filter(User.id.in_(list(new_ids))).all():
+                user.erp_external_id = new_ids[str(user.id)]
+                user.erp_sync_status = "completed"
+        db.commit()
+
+    def mark_updated(batch: list):
+        db.query(User).filter(
+            User.id.in_([item["partymast"]["versionid"] for item in batch])
+        ).update(
+            {User.erp_sync_status: "completed"},
+            synchronize_session=False
+        )
+        db.commit()
+
+    # INSERT (no erp_external_id): save returned ERP IDs batch by batch
+    for batch in _batches(insert_payload):
+        result = await ERPService.insert_data(batch)
+        await run_in_threadpool(save_new_ids, result)
+
+        insert_result.extend(result)
+        done += len(batch)
+        await ctx.report(done, inserted=len(result))
+
+    # UPDATE (has erp_external_id)
+    for batch in _batches(update_payload):
+        result = await ERPService.update_data(batch)
+        await run_in_threadpool(mark_updated, batch)
+
+        update_result.extend(result)
+        done += len(batch)
+        await ctx.report(done, updated=len(result))
+
+    await run_in_threadpool(_ack_changes, db, "vendor", seq)
+
+    return {
+        "status": "success",
+        "inserted": insert_result,
+        "updated": update_result,
+        "inserted_count": ctx.count("inserted"),
+        "updated_count": ctx.count("updated"),
+    }
+
+
+async def sync_products(ctx: SyncJobContext, db: Session, changes_only: bool = False) -> dict:
+    """
+    Pending products → itemmaster + itemtax.
+    changes_only: just the products in the change outbox since the last run.
+    """
+    await ERPService.init_pool()
+
+    product_ids = seq = None
+    if changes_only:
+        product_ids, seq = await run_in_threadpool(erp_change_feed.read, db, "products", "product")
+        if not product_ids:
+            return {"status": "success", "message": "No product changes to sync", "inserted": [], "updated": []}
+
+    try:
+        # async: loads products in the thread pool, HSN ids through asyncpg
+        payload = await ERPSyncService.build_itemmaster_json(db, product_ids=product_ids)
+    except HTTPException as e:
+        if e.status_code == status.HTTP_404_NOT_FOUND:
+            await run_in_threadpool(_ack_changes, db, "products", seq)
+            return {
+                "status": "success",
+                "message": "No pending products to sync",
+                "inserted": [],
+                "updated": []
+            }
+        raise
+
+    insert_payload = payload.get("insert", [])
+    update_payload = payload.get("update", [])
+    total = len(insert_payload) + len(update_payload)
+    done = 0
+
+    insert_result = []
+    update_result = []
+    await ctx.report(done, total)
+
+    def mark_completed(result: list, save_ids: bool):
+        erp_ids = {
+            rec["itemmaster"]["sku"]: rec["itemmaster"].get("itemmasterid")
+            for rec in result
+            if rec.get("itemmaster") and rec["itemmaster"].get("sku")
+        }
+        if erp_ids:
+            for product in db.query(Product).filter(Product.sku.in_(list(erp_ids))).all():
+                if save_ids:
+                    product.erp_external_id = erp_ids[product.sku]
+                product.erp_sync_status = "completed"
+        db.commit()
+
+    for batch in _batches(insert_payload):
+        result = await ERPService.insert_item_with_tax(batch)
+        await run_in_threadpool(mark_completed, result, True)
+
+        insert_result.extend(result)
+        done += len(batch)
+        await ctx.report(done, inserted=len(result))
+
+    for batch in _batches(update_payload):
+        result = await ERPService.update_data(batch)
+        await run_in_threadpool(mark_completed, result, False)
+
+        update_result.extend(result)
+        done += len(batch)
+        await ctx.report(done, updated=len(result))
+
+    await run_in_threadpool(_ack_changes, db, "products", seq)
+
+    return {
+        "status": "success",
+        "inserted": insert_result,
+        "updated": update_result,
+        "inserted_count": ctx.count("inserted"),
+        "updated_count": ctx.count("updated"),
+    }
+
+
+async def sync_ombasic(ctx: SyncJobContext, db: Session) -> dict:
+    """
+    Pending OM documents → ombasic, then their omdetail rows.
+    """
+    await ERPService.init_pool()
+
+    try:
+        payload = await run_in_threadpool(ERPSyncService.build_ombasic_json, db)
+    except HTTPException as e:
+        if e.status_code == status.HTTP_404_NOT_FOUND:
+            payload = {"insert": [], "update": []}
+        else:
+            raise
+
+    insert_payload = payload.get("insert", [])
+    update_payload = payload.get("update", [])
+    total = len(insert_payload) + len(update_payload)
+    done = 0
+
+    inserted = []
+    updated = []
+    omdetail_inserted = []
+    omdetail_updated = []
+    synced_doc_ids = []
+    await ctx.report(done, total)
+
+    def mark_document(rec: dict, ombasicid=None):
+        """
+        Mark the OM document synced (saving a new ERP id) and build its
+        omdetail rows; None when the document is gone.
+        """
+        doc = db.query(UserDocument).filter(
+            UserDocument.om_number == rec.get("omno")
+        ).first()
+
+        if not doc:
+            return None
+
+        if ombasicid is not None:
+            doc.erp_external_id = ombasicid
+        doc.erp_sync_status = "completed"
+        db.commit()
+
+        details = ERPSyncService.build_omdetail(
+            db=db,
+            ombasic_id=ombasicid if ombasicid is not None else doc.erp_external_id,
+            company_id=doc.user_id
+        )
+        return doc.id, details
+
+    # ================== INSERT ==================
+    if insert_payload:
+        inserted_list = await ERPService.insert_data(insert_payload)
+
+        for item in inserted_list:
+            done += 1
+            if "ombasic" not in item:
+                continue
+
+            rec = item["ombasic"]
+            marked = await run_in_threadpool(mark_document, rec, rec.get("ombasicid"))
+            if not marked:
+                continue
+
+            doc_id, details = marked
+            synced_doc_ids.append(doc_id)
+            inserted.append(rec)
+
+            if details:
+                await asyncio.sleep(0.5)  # allow ERP to commit OMBASIC
+                omdetail_inserted.extend(await ERPService.insert_data(details))
+
+            await ctx.report(done, inserted=1)
+
+    # ================== UPDATE ==================
+    if update_payload:
+        updated_list = await ERPService.update_data(update_payload)
+
+        for item in updated_list:
+            done += 1
+            if "ombasic" not in item:
+                continue
+
+            rec = item["ombasic"]
+            marked = await run_in_threadpool(mark_document, rec)
+            if not marked:
+                continue
+
+            doc_id, details = marked
+            synced_doc_ids.append(doc_id)
+            updated.append(rec)
+
+            if details:
+                await asyncio.sleep(0.5)
+                omdetail_updated.extend(await ERPService.update_data(details))
+
+            await ctx.report(done, updated=1)
+
+    return {
+        "status": "success",
+        "ombasic_inserted": inserted,
+        "ombasic_updated": updated,
+        "omdetail_inserted": omdetail_inserted,
+        "omdetail_updated": omdetail_updated,
+        "synced_document_ids": synced_doc_ids
+    }
+
+
+async def sync_vendor_documents(ctx: SyncJobContext, db: Session, folder_name: str = "vendor") -> dict:
+    """
+    Vendor documents → Mongo + partymastdoc.
+    """
+    await ERPService.init_pool()
+    await ctx.report(0)
+
+    data = await ERPSyncService.fetch_and_insert_partymastdoc(
+        db=db,
+        folder_name=folder_name,
+        report=lambda done, total: ctx.report(done, total)
+    )
+
+    await ctx.report(len(data), len(data), inserted=len(data))
+    return {
+        "status": "success",
+        "message": f"{len(data)} documents synced",
+        "inserted": data
+    }
+
+
+async def sync_branchmast(ctx: SyncJobContext, db: Session) -> dict:
+    """
+    Pending divisions → branchmast.
+    """
+    await ERPService.init_pool()
+
+    try:
+        payload = await run_in_threadpool(ERPSyncService.build_branchmast_json, db)
+    except HTTPException as e:
+        if e.status_code == status.HTTP_404_NOT_FOUND:
+            return {"status": "success", "message": e.detail, "inserted": [], "updated": []}
+        raise
+
+    insert_payload = payload.get("insert", [])
+    update_payload = payload.get("update", [])
+    total = len(insert_payload) + len(update_payload)
+    done = 0
+
+    insert_result = []
+    update_result = []
+    await ctx.report(done, total)
+
+    def mark_completed(result: list, save_ids: bool):
+        branch_ids = {
+            rec["branchmast"].get("branchname"): rec["branchmast"].get("branchmastid")
+            for rec in result
+            if rec.get("branchmast")
+        }
+        if branch_ids:
+            for division in db.query(Division).filter(Division.division_name.in_(list(branch_ids))).all():
+                if save_ids:
+                    division.erp_external_id = branch_ids[division.division_name]
+                division.erp_sync_status = "completed"
+        db.commit()
+
+    for batch in _batches(insert_payload):
+        result = await ERPService.insert_data(batch)
+        await run_in_threadpool(mark_completed, result, True)
+
+        insert_result.extend(result)
+        done += len(batch)
+        await ctx.report(done, inserted=len(result))
+
+    for batch in _batches(update_payload):
+        result = await ERPService.update_data(batch)
+        await run_in_threadpool(mark_completed, result, False)
+
+        update_result.extend(result)
+        done += len(batch)
+        await ctx.report(done, updated=len(result))
+
+    return {
+        "status": "success",
+        "inserted": insert_result,
+        "updated": update_result
+    }
+
+
+async def sync_igdetail(ctx: SyncJobContext, db: Session) -> dict:
+    """
+    Pending categories → igdetail (+ igsdetail for their subcategories),
+    then new subcategories of already synced categories → igsdetail.
+    """
+    await ERPService.init_pool()
+
+    igdetail_inserted = []
+    igdetail_updated = []
+    igsdetail_inserted = []
+
+    payload = await run_in_threadpool(ERPSyncService.build_igdetail_json, db)
+    insert_payload = payload["insert"]
+    update_payload = payload["update"]
+    total = len(insert_payload) + len(update_payload)
+    done = 0
+    await ctx.report(done, total)
+
+    def save_category(rec: dict):
+        """
+        Save the new igdetail id on its category and build the category's
+        igsdetail rows; None when the category is gone.
+        """
+        category = db.query(ProductCategory).filter(
+            ProductCategory.name == rec["subgroup"]
+        ).first()
+
+        if not category:
+            return None
+
+        category.erp_external_id = rec["igdetailid"]
+        category.erp_sync_status = "completed"
+        db.commit()
+
+        details = ERPSyncService.build_igsdetail_json(
+            db=db,
+            igdetail_id=rec["igdetailid"],
+            category_id=category.id
+        )
+        return category.id, details
+
+    def save_subcategories(result: list, category_id: Optional[int] = None):
+        for res in result:
+            igs = res.get("igsdetail")
+            if not igs:
+                continue
+
+            query = db.query(ProductSubCategory).filter(
+                ProductSubCategory.name == igs["subgroup2"]
+            )
+            if category_id is not None:
+                query = query.filter(ProductSubCategory.category_id == category_id)
+            sub = query.first()
+
+            if sub:
+                sub.erp_external_id = igs["igsdetailid"]
+                sub.erp_sync_status = "completed"
+        db.commit()
+
+    def mark_category_updated(rec: dict) -> bool:
+        category = db.query(ProductCategory).filter(
+            ProductCategory.name == rec["subgroup"]
+        ).first()
+
+        if not category:
+            return False
+
+        category.erp_sync_status = "completed"
+        db.commit()
+        return True
+
+    # -------- INSERT IGDETAIL --------
+    if insert_payload:
+        inserted = await ERPService.insert_data(insert_payload)
+
+        for item in inserted:
+            done += 1
+            rec = item.get("igdetail")
+            if not rec:
+                continue
+
+            saved = await run_in_threadpool(save_category, rec)
+            if not saved:
+                continue
+
+            category_id, details = saved
+            igdetail_inserted.append(rec)
+
+            # -------- IGSDETAIL (NEW CATEGORY) --------
+            if details:
+                await asyncio.sleep(0.5)
+
+                result = await ERPService.insert_data(details)
+                await run_in_threadpool(save_subcategories, result, category_id)
+
+                igsdetail_inserted.extend(result)
+
+            await ctx.report(done, inserted=1)
+
+    # -------- UPDATE IGDETAIL --------
+    if update_payload:
+        updated = await ERPService.update_data(update_payload)
+
+        for item in updated:
+            done += 1
+            rec = item.get("igdetail")
+            if not rec:
+                continue
+
+            if await run_in_threadpool(mark_category_updated, rec):
+                igdetail_updated.append(rec)
+
+        await ctx.report(done, updated=len(igdetail_updated))
+
+    # ================= IGSDETAIL ONLY (EXISTING CATEGORY) =================
+    igs_only_payload = await run_in_threadpool(ERPSyncService.build_igsdetail_only, db)
+
+    if igs_only_payload:
+        result = await ERPService.insert_data(igs_only_payload)
+        await run_in_threadpool(save_subcategories, result)
+
+        igsdetail_inserted.extend(result)
+
+    return {
+        "status": "success",
+        "igdetail_inserted": igdetail_inserted,
+        "igdetail_updated": igdetail_updated,
+        "igsdetail_inserted": igsdetail_inserted
+    }
+
+
+SYNC_ENTITIES: Dict[str, Callable[..., Awaitable[dict]]] = {
+    "vendor": sync_vendor,
+    "products": sync_products,
+    "ombasic": sync_ombasic,
+    "vendor_documents": sync_vendor_documents,
+    "branchmast": sync_branchmast,
+    "igdetail": sync_igdetail,
+}
+
+# Syncs fed by the change outbox: sync entity → outbox entity
+CHANGE_CONSUMERS = {
+    "vendor": "user",
+    "products": "product",
+}
+
+
+# ==================================================
+# JOB RUNNER
+# ==================================================
+class ErpSyncJobRunner:
+    """
+    Runs ERP syncs in background worker coroutines.
+
+    - jobs live in erp_sync_jobs, so every app worker process can pick
+      them up (claimed with FOR UPDATE SKIP LOCKED)
+    - at most one queued and one running job per entity (partial unique
+      indexes on erp_sync_jobs); different entities run concurrently,
+      each worker with its own DB session and the shared ERPService
+      asyncpg pool
+    - running jobs heartbeat; one whose heartbeat is older than
+      ERP_SYNC_STALE_SECONDS (process died, deploy) is claimed again and
+      resumes: rows already marked completed are not pending any more,
+      and the checkpoint keeps the counters
+    - every outbox_poll_seconds, CHANGE_CONSUMERS with new outbox rows
+      get a changes_only job, so edits reach the ERP without a full scan
+    """
+
+    def __init__(
+        self,
+        workers: int = config.ERP_SYNC_WORKERS,
+        poll_seconds: float = config.ERP_SYNC_POLL_SECONDS,
+        stale_seconds: float = config.ERP_SYNC_STALE_SECONDS,
+        outbox_poll_seconds: float = config.ERP_OUTBOX_POLL_SECONDS,
+    ):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.outbox_poll_seconds = outbox_poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # ---------------------------------------------------------
+    # API
+    # ---------------------------------------------------------
+    async def enqueue(self, entity: str, params: Optional[dict] = None, requested_by=None) -> dict:
+        """
+        Queue a sync; returns the already queued job of the same entity
+        instead of queueing a second one (see _create).
+        """
+        if entity not in SYNC_ENTITIES:
+            raise HTTPException(status_code=400, detail=f"Unknown ERP sync entity: {entity}")
+
+        job = await run_in_threadpool(self._create, entity, params or {}, requested_by)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        try:
+            job_uuid = uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+
+        db = SessionLocal()
+        try:
+            job = db.query(ErpSyncJob).filter(ErpSyncJob.id == job_uuid).first()
+            return job_view(job) if job else None
+        finally:
+            db.close()
+
+    def recent(self, entity: Optional[str] = None, limit: int = 20) -> List[dict]:
+        db = SessionLocal()
+        try:
+            query = db.query(ErpSyncJob)
+            if entity:
+                query = query.filter(ErpSyncJob.entity == entity)
+            return [job_view(job) for job in query.order_by(ErpSyncJob.cts.desc()).limit(limit).all()]
+        finally:
+            db.close()
+
+    async def wait(self, job_id: str, timeout: float = config.ERP_SYNC_WAIT_SECONDS) -> dict:
+        """
+        Poll until the job finishes (or timeout); returns the job view.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await run_in_threadpool(self.get, job_id)
+            if job is None or job["status"] in (JOB_COMPLETED, JOB_FAILED) or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(1)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.outbox_poll_seconds > 0:
+            self._tasks.append(asyncio.create_task(self._poll_changes()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    # ---------------------------------------------------------
+    # DB
+    # ---------------------------------------------------------
+    def _create(self, entity: str, params: dict, requested_by) -> dict:
+        """
+        - a queued job of the entity is returned instead of a new one; a
+          full sync request upgrades a queued changes_only job to a full
+          sync (a changes_only request is covered by a queued full sync)
+        - a running job does not absorb the request: the next run is
+          queued, so changes made during the run are picked up
+        Another process queueing first makes our insert hit the unique
+        index; we then return its job.
+        """
+        db = SessionLocal()
+        try:
+            for _ in range(3):
+                queued = db.query(ErpSyncJob).filter(
+                    ErpSyncJob.entity == entity,
+                    ErpSyncJob.status == JOB_QUEUED
+                ).with_for_update().first()
+
+                if queued:
+                    if (queued.params or {}).get("changes_only") and not params.get("changes_only"):
+                        queued.params = params
+                    db.commit()
+                    db.refresh(queued)
+                    return job_view(queued)
+
+                job = ErpSyncJob(entity=entity, params=params, status=JOB_QUEUED, requested_by=requested_by)
+                db.add(job)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    continue
+                db.refresh(job)
+                return job_view(job)
+
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Could not queue ERP sync for {entity}, try again"
+            )
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[ErpSyncJob]:
+        """
+        Take the oldest queued job (or a running one whose worker died)
+        whose entity is not being synced right now.
+        """
+        db = SessionLocal()
+        try:
+            stale_before = _utc_now() - timedelta(seconds=self.stale_seconds)
+
+            busy = db.query(ErpSyncJob.entity).filter(
+                ErpSyncJob.status == JOB_RUNNING,
+                ErpSyncJob.heartbeat_at >= stale_before
+            )
+
+            job = db.query(ErpSyncJob).filter(
+                or_(
+                    ErpSyncJob.status == JOB_QUEUED,
+                    (ErpSyncJob.status == JOB_RUNNING) & (
+                        (ErpSyncJob.heartbeat_at < stale_before) | ErpSyncJob.heartbeat_at.is_(None)
+                    )
+                ),
+                ErpSyncJob.entity.notin_(busy)
+            ).order_by(ErpSyncJob.cts.asc()).with_for_update(skip_locked=True).first()
+
+            if job is None:
+                db.rollback()
+                return None
+
+            now = _utc_now()
+            job.status = JOB_RUNNING
+            job.worker_id = self.worker_id
+            job.heartbeat_at = now
+            job.started_at = job.started_at or now
+            job.attempts = (job.attempts or 0) + 1
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another process started a job of this entity meanwhile
+                db.rollback()
+                return None
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _changed_entities(self) -> List[str]:
+        """Sync entities with unsynced outbox rows (applied rows are pruned)."""
+        db = SessionLocal()
+        try:
+            changed = []
+            for sync_entity, entity in CHANGE_CONSUMERS.items():
+                erp_change_feed.prune(db, sync_entity, entity)
+                if erp_change_feed.has_changes(db, sync_entity, entity):
+                    changed.append(sync_entity)
+            return changed
+        finally:
+            db.close()
+
+    # ---------------------------------------------------------
+    # WORKERS
+    # ---------------------------------------------------------
+    async def _poll_changes(self):
+        while True:
+            await asyncio.sleep(self.outbox_poll_seconds)
+            try:
+                for entity in await run_in_threadpool(self._changed_entities):
+                    await self.enqueue(entity, {"changes_only": True})
+            except Exception as e:
+                print(f"[WARN] ERP change outbox poll failed: {e}")
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await run_in_threadpool(self._claim)
+            except Exception as e:
+                print(f"[WARN] ERP sync job claim failed: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Job stays "running" and is resumed once its heartbeat goes stale
+                print(f"[WARN] ERP sync job {job.id} could not be finalized: {e}")
+
+    async def _heartbeat(self, job_id: uuid.UUID):
+        while True:
+            await asyncio.sleep(max(self.stale_seconds / 3, 1))
+            try:
+                await run_in_threadpool(_update_job, job_id, heartbeat_at=_utc_now())
+            except Exception as e:
+                print(f"[WARN] ERP sync job heartbeat failed: {e}")
+
+    async def _run(self, job: ErpSyncJob):
+        ctx = SyncJobContext(job.id, job.checkpoint)
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        db = SessionLocal()
+        try:
+            result = await SYNC_ENTITIES[job.entity](ctx, db, **(job.params or {}))
+            fields = {"status": JOB_COMPLETED, "result": jsonable_encoder(result), "error": None}
+        except Exception as e:
+            await run_in_threadpool(db.rollback)
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            fields = {"status": JOB_FAILED, "error": str(detail)}
+            print(f"[ERROR] ERP sync job {job.id} ({job.entity}) failed: {detail}")
+        finally:
+            heartbeat.cancel()
+            await run_in_threadpool(db.close)
+
+        await run_in_threadpool(
+            _update_job,
+            job.id,
+            finished_at=_utc_now(),
+            checkpoint=jsonable_encoder(ctx.checkpoint),
+            **fields
+        )
+
+
+erp_sync_jobs = ErpSyncJobRunner()
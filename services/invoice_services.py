@@ -1,94 +1,91 @@
-import requests
+from services.zoho_pdf import fetch_zoho_pdf
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
 from fastapi import HTTPException, status
 import config
 from services.zoho_contact_service import ZohoContactService
-from utils.comment_meta_util import build_comment_meta, extract_comment_meta, strip_comment_meta
+from services.zoho_item_service import ZohoItemService
+from services.zoho_comment_feed import zoho_comment_feed
+from services.zoho_dashboard_service import zoho_dashboard_service
+from utils.comment_meta_util import build_comment_meta
 
 class InvoiceService:
     def __init__(self):
         self.base_url = f"{config.ZOHO_API_BASE}/books/v3"
         self.org_id = config.ZOHO_ORG_ID
         self.contact_service = ZohoContactService()
+        self.item_service = ZohoItemService()
 
-    def _resolve_contact_id(self, contact_id: str) -> str:
+    async def _resolve_contact_id(self, contact_id: str) -> str:
         if "@" in contact_id:  # treat as email
-            contact = self.contact_service.get_contact_id_by_email(contact_id)
+            contact = await self.contact_service.get_contact_id_by_email(contact_id)
             return contact["contact_id"]
         return contact_id
 
     # -----------------------------
     # Create Invoice
     # -----------------------------
-    def create_invoice(self, access_token: str, payload):
+    async def create_invoice(self, access_token: str, payload):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}", "Content-Type": "application/json"}
-        contact_id = self._resolve_contact_id(payload.contact_id)
+        contact_id = await self._resolve_contact_id(payload.contact_id)
 
-        line_items = []
-        for item in payload.items:
-            item_response = requests.get(
-                f"{self.base_url}/items/{item.item_id}",
-                headers=headers,
-                params={"organization_id": self.org_id},
-                timeout=15
-            )
-            if item_response.status_code != 200:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                                    detail={"message": f"Failed to fetch item {item.item_id}",
-                                            "zoho_response": item_response.json()})
-            item_data = item_response.json().get("item", {})
-            line_items.append({
-                "item_id": item.item_id,
-                "quantity": item.quantity,
-                "rate": item_data.get("rate", 0),
-                "name": item_data.get("name", ""),
-                "tax_id": "",
-                "tax_exemption_code": "NON"
-            })
+        line_items = await self.item_service.build_line_items(access_token, payload.items)
 
         body = {"customer_id": contact_id, "line_items": line_items,
                 "notes": payload.notes or "Invoice created from customer portal"}
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/invoices",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 201:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail={"message": "Failed to create invoice",
                                         "zoho_response": response.json()})
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json()["invoice"]
 
     # -----------------------------
     # List Invoices for Customer
     # -----------------------------
-    def list_invoices_for_customer(self, access_token: str, contact_id: str):
+    async def list_invoices_for_customer(
+        self, access_token: str, contact_id: str, page: int = 1, per_page: int = config.ZOHO_PAGE_SIZE
+    ):
+        """
+        One page of the customer's invoices; returns (records, page_context).
+        """
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
-        response = requests.get(
+        contact_id = await self._resolve_contact_id(contact_id)
+        response = await zoho_async_http.get(
             f"{self.base_url}/invoices",
             headers=headers,
-            params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            params={
+                "organization_id": self.org_id,
+                "customer_id": contact_id,
+                "page": page,
+                "per_page": per_page
+            },
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail={"message": "Failed to fetch invoices", "zoho_response": response.json()})
-        return response.json().get("invoices", [])
+        data = response.json()
+        return data.get("invoices", []), data.get("page_context", {})
 
     # -----------------------------
     # Get Invoice Details
     # -----------------------------
-    def get_invoice(self, access_token: str, invoice_id: str, contact_id: str):
+    async def get_invoice(self, access_token: str, invoice_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
-        response = requests.get(
+        contact_id = await self._resolve_contact_id(contact_id)
+        response = await zoho_async_http.get(
             f"{self.base_url}/invoices/{invoice_id}",
             headers=headers,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
@@ -99,41 +96,49 @@ class InvoiceService:
     # -----------------------------
     # ERP Review Invoice
     # -----------------------------
-    def review_invoice(self, access_token: str, invoice_id: str, payload, reviewer_id: str, contact_id: str):
+    async def review_invoice(self, access_token: str, invoice_id: str, payload, reviewer_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
         body = {"status": payload.status, "notes": payload.notes or f"Reviewed by ERP user {reviewer_id}"}
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/invoices/{invoice_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail={"message": "Failed to review invoice", "zoho_response": response.json()})
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json().get("invoice", {})
 
     # -----------------------------
     # Customer Approval Invoice
     # -----------------------------
-    def customer_approve_invoice(self, access_token: str, invoice_id: str, payload, contact_id: str):
+    async def customer_approve_invoice(self, access_token: str, invoice_id: str, payload, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
         body = {"status": payload.status, "notes": payload.notes or f"Response from customer {contact_id}"}
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/invoices/{invoice_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail={"message": "Failed to update invoice status", "zoho_response": response.json()})
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json().get("invoice", {})
-    def get_invoice_pdf(self, access_token: str, invoice_id: str):
+    async def get_invoice_pdf(
+        self,
+        access_token: str,
+        invoice_id: str,
+        stream: bool = False,
+        if_none_match: str | None = None
+    ):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
         params = {
             "organization_id": self.org_id,
@@ -141,78 +146,36 @@ class InvoiceService:
             "accept": "pdf"
         }
 
-        response = requests.get(
+        # Raw PDF bytes, or a response object for the client;
+        # cached per last_modified_time of the invoice
+        return await fetch_zoho_pdf(
             f"{self.base_url}/invoices/{invoice_id}",
             headers=headers,
             params=params,
-            timeout=30
+            error_message=f"Failed to fetch PDF for invoice {invoice_id}",
+            stream=stream,
+            document_key="invoice",
+            if_none_match=if_none_match
         )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "message": f"Failed to fetch PDF for invoice {invoice_id}",
-                    "zoho_response": response.json() if "application/json" in response.headers.get("Content-Type","") else None
-                }
-            )
-
-        return response.content  # raw PDF bytes
     # ----------------------------------------------
     # GET COMMENTS FOR INVOICE
     # ----------------------------------------------
-    def get_invoice_comments(self, access_token: str, invoice_id: str):
-        headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-
-        resp = requests.get(
-            f"{self.base_url}/invoices/{invoice_id}/comments",
-            headers=headers,
-            params={"organization_id": self.org_id},
-            timeout=15
+    async def get_invoice_comments(self, access_token: str, invoice_id: str):
+        # Cached per invoice; system comments (no meta block) are dropped
+        return await zoho_comment_feed.get_comments(
+            access_token,
+            "invoices",
+            invoice_id,
+            error_message="Failed to fetch invoice comments"
         )
 
-        if resp.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "message": "Failed to fetch invoice comments",
-                    "zoho_response": resp.json()
-                }
-            )
-
-        comments = resp.json().get("comments", [])
-        result = []
-
-        for c in comments:
-            meta = extract_comment_meta(c.get("description", ""))
-            description = c.get("description", "")
-            if "[CUSTOM_META]" not in description:
-                continue
-            # 🔴 EXCLUDE SYSTEM COMMENTS
-           
-
-            result.append({
-                "comment_id": c.get("comment_id", ""),
-                "invoice_id": invoice_id,
-                "description": strip_comment_meta(c.get("description", "")),
-                "commented_by": meta.get("customer_name", c.get("commented_by", "")),
-                "commented_by_id": meta.get("customer_id", c.get("commented_by_id", "")),
-                "comment_type": "client",
-                "date": c.get("date", ""),
-                "date_description": c.get("date_description", ""),
-                "time": c.get("time", ""),
-                "comments_html_format": c.get("comments_html_format", "")
-            })
-
-        return result
-
 
 
 
     # ----------------------------------------------
     # ADD NEW COMMENT
     # ----------------------------------------------
-    def add_invoice_comment(
+    async def add_invoice_comment(
     self,
     access_token: str,
     invoice_id: str,
@@ -225,18 +188,18 @@ class InvoiceService:
         }
 
         # Centralized meta handling (email → contact → meta)
-        meta_block = build_comment_meta(email=email)
+        meta_block = await build_comment_meta(email=email)
 
         payload = {
             "description": meta_block + description
         }
 
-        resp = requests.post(
+        resp = await zoho_async_http.post(
             f"{self.base_url}/invoices/{invoice_id}/comments",
             headers=headers,
             params={"organization_id": self.org_id},
             json=payload,
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if resp.status_code not in (200, 201):
@@ -248,6 +211,7 @@ class InvoiceService:
                 }
             )
 
+        zoho_comment_feed.invalidate("invoices", invoice_id)
         return resp.json()
 
 
@@ -255,18 +219,18 @@ class InvoiceService:
     # ----------------------------------------------
     # UPDATE A COMMENT
     # ----------------------------------------------
-    def update_invoice_comment(self, access_token: str, invoice_id: str, comment_id: str, payload: dict):
+    async def update_invoice_comment(self, access_token: str, invoice_id: str, comment_id: str, payload: dict):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}",
             "content-type": "application/json"
         }
 
-        resp = requests.put(
+        resp = await zoho_async_http.put(
             f"{self.base_url}/invoices/{invoice_id}/comments/{comment_id}",
             headers=headers,
             params={"organization_id": self.org_id},
             json=payload,
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if resp.status_code != 200:
@@ -278,20 +242,21 @@ class InvoiceService:
                 }
             )
 
+        zoho_comment_feed.invalidate("invoices", invoice_id)
         return resp.json()
 
 
     # ----------------------------------------------
     # DELETE A COMMENT
     # ----------------------------------------------
-    def delete_invoice_comment(self, access_token: str, invoice_id: str, comment_id: str):
+    async def delete_invoice_comment(self, access_token: str, invoice_id: str, comment_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
 
-        resp = requests.delete(
+        resp = await zoho_async_http.delete(
             f"{self.base_url}/invoices/{invoice_id}/comments/{comment_id}",
             headers=headers,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if resp.status_code != 200:
@@ -302,3 +267,5 @@ class InvoiceService:
                     "zoho_response": resp.json()
                 }
             )
+
+        zoho_comment_feed.invalidate("invoices", invoice_id)
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from models import Module, RoleModulePrivilege, UserRole
+from utils.privilege_cache import privilege_cache
 
 
 class ModuleService:
@@ -90,6 +91,7 @@ class ModuleService:
             db.add(module)
             db.commit()
             db.refresh(module)
+            privilege_cache.invalidate()
             return module
         except IntegrityError:
             db.rollback()
@@ -117,6 +119,7 @@ class ModuleService:
 
         db.commit()
         db.refresh(module)
+        privilege_cache.invalidate()
         return module
 
     # ---------------------------------------------------------
@@ -135,6 +138,7 @@ class ModuleService:
         module.is_active = False
         db.commit()
         db.refresh(module)
+        privilege_cache.invalidate()
         return module
 
     # ---------------------------------------------------------
@@ -152,4 +156,5 @@ class ModuleService:
 
         db.delete(module)
         db.commit()
+        privilege_cache.invalidate()
         return {"detail": f"Module '{module.name}' deleted successfully"}
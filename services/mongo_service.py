@@ -52,6 +52,17 @@ class MongoService:
         result = mongo_collection.insert_one(payload)
         return {"id": str(result.inserted_id)}
     
+    @staticmethod
+    def insert_many(payloads: list):
+        """
+        INSERT several documents in one round trip (same sanitizing as
+        insert). Returns their ids in payload order.
+        """
+        if not payloads:
+            return []
+        result = mongo_collection.insert_many([sanitize_for_mongo(p) for p in payloads], ordered=True)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
     @staticmethod
     def insertall(payload: dict):
         """
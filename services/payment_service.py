@@ -1,5 +1,6 @@
 from decimal import ROUND_HALF_UP, Decimal
-import requests
+from services.zoho_pdf import fetch_zoho_pdf
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
 from fastapi import HTTPException, status
 import config
 from services.zoho_contact_service import ZohoContactService
@@ -10,23 +11,23 @@ class PaymentService:
         self.org_id = config.ZOHO_ORG_ID
         self.contact_service = ZohoContactService()
 
-    def _resolve_contact_id(self, contact_id: str) -> str:
+    async def _resolve_contact_id(self, contact_id: str) -> str:
         if "@" in contact_id:  # treat as email
-            contact = self.contact_service.get_contact_id_by_email(contact_id)
+            contact = await self.contact_service.get_contact_id_by_email(contact_id)
             return contact["contact_id"]
         return contact_id
 
     # -----------------------------
     # Create Customer Payment
     # -----------------------------
-    def create_payment(self, access_token: str, payload):
+    async def create_payment(self, access_token: str, payload):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}",
             "Content-Type": "application/json"
         }
 
         # Resolve email → contact_id if needed
-        customer_id = self._resolve_contact_id(payload.contact_id)
+        customer_id = await self._resolve_contact_id(payload.contact_id)
 
         body = {
             "customer_id": customer_id,
@@ -46,12 +47,12 @@ class PaymentService:
             ]
         }
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/customerpayments",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code not in (200, 201):
@@ -69,35 +70,46 @@ class PaymentService:
     # -----------------------------
     # List Payments for Customer
     # -----------------------------
-    def list_payments_for_customer(self, access_token: str, contact_id: str):
+    async def list_payments_for_customer(
+        self, access_token: str, contact_id: str, page: int = 1, per_page: int = config.ZOHO_PAGE_SIZE
+    ):
+        """
+        One page of the customer's payments; returns (records, page_context).
+        """
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
-        response = requests.get(
+        response = await zoho_async_http.get(
             f"{self.base_url}/customerpayments",
             headers=headers,
-            params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            params={
+                "organization_id": self.org_id,
+                "customer_id": contact_id,
+                "page": page,
+                "per_page": per_page
+            },
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "Failed to fetch customer payments", "zoho_response": response.json()}
             )
-        return response.json().get("customerpayments", [])
+        data = response.json()
+        return data.get("customerpayments", []), data.get("page_context", {})
 
     # -----------------------------
     # Get Payment Details
     # -----------------------------
-    def get_payment(self, access_token: str, payment_id: str, contact_id: str):
+    async def get_payment(self, access_token: str, payment_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
-        response = requests.get(
+        response = await zoho_async_http.get(
             f"{self.base_url}/customerpayments/{payment_id}",
             headers=headers,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -109,18 +121,18 @@ class PaymentService:
     # -----------------------------
     # ERP Review Payment
     # -----------------------------
-    def review_payment(self, access_token: str, payment_id: str, payload, reviewer_id: str, contact_id: str):
+    async def review_payment(self, access_token: str, payment_id: str, payload, reviewer_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
         body = {"status": payload.status, "notes": payload.notes or f"Reviewed by ERP user {reviewer_id}"}
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/customerpayments/{payment_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -132,18 +144,18 @@ class PaymentService:
     # -----------------------------
     # Customer Approval Payment
     # -----------------------------
-    def customer_approve_payment(self, access_token: str, payment_id: str, payload, contact_id: str):
+    async def customer_approve_payment(self, access_token: str, payment_id: str, payload, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
         body = {"status": payload.status, "notes": payload.notes or f"Response from customer {contact_id}"}
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/customerpayments/{payment_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -151,13 +163,9 @@ class PaymentService:
                 detail={"message": "Failed to update payment status", "zoho_response": response.json()}
             )
         return response.json().get("payment", {})
-    def get_payment_pdf(self, access_token: str, payment_id: str):
+    async def get_payment_pdf(self, access_token: str, payment_id: str, stream: bool = False):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
         params = {"organization_id": self.org_id, "print": "true", "accept": "pdf"}
-        response = requests.get(f"{self.base_url}/customerpayments/{payment_id}",
-                                headers=headers, params=params, timeout=30)
-        if response.status_code != 200:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                                detail={"message": "Failed to fetch payment PDF",
-                                        "zoho_response": response.json()})
-        return response.content
+        return await fetch_zoho_pdf(f"{self.base_url}/customerpayments/{payment_id}",
+                                    headers=headers, params=params,
+                                    error_message="Failed to fetch payment PDF", stream=stream)
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
 from models import Product, CategoryDetails
+from services.erp_change_outbox import record_change
 
 
 class ProductService:
@@ -134,6 +135,8 @@ class ProductService:
         )
 
         db.add(product)
+        db.flush()
+        record_change(db, "product", product.id)
         db.commit()
         db.refresh(product)
         return product
@@ -211,6 +214,7 @@ class ProductService:
             if hasattr(product, key):
                 setattr(product, key, value)
 
+        record_change(db, "product", product.id, fields=updates.keys())
         db.commit()
         db.refresh(product)
         return product
@@ -1,28 +1,32 @@
-import re
-import requests
+from services.zoho_pdf import fetch_zoho_pdf
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
 from fastapi import HTTPException, UploadFile, status
 import config
 from services.zoho_contact_service import ZohoContactService
-from utils.comment_meta_util import build_comment_meta, extract_comment_meta, strip_comment_meta, strip_comment_meta
+from services.zoho_item_service import ZohoItemService
+from services.zoho_comment_feed import zoho_comment_feed
+from services.zoho_dashboard_service import zoho_dashboard_service
+from utils.comment_meta_util import build_comment_meta
 
 class QuoteService:
     def __init__(self):
         self.base_url = f"{config.ZOHO_API_BASE}/books/v3"
         self.org_id = config.ZOHO_ORG_ID
         self.contact_service = ZohoContactService()
+        self.item_service = ZohoItemService()
 
     # -----------------------------
     # Utility: resolve contact_id
     # -----------------------------
-    def _resolve_contact_id(self, contact_id: str) -> str:
+    async def _resolve_contact_id(self, contact_id: str) -> str:
         if "@" in contact_id:  # treat as email
-            contact = self.contact_service.get_contact_id_by_email(contact_id)
+            contact = await self.contact_service.get_contact_id_by_email(contact_id)
             return contact["contact_id"]
         return contact_id
         # -----------------------------
     # Upload Attachment to Quote
     # -----------------------------
-    def upload_attachment(
+    async def upload_attachment(
         self,
         access_token: str,
         estimate_id: str,
@@ -45,12 +49,12 @@ class QuoteService:
             )
         }
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/estimates/{estimate_id}/attachment",
             headers=headers,
             files=files,
             params={"organization_id": self.org_id},
-            timeout=30
+            timeout=zoho_async_timeout("upload")
         )
 
         if response.status_code not in (200, 201):
@@ -65,7 +69,7 @@ class QuoteService:
         # Optional: add audit comment
         if uploaded_by:
             try:
-                self.add_comment(
+                await self.add_comment(
                     access_token=access_token,
                     estimate_id=estimate_id,
                     description=f"Attachment uploaded: {file.filename}",
@@ -78,7 +82,7 @@ class QuoteService:
         # -----------------------------
     # Create Draft Quote (Enquiry – No Items)
     # -----------------------------
-    def create_draft_quote_enquiry(self, access_token: str, payload):
+    async def create_draft_quote_enquiry(self, access_token: str, payload):
         """
         Create a draft quote as an enquiry:
         - No predefined items
@@ -91,7 +95,7 @@ class QuoteService:
             "Content-Type": "application/json"
         }
 
-        contact_id = self._resolve_contact_id(payload.contact_id)
+        contact_id = await self._resolve_contact_id(payload.contact_id)
 
         # Single dummy line item (Zoho requires at least one)
         line_items = [
@@ -113,12 +117,12 @@ class QuoteService:
             "status": "draft"
         }
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/estimates",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code != 201:
@@ -130,45 +134,22 @@ class QuoteService:
                 }
             )
 
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json()["estimate"]
 
     # -----------------------------
     # Create Draft Quote
     # -----------------------------
-    def create_draft_quote(self, access_token: str, payload):
+    async def create_draft_quote(self, access_token: str, payload):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}",
             "Content-Type": "application/json"
         }
 
-        contact_id = self._resolve_contact_id(payload.contact_id)
+        contact_id = await self._resolve_contact_id(payload.contact_id)
 
         # Build line items
-        line_items = []
-        for item in payload.items:
-            item_response = requests.get(
-                f"{self.base_url}/items/{item.item_id}",
-                headers=headers,
-                params={"organization_id": self.org_id},
-                timeout=15
-            )
-            if item_response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail={
-                        "message": f"Failed to fetch item {item.item_id}",
-                        "zoho_response": item_response.json()
-                    }
-                )
-            item_data = item_response.json().get("item", {})
-            line_items.append({
-                "item_id": item.item_id,
-                "quantity": item.quantity,
-                "rate": item_data.get("rate", 0),
-                "name": item_data.get("name", ""),
-                "tax_id": "",
-                "tax_exemption_code": "NON"
-            })
+        line_items = await self.item_service.build_line_items(access_token, payload.items)
 
         body = {
             "customer_id": contact_id,
@@ -176,12 +157,12 @@ class QuoteService:
             "notes": payload.notes or "Quote requested from customer portal"
         }
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/estimates",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code != 201:
@@ -193,27 +174,39 @@ class QuoteService:
                 }
             )
 
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json()["estimate"]
 
     # -----------------------------
     # List Quotes for Customer
     # -----------------------------
-    def list_quotes_for_customer(self, access_token: str, contact_id: str):
+    async def list_quotes_for_customer(
+        self, access_token: str, contact_id: str, page: int = 1, per_page: int = config.ZOHO_PAGE_SIZE
+    ):
+        """
+        One page of the customer's quotes (drafts excluded); returns (records, page_context).
+        """
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
-        response = requests.get(
+        response = await zoho_async_http.get(
             f"{self.base_url}/estimates",
             headers=headers,
-            params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            params={
+                "organization_id": self.org_id,
+                "customer_id": contact_id,
+                "page": page,
+                "per_page": per_page
+            },
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "Failed to fetch quotes", "zoho_response": response.json()}
             )
-        estimates = response.json().get("estimates", {})
+        data = response.json()
+        estimates = data.get("estimates", [])
 
          # ❌ EXCLUDE draft quotes
         quotes = [
@@ -221,20 +214,20 @@ class QuoteService:
             if q.get("status", "").lower() != "draft"
         ]
 
-        return quotes
+        return quotes, data.get("page_context", {})
 
     # -----------------------------
     # Get Quote Details
     # -----------------------------
-    def get_quote(self, access_token: str, estimate_id: str, contact_id: str):
+    async def get_quote(self, access_token: str, estimate_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
-        response = requests.get(
+        response = await zoho_async_http.get(
             f"{self.base_url}/estimates/{estimate_id}",
             headers=headers,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code != 200:
@@ -253,63 +246,65 @@ class QuoteService:
     # -----------------------------
     # ERP Review Quote
     # -----------------------------
-    def review_quote(self, access_token: str, estimate_id: str, payload, reviewer_id: str, contact_id: str):
+    async def review_quote(self, access_token: str, estimate_id: str, payload, reviewer_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
         body = {
             "status": payload.status,
             "notes": payload.notes or f"Reviewed by ERP user {contact_id}"
         }
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/estimates/{estimate_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "Failed to review quote", "zoho_response": response.json()}
             )
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json().get("estimate", {})
 
     # -----------------------------
     # Customer Approval
     # -----------------------------
-    def customer_approve_quote(self, access_token: str, estimate_id: str, payload, contact_id: str):
+    async def customer_approve_quote(self, access_token: str, estimate_id: str, payload, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
         body = {
             "status": payload.status,
             "notes": payload.notes or f"Response from customer {contact_id}"
         }
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/estimates/{estimate_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "Failed to update quote status", "zoho_response": response.json()}
             )
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json().get("estimate", {})
     
-    def update_quote_status(self, access_token: str, estimate_id: str, action: str):
+    async def update_quote_status(self, access_token: str, estimate_id: str, action: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/estimates/{estimate_id}/status/{action}",
             headers=headers,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         data = response.json()
@@ -323,6 +318,9 @@ class QuoteService:
                 }
             )
 
+        # The status response carries the quote's customer; without it,
+        # drop every cached summary
+        zoho_dashboard_service.invalidate(data.get("estimate", {}).get("customer_id"))
         return {
             "message": data.get("message", "Status updated"),
             "estimate_number": data.get("estimate", {}).get("estimate_number", ""),
@@ -330,7 +328,13 @@ class QuoteService:
             "status": action
         }
 
-    def get_quote_pdf(self, access_token: str, estimate_id: str):
+    async def get_quote_pdf(
+        self,
+        access_token: str,
+        estimate_id: str,
+        stream: bool = False,
+        if_none_match: str | None = None
+    ):
             headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
             params = {
                 "organization_id": self.org_id,
@@ -338,27 +342,21 @@ class QuoteService:
                 "accept": "pdf"
             }
 
-            response = requests.get(
+            # Raw PDF bytes, or a response object for the client;
+            # cached per last_modified_time of the estimate
+            return await fetch_zoho_pdf(
                 f"{self.base_url}/estimates/{estimate_id}",
                 headers=headers,
                 params=params,
-                timeout=30
+                error_message=f"Failed to fetch PDF for estimate {estimate_id}",
+                stream=stream,
+                document_key="estimate",
+                if_none_match=if_none_match
             )
-
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail={
-                        "message": f"Failed to fetch PDF for estimate {estimate_id}",
-                        "zoho_response": response.json() if "application/json" in response.headers.get("Content-Type","") else None
-                    }
-                )
-
-            return response.content  # raw PDF bytes
     # -----------------------------
     # Add Comment
     # -----------------------------
-    def add_comment(
+    async def add_comment(
     self,
     access_token: str,
     estimate_id: str,
@@ -371,18 +369,18 @@ class QuoteService:
         }
 
         # ONE call – everything handled internally
-        meta_block = build_comment_meta(email=email)
+        meta_block = await build_comment_meta(email=email)
 
         payload = {
             "description": meta_block + description
         }
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/estimates/{estimate_id}/comments",
             headers=headers,
             json=payload,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code not in (200, 201):
@@ -394,13 +392,14 @@ class QuoteService:
                 }
             )
 
+        zoho_comment_feed.invalidate("estimates", estimate_id)
         return response.json()
 
 
     # -----------------------------
     # Update Comment
     # -----------------------------
-    def update_comment(self, access_token: str, estimate_id: str, comment_id: str, description: str):
+    async def update_comment(self, access_token: str, estimate_id: str, comment_id: str, description: str):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}",
             "Content-Type": "application/json"
@@ -408,12 +407,12 @@ class QuoteService:
 
         payload = {"description": description}
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/estimates/{estimate_id}/comments/{comment_id}",
             headers=headers,
             json=payload,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code != 200:
@@ -425,20 +424,21 @@ class QuoteService:
                 }
             )
 
+        zoho_comment_feed.invalidate("estimates", estimate_id)
         return response.json()
     # -----------------------------
     # Delete Comment
     # -----------------------------
-    def delete_comment(self, access_token: str, estimate_id: str, comment_id: str):
+    async def delete_comment(self, access_token: str, estimate_id: str, comment_id: str):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}"
         }
 
-        response = requests.delete(
+        response = await zoho_async_http.delete(
             f"{self.base_url}/estimates/{estimate_id}/comments/{comment_id}",
             headers=headers,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code != 200:
@@ -450,99 +450,16 @@ class QuoteService:
                 }
             )
 
+        zoho_comment_feed.invalidate("estimates", estimate_id)
         return {"message": "Comment deleted successfully"}
     # -----------------------------
     # List Comments
     # -----------------------------
-    def get_comments(self, access_token: str, estimate_id: str):
-        headers = {
-            "Authorization": f"Zoho-oauthtoken {access_token}"
-        }
-
-        response = requests.get(
-            f"{self.base_url}/estimates/{estimate_id}/comments",
-            headers=headers,
-            params={"organization_id": self.org_id},
-            timeout=15
+    async def get_comments(self, access_token: str, estimate_id: str):
+        # Cached per estimate; system comments (no meta block) are dropped
+        return await zoho_comment_feed.get_comments(
+            access_token,
+            "estimates",
+            estimate_id,
+            error_message=f"Failed to fetch comments for estimate {estimate_id}"
         )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "message": f"Failed to fetch comments for estimate {estimate_id}",
-                    "zoho_response": response.json()
-                }
-            )
-
-        comments = response.json().get("comments", [])
-        result = []
-
-        for c in comments:
-            meta = extract_comment_meta(c.get("description", ""))
-
-            description = c.get("description", "")
-            if "[CUSTOM_META]" not in description:
-                continue
-
-            result.append({
-                "comment_id": c.get("comment_id", ""),
-                "estimate_id": c.get("estimate_id", ""),
-                "description": strip_comment_meta(c.get("description", "")),
-                "commented_by": meta.get("customer_name", c.get("commented_by", "")),
-                "commented_by_id": meta.get("customer_id", c.get("commented_by_id", "")),
-                "comment_type": "client",
-                "date": c.get("date", ""),
-                "date_description": c.get("date_description", ""),
-                "time": c.get("time", ""),
-                "comments_html_format": c.get("comments_html_format", "")
-            })
-
-        return result
-
-
-
-# -----------------------------
-# Comment Meta Utilities
-# -----------------------------
-    def _build_comment_meta(self, meta: dict) -> str:
-        """
-        Build metadata block to embed in comment description
-        """
-        if not meta:
-            return ""
-
-        lines = "\n".join(f"{k}={v}" for k, v in meta.items())
-        return f"[CUSTOM_META]\n{lines}\n[/CUSTOM_META]\n\n"
-
-
-    def _extract_comment_meta(self, description: str) -> dict:
-        """
-        Extract metadata from comment description
-        """
-        if not description:
-            return {}
-
-        match = re.search(r"\[CUSTOM_META\](.*?)\[/CUSTOM_META\]", description, re.S)
-        if not match:
-            return {}
-
-        meta_lines = match.group(1).strip().split("\n")
-        return {
-            k.strip(): v.strip()
-            for line in meta_lines
-            if "=" in line
-            for k, v in [line.split("=", 1)]
-        }
-
-
-    def _strip_comment_meta(self, description: str) -> str:
-        """
-        Remove metadata block from description for UI
-        """
-        return re.sub(
-            r"\[CUSTOM_META\].*?\[/CUSTOM_META\]\s*",
-            "",
-            description or "",
-            flags=re.S
-        ).strip()
@@ -1,8 +1,11 @@
-import requests
+from services.zoho_pdf import fetch_zoho_pdf
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
 from fastapi import HTTPException, status
 import config
 from services.zoho_contact_service import ZohoContactService
-from utils.comment_meta_util import build_comment_meta, extract_comment_meta, strip_comment_meta
+from services.zoho_comment_feed import zoho_comment_feed
+from services.zoho_dashboard_service import zoho_dashboard_service
+from utils.comment_meta_util import build_comment_meta
 
 
 class RetainerInvoiceService:
@@ -14,30 +17,30 @@ class RetainerInvoiceService:
     # -----------------------------
     # Utility: resolve contact_id from email
     # -----------------------------
-    def _resolve_contact_id(self, contact_id: str) -> str:
+    async def _resolve_contact_id(self, contact_id: str) -> str:
         if "@" in contact_id:  # treat as email
-            contact = self.contact_service.get_contact_id_by_email(contact_id)
+            contact = await self.contact_service.get_contact_id_by_email(contact_id)
             return contact["contact_id"]
         return contact_id
 
     # -----------------------------
     # Create Retainer Invoice
     # -----------------------------
-    def create_retainer_invoice(self, access_token: str, payload):
+    async def create_retainer_invoice(self, access_token: str, payload):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}",
             "Content-Type": "application/json"
         }
-        contact_id = self._resolve_contact_id(payload.contact_id)
+        contact_id = await self._resolve_contact_id(payload.contact_id)
 
         # Build line items
         line_items = []
         for item in payload.items:
-            item_response = requests.get(
+            item_response = await zoho_async_http.get(
                 f"{self.base_url}/items/{item.item_id}",
                 headers=headers,
                 params={"organization_id": self.org_id},
-                timeout=15
+                timeout=zoho_async_timeout()
             )
             if item_response.status_code != 200:
                 raise HTTPException(
@@ -63,12 +66,12 @@ class RetainerInvoiceService:
             "notes": payload.notes or "Retainer invoice created from customer portal"
         }
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/retainerinvoices",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 201:
             raise HTTPException(
@@ -78,20 +81,31 @@ class RetainerInvoiceService:
                     "zoho_response": response.json()
                 }
             )
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json()["retainer_invoice"]
 
     # -----------------------------
     # List Retainer Invoices for Customer
     # -----------------------------
-    def list_retainer_invoices_for_customer(self, access_token: str, contact_id: str):
+    async def list_retainer_invoices_for_customer(
+        self, access_token: str, contact_id: str, page: int = 1, per_page: int = config.ZOHO_PAGE_SIZE
+    ):
+        """
+        One page of the customer's retainer invoices; returns (records, page_context).
+        """
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
-        response = requests.get(
+        response = await zoho_async_http.get(
             f"{self.base_url}/retainerinvoices",
             headers=headers,
-            params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            params={
+                "organization_id": self.org_id,
+                "customer_id": contact_id,
+                "page": page,
+                "per_page": per_page
+            },
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -101,20 +115,21 @@ class RetainerInvoiceService:
                     "zoho_response": response.json()
                 }
             )
-        return response.json().get("retainerinvoices", [])
+        data = response.json()
+        return data.get("retainerinvoices", []), data.get("page_context", {})
 
     # -----------------------------
     # Get Retainer Invoice Details
     # -----------------------------
-    def get_retainer_invoice(self, access_token: str, retainerinvoice_id: str, contact_id: str):
+    async def get_retainer_invoice(self, access_token: str, retainerinvoice_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
-        response = requests.get(
+        response = await zoho_async_http.get(
             f"{self.base_url}/retainerinvoices/{retainerinvoice_id}",
             headers=headers,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -129,21 +144,21 @@ class RetainerInvoiceService:
     # -----------------------------
     # ERP Review Retainer Invoice
     # -----------------------------
-    def review_retainer_invoice(self, access_token: str, retainerinvoice_id: str, payload, reviewer_id: str, contact_id: str):
+    async def review_retainer_invoice(self, access_token: str, retainerinvoice_id: str, payload, reviewer_id: str, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
         body = {
             "status": payload.status,
             "notes": payload.notes or f"Reviewed by ERP user {contact_id}"
         }
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/retainerinvoices/{retainerinvoice_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -153,26 +168,27 @@ class RetainerInvoiceService:
                     "zoho_response": response.json()
                 }
             )
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json().get("retainer_invoice", {})
 
     # -----------------------------
     # Customer Approval Retainer Invoice
     # -----------------------------
-    def customer_approve_retainer_invoice(self, access_token: str, retainerinvoice_id: str, payload, contact_id: str):
+    async def customer_approve_retainer_invoice(self, access_token: str, retainerinvoice_id: str, payload, contact_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
 
         body = {
             "status": payload.status,
             "notes": payload.notes or f"Response from customer {contact_id}"
         }
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/retainerinvoices/{retainerinvoice_id}",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id, "customer_id": contact_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -182,72 +198,34 @@ class RetainerInvoiceService:
                     "zoho_response": response.json()
                 }
             )
+        zoho_dashboard_service.invalidate(contact_id)
         return response.json().get("retainerinvoice", {})
     
-    def get_retainer_invoice_pdf(self, access_token: str, retainerinvoice_id: str):
+    async def get_retainer_invoice_pdf(self, access_token: str, retainerinvoice_id: str, stream: bool = False):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
         params = {"organization_id": self.org_id, "print": "true", "accept": "pdf"}
-        response = requests.get(f"{self.base_url}/retainerinvoices/{retainerinvoice_id}",
-                                headers=headers, params=params, timeout=30)
-        if response.status_code != 200:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                                detail={"message": "Failed to fetch retainer invoice PDF",
-                                        "zoho_response": response.json()})
-        return response.content
+        return await fetch_zoho_pdf(f"{self.base_url}/retainerinvoices/{retainerinvoice_id}",
+                                    headers=headers, params=params,
+                                    error_message="Failed to fetch retainer invoice PDF", stream=stream)
     # -----------------------------
     # Get Retainer Invoice Comments
     # -----------------------------
-    def list_comments(self, access_token: str, retainerinvoice_id: str):
-        headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-
-        response = requests.get(
-            f"{self.base_url}/retainerinvoices/{retainerinvoice_id}/comments",
-            headers=headers,
-            params={"organization_id": self.org_id},
-            timeout=15
+    async def list_comments(self, access_token: str, retainerinvoice_id: str):
+        # Cached per retainer invoice; system comments (no meta block) are dropped
+        return await zoho_comment_feed.get_comments(
+            access_token,
+            "retainerinvoices",
+            retainerinvoice_id,
+            error_message=f"Failed to get comments for retainer invoice {retainerinvoice_id}"
         )
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "message": f"Failed to get comments for retainer invoice {retainerinvoice_id}",
-                    "zoho_response": response.json()
-                }
-            )
-
-        comments = response.json().get("comments", [])
-        result = []
-
-        for c in comments:
-            meta = extract_comment_meta(c.get("description", ""))
-
-            description = c.get("description", "")
-            if "[CUSTOM_META]" not in description:
-                continue
-
-            result.append({
-                "comment_id": c.get("comment_id", ""),
-                "retainerinvoice_id": retainerinvoice_id,
-                "description": strip_comment_meta(c.get("description", "")),
-                "commented_by": meta.get("customer_name", c.get("commented_by", "")),
-                "commented_by_id": meta.get("customer_id", c.get("commented_by_id", "")),
-                "comment_type": "client",
-                "date": c.get("date", ""),
-                "date_description": c.get("date_description", ""),
-                "time": c.get("time", ""),
-                "comments_html_format": c.get("comments_html_format", "")
-            })
-
-        return result
-
 
 
 
     # -----------------------------
     # Add Comment
     # -----------------------------
-    def add_comment(
+    async def add_comment(
     self,
     access_token: str,
     retainerinvoice_id: str,
@@ -259,18 +237,18 @@ class RetainerInvoiceService:
             "Content-Type": "application/json"
         }
 
-        meta_block = build_comment_meta(email=email)
+        meta_block = await build_comment_meta(email=email)
 
         body = {
             "description": meta_block + description
         }
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/retainerinvoices/{retainerinvoice_id}/comments",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code not in (200, 201):
@@ -282,6 +260,7 @@ class RetainerInvoiceService:
                 }
             )
 
+        zoho_comment_feed.invalidate("retainerinvoices", retainerinvoice_id)
         return response.json()
 
 
@@ -289,18 +268,18 @@ class RetainerInvoiceService:
     # -----------------------------
     # Update Comment
     # -----------------------------
-    def update_comment(self, access_token: str, retainerinvoice_id: str, comment_id: str, payload: dict):
+    async def update_comment(self, access_token: str, retainerinvoice_id: str, comment_id: str, payload: dict):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}",
             "Content-Type": "application/json"
         }
 
-        response = requests.put(
+        response = await zoho_async_http.put(
             f"{self.base_url}/retainerinvoices/{retainerinvoice_id}/comments/{comment_id}",
             headers=headers,
             json=payload,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code != 200:
@@ -311,20 +290,22 @@ class RetainerInvoiceService:
                     "zoho_response": response.json()
                 }
             )
+
+        zoho_comment_feed.invalidate("retainerinvoices", retainerinvoice_id)
         return response.json().get("comment", {})
 
 
     # -----------------------------
     # Delete Comment
     # -----------------------------
-    def delete_comment(self, access_token: str, retainerinvoice_id: str, comment_id: str):
+    async def delete_comment(self, access_token: str, retainerinvoice_id: str, comment_id: str):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
 
-        response = requests.delete(
+        response = await zoho_async_http.delete(
             f"{self.base_url}/retainerinvoices/{retainerinvoice_id}/comments/{comment_id}",
             headers=headers,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code != 200:
@@ -335,4 +316,6 @@ class RetainerInvoiceService:
                     "zoho_response": response.json()
                 }
             )
+
+        zoho_comment_feed.invalidate("retainerinvoices", retainerinvoice_id)
         return {"message": "Comment deleted successfully"}
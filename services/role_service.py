@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from uuid import UUID
 from models import Role
+from utils.privilege_cache import privilege_cache
 from typing import List, Optional
 
 
@@ -60,4 +61,5 @@ class RoleService:
         role = self.get_role(role_id)
         self.db.delete(role)
         self.db.commit()
+        privilege_cache.invalidate()
         return True
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from models import RoleModulePrivilege
+from utils.privilege_cache import privilege_cache
 
 
 class RoleModulePrivilegeService:
@@ -50,6 +51,7 @@ class RoleModulePrivilegeService:
         except IntegrityError as e:
             self.db.rollback()
             raise ValueError(f"Failed to create privilege: {str(e)}")
+        privilege_cache.invalidate()
         return privilege
 
     # ----------------- READ -----------------
@@ -99,6 +101,7 @@ class RoleModulePrivilegeService:
 
         self.db.commit()
         self.db.refresh(privilege)
+        privilege_cache.invalidate()
         return privilege
 
     # ----------------- DELETE -----------------
@@ -106,6 +109,7 @@ class RoleModulePrivilegeService:
         privilege = self.get_privilege(privilege_id)
         self.db.delete(privilege)
         self.db.commit()
+        privilege_cache.invalidate()
         return True
     def delete_privileges_by_role(self, role_id: int):
         privs = self.db.query(RoleModulePrivilege).filter(
@@ -116,6 +120,7 @@ class RoleModulePrivilegeService:
             self.db.delete(p)
 
         self.db.commit()
+        privilege_cache.invalidate()
 
     def create_or_update_privilege(self, data: dict):
         existing = (
@@ -135,10 +140,12 @@ class RoleModulePrivilegeService:
                     setattr(existing, field, data[field])
             self.db.commit()
             self.db.refresh(existing)
+            privilege_cache.invalidate()
             return existing
 
         privilege = RoleModulePrivilege(**data)
         self.db.add(privilege)
         self.db.commit()
         self.db.refresh(privilege)
+        privilege_cache.invalidate()
         return privilege
@@ -1,4 +1,6 @@
-import requests
+from services.zoho_pdf import fetch_zoho_pdf
+from services.zoho_pdf_cache import statement_version
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
 from fastapi import HTTPException, status
 import config
 from services.zoho_contact_service import ZohoContactService
@@ -8,25 +10,25 @@ class StatementService:
         self.base_url = f"{config.ZOHO_API_BASE}/books/v3"
         self.org_id = config.ZOHO_ORG_ID
         self.contact_service = ZohoContactService()
-    def _resolve_contact_id(self, contact_id: str) -> str:
+    async def _resolve_contact_id(self, contact_id: str) -> str:
         if "@" in contact_id:  # treat as email
-            contact = self.contact_service.get_contact_id_by_email(contact_id)
+            contact = await self.contact_service.get_contact_id_by_email(contact_id)
             return contact["contact_id"]
         return contact_id
 
     # -----------------------------
     # Email Customer Statement
     # -----------------------------
-    def email_customer_statement(self, access_token: str, contact_id: str, email_body: str = None):
+    async def email_customer_statement(self, access_token: str, contact_id: str, email_body: str = None):
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}", "Content-Type": "application/json"}
         body = {"body": email_body or "Please find attached your account statement."}
-        contact_id = self._resolve_contact_id(contact_id)
-        response = requests.post(
+        contact_id = await self._resolve_contact_id(contact_id)
+        response = await zoho_async_http.post(
             f"{self.base_url}/contacts/{contact_id}/statements/email",
             headers=headers,
             json=body,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -38,14 +40,14 @@ class StatementService:
     # -----------------------------
     # Get Statement Email History
     # -----------------------------
-    def get_statement_email_history(self, access_token: str, contact_id: str):
-        contact_id = self._resolve_contact_id(contact_id)
+    async def get_statement_email_history(self, access_token: str, contact_id: str):
+        contact_id = await self._resolve_contact_id(contact_id)
         headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
-        response = requests.get(
+        response = await zoho_async_http.get(
             f"{self.base_url}/contacts/{contact_id}/statements/email",
             headers=headers,
             params={"organization_id": self.org_id},
-            timeout=15
+            timeout=zoho_async_timeout()
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -54,7 +56,7 @@ class StatementService:
             )
         return response.json().get("statement_emails", [])
     
-    def email_customer_statement(
+    async def email_customer_statement(
     self,
     access_token: str,
     contact_id: str,
@@ -80,12 +82,12 @@ class StatementService:
         if end_date:
             params["end_date"] = end_date
 
-        response = requests.post(
+        response = await zoho_async_http.post(
             f"{self.base_url}/contacts/{contact_id}/statements/email",
             headers=headers,
             json=body,
             params=params,
-            timeout=15
+            timeout=zoho_async_timeout()
         )
 
         if response.status_code not in (200, 201):
@@ -99,19 +101,21 @@ class StatementService:
 
         return response.json()
 
-    def get_statement_pdf(
+    async def get_statement_pdf(
         self,
         access_token: str,
         contact_id: str,
         #organization_id: str,
         start_date: str | None = None,
-        end_date: str | None = None
+        end_date: str | None = None,
+        stream: bool = False,
+        if_none_match: str | None = None
     ):
         headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}",
             "Accept": "application/pdf"
         }
-        contact_id = self._resolve_contact_id(contact_id)
+        contact_id = await self._resolve_contact_id(contact_id)
         params = {"organization_id": self.org_id}
 
         if start_date:
@@ -119,14 +123,13 @@ class StatementService:
         if end_date:
             params["end_date"] = end_date
 
-        response = requests.get(
+        # Binary PDF, or a ZohoPdfStream to pipe to the client
+        return await fetch_zoho_pdf(
             f"{self.base_url}/contacts/{contact_id}/statements",
             headers=headers,
             params=params,
-            timeout=15
+            error_message="Failed to fetch customer statement PDF",
+            stream=stream,
+            cache_key=f"statement:{contact_id}:{statement_version(start_date, end_date)}",
+            if_none_match=if_none_match
         )
-
-        if response.status_code != 200:
-            raise Exception(response.json())
-
-        return response.content  # <-- binary PDF
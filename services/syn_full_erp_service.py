@@ -1,15 +1,18 @@
+import asyncio
 import base64
 import datetime
+import json
 from operator import or_
 from bson.binary import Binary
 import asyncpg
-from sqlalchemy import UUID, func
-from sqlalchemy.orm import Session
+from sqlalchemy import UUID, case, func
+from sqlalchemy.orm import Session, defer, joinedload
 from datetime import date
 from fastapi import HTTPException, status
-from config import POSTGRES_CONFIG
+from fastapi.concurrency import run_in_threadpool
+from config import POSTGRES_CONFIG, ERP_DOC_SYNC_BATCH_SIZE, ERP_DOC_SYNC_QUEUE_SIZE, ERP_DOC_SYNC_UPLOADERS
 from models import (
-    CategoryDetails, CategoryMaster, CompanyProduct, Product, ProductCategory, ProductSubCategory, User, UserAddress, UserDocument, UserRole, CompanyBankInfo,
+    AddressTypeEnum, CategoryDetails, CategoryMaster, City, CompanyProduct, Country, Product, ProductCategory, ProductSubCategory, User, State, UserAddress, UserDocument, UserRole, CompanyBankInfo,
     CompanyTaxInfo, CompanyBankDocument, CompanyTaxDocument
 )
 from models import UserDocument
@@ -25,117 +28,135 @@ class ERPSyncService:
             except (TypeError, ValueError):
                 return None
     @classmethod
-    def build_party_json(cls, db: Session):
+    def build_party_json(cls, db: Session, user_ids: list = None):
         """
         Build ERP Party JSON payload.
-        - Only include users with erp_sync_status = 'pending' or NULL
+        - Only include users with erp_sync_status = 'pending' or NULL;
+          with user_ids (outbox changes) exactly those users, whatever
+          their status: a full sync may have marked them completed after
+          the change was recorded
         - If user has erp_external_id → UPDATE payload
         - Else → INSERT payload
+
+        Set-based: users, their primary address (with city/state/country
+        ERP ids), tax, bank and role info are loaded in one query each,
+        whatever the number of users.
         """
- 
-        
- 
-        # Fetch users pending ERP sync
-        users = db.query(User).filter(
-            (User.erp_sync_status == None) | (User.erp_sync_status == "pending"),
-            User.plan_id != None
-        ).all()
- 
+
+        # Fetch users pending ERP sync (or changed, per the outbox)
+        query = db.query(User).filter(User.plan_id != None)
+        if user_ids is not None:
+            query = query.filter(User.id.in_(user_ids))
+        else:
+            query = query.filter((User.erp_sync_status == None) | (User.erp_sync_status == "pending"))
+        users = query.all()
+
         if not users:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No pending users found"
             )
- 
-        insert_payload = []
-        update_payload = []
- 
-        for user in users:
- 
-            # ---------------- Primary Address (Office always wins) ----------------
 
-            # 1️⃣ Office address (HIGHEST priority)
-            primary_address = (
-                db.query(UserAddress)
-                .filter(
-                    UserAddress.user_id == user.id,
-                    UserAddress.address_type == "office"
-                )
-                .order_by(UserAddress.id.asc())
-                .first()
-            )
+        user_ids = [user.id for user in users]
 
-            # 2️⃣ If no office → fallback to existing primary
-            if not primary_address:
-                primary_address = (
-                    db.query(UserAddress)
-                    .filter(
-                        UserAddress.user_id == user.id,
-                        UserAddress.is_primary.is_(True)
-                    )
-                    .first()
+        # ---------------- Primary Address (Office always wins) ----------------
+        # One row per user: office first, then the current primary,
+        # then any (lowest id)
+        priority = case(
+            (UserAddress.address_type == AddressTypeEnum.office, 0),
+            (UserAddress.is_primary.is_(True), 1),
+            else_=2
+        )
+        addresses = {
+            row.user_id: row
+            for row in (
+                db.query(
+                    UserAddress.id,
+                    UserAddress.user_id,
+                    UserAddress.address_line1,
+                    UserAddress.address_line2,
+                    City.erp_external_id.label("city_erp_id"),
+                    State.erp_external_id.label("state_erp_id"),
+                    Country.erp_external_id.label("country_erp_id"),
                 )
+                .outerjoin(City, City.id == UserAddress.city_id)
+                .outerjoin(State, State.id == UserAddress.state_id)
+                .outerjoin(Country, Country.id == UserAddress.country_id)
+                .filter(UserAddress.user_id.in_(user_ids))
+                .distinct(UserAddress.user_id)
+                .order_by(UserAddress.user_id, priority, UserAddress.id.asc())
+                .all()
+            )
+        }
 
-            # 3️⃣ If still none → pick any
-            if not primary_address:
-                primary_address = (
-                    db.query(UserAddress)
-                    .filter(UserAddress.user_id == user.id)
-                    .order_by(UserAddress.id.asc())
-                    .first()
-                )
+        for user in users:
+            primary_address = addresses.get(user.id)
 
-            # 4️⃣ No address → error
+            # No address → error
             if not primary_address:
                 raise HTTPException(
                     status_code=400,
                     detail=f"No address found for user {user.id}"
                 )
 
-            # 5️⃣ Enforce rules:
-            #    - office = true
-            #    - communication = false
-
-            db.query(UserAddress).filter(
-                UserAddress.user_id == user.id
-            ).update(
-                {UserAddress.is_primary: False},
-                synchronize_session="fetch"
-            )
-
-            primary_address.is_primary = True
-            db.add(primary_address)
-            db.flush()
-
-
-
- 
             missing = []
-            if not primary_address.city or not primary_address.city.erp_external_id:
+            if not primary_address.city_erp_id:
                 missing.append("city")
-            if not primary_address.state or not primary_address.state.erp_external_id:
+            if not primary_address.state_erp_id:
                 missing.append("state")
-            if not primary_address.country or not primary_address.country.erp_external_id:
+            if not primary_address.country_erp_id:
                 missing.append("country")
- 
+
             if missing:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Missing address ERP mapping {missing} for user {user.id}"
                 )
- 
-            # ---------------- Other Info ----------------
-            tax_info = db.query(CompanyTaxInfo).filter(
-                CompanyTaxInfo.company_id == user.id
-            ).first()
- 
-            bank_info = db.query(CompanyBankInfo).filter(
-                CompanyBankInfo.company_id == user.id
-            ).first()
- 
-            user_role = db.query(UserRole).filter(
-                UserRole.user_id == user.id
-            ).first()
+
+        # Enforce: the chosen address is the only primary one (single UPDATE)
+        primary_ids = [address.id for address in addresses.values()]
+        db.query(UserAddress).filter(
+            UserAddress.user_id.in_(user_ids),
+            UserAddress.is_primary.is_distinct_from(UserAddress.id.in_(primary_ids))
+        ).update(
+            {UserAddress.is_primary: UserAddress.id.in_(primary_ids)},
+            synchronize_session=False
+        )
+
+        # ---------------- Other Info (first row per user) ----------------
+        def first_per(rows, key):
+            result = {}
+            for row in rows:
+                result.setdefault(getattr(row, key), row)
+            return result
+
+        tax_infos = first_per(
+            db.query(CompanyTaxInfo)
+            .filter(CompanyTaxInfo.company_id.in_(user_ids))
+            .order_by(CompanyTaxInfo.id.asc()),
+            "company_id"
+        )
+        bank_infos = first_per(
+            db.query(CompanyBankInfo)
+            .filter(CompanyBankInfo.company_id.in_(user_ids))
+            .order_by(CompanyBankInfo.id.asc()),
+            "company_id"
+        )
+        user_roles = first_per(
+            db.query(UserRole.user_id, UserRole.assigned_at)
+            .filter(UserRole.user_id.in_(user_ids))
+            .order_by(UserRole.user_id, UserRole.role_id),
+            "user_id"
+        )
+
+        insert_payload = []
+        update_payload = []
+
+        for user in users:
+            primary_address = addresses[user.id]
+            tax_info = tax_infos.get(user.id)
+            bank_info = bank_infos.get(user.id)
+            user_role = user_roles.get(user.id)
  
             # ---------------- Party Payload ----------------
             partymast = {
@@ -163,9 +184,9 @@ class ERPSyncService:
                 "add1": primary_address.address_line1,
                 "add2": primary_address.address_line2 or "",
                 "add3": "",
-                "city": cls.safe_int(primary_address.city.erp_external_id),
-                "bcs_state": cls.safe_int(primary_address.state.erp_external_id),
-                "country": cls.safe_int(primary_address.country.erp_external_id),
+                "city": cls.safe_int(primary_address.city_erp_id),
+                "bcs_state": cls.safe_int(primary_address.state_erp_id),
+                "country": cls.safe_int(primary_address.country_erp_id),
  
                 # -------- Tax --------
                 "panno": tax_info.pan if tax_info else None,
@@ -231,16 +252,29 @@ class ERPSyncService:
 
     
     @classmethod
-    async def build_itemmaster_json(cls, db: Session):
+    async def build_itemmaster_json(cls, db: Session, product_ids: list = None):
         from sqlalchemy.orm import joinedload
         from sqlalchemy import or_
         
-        products = db.query(Product).options(joinedload(Product.gst_slab)).filter(
-            or_(
-                Product.erp_sync_status == "pending",
-                Product.erp_sync_status.is_(None)
+        query = db.query(Product).options(
+            joinedload(Product.gst_slab),
+            joinedload(Product.category_obj),
+            joinedload(Product.subcategory_obj),
+        )
+        # Outbox changes are synced whatever their status: a full sync may
+        # have marked them completed after the change was recorded
+        if product_ids is not None:
+            query = query.filter(Product.id.in_(product_ids))
+        else:
+            query = query.filter(
+                or_(
+                    Product.erp_sync_status == "pending",
+                    Product.erp_sync_status.is_(None)
+                )
             )
-        ).all()
+        # Blocking ORM load off the event loop (relations eager, so the
+        # payload loop below does no lazy loads)
+        products = await run_in_threadpool(query.all)
 
         if not products:
             raise HTTPException(status_code=404, detail="No pending products to sync")
@@ -248,6 +282,12 @@ class ERPSyncService:
         insert_payload = []
         update_payload = []
 
+        # ⚡ All HSN ids in one batch (first product's description wins)
+        hsn_codes = {}
+        for p in products:
+            hsn_codes.setdefault(p.hsn_code, p.description)
+        hsn_ids = await ERPService.get_or_create_hsncode_ids(hsn_codes)
+
         for p in products:
             sku = p.sku or ""
             desc = f"{p.name}-{p.material_code}" if p.name and p.material_code else ""
@@ -271,12 +311,9 @@ class ERPSyncService:
             gst_name = p.gst_slab.name if p.gst_slab else None
             igst_per = cls.extract_gst_percentage(gst_name)
 
-            # ⚡ Await async HSN ID
-            hsn_id = await ERPService.get_or_create_hsncode_id(p.hsn_code, p.description)
-
             itemtax = {
                 "igstper": igst_per,
-                "hsncode": hsn_id
+                "hsncode": hsn_ids[p.hsn_code]
             }
 
             # ---------------- UPDATE ----------------
@@ -390,102 +427,81 @@ class ERPSyncService:
  
  
     @classmethod
-    def build_vendor_json(cls, db: Session, folder_name: str = "vendor"):
+    def iter_vendor_documents(cls, db: Session, folder_name: str = "vendor"):
         """
-        Build vendor JSON for all users with non-null plan_id,
-        grouped by erp_external_id.
-        Each user/company will include:
-          - bank_documents
-          - tax_documents
-          - user_documents
+        Vendor document export as NDJSON text, one line per pending vendor:
+          {"erp_id": ..., "bank_documents": [...], "tax_documents": [...],
+           "user_documents": [...]}
+        Document rows are loaded without file_data; each file is read
+        (and base64 encoded) only when it is written, so memory is bounded
+        by the largest document.
+        Read-only: sync state (users.erp_sync_status drives the partymast
+        sync) is left to the sync jobs.
         """
         users = (
-            db.query(User)
+            db.query(User.id, User.erp_external_id)
             .filter(
                 ((User.erp_sync_status == None) | (User.erp_sync_status == "pending")) &
-                (User.plan_id != None)  # <-- Only users with a plan
+                (User.plan_id != None)
             )
             .all()
         )
- 
-        if not users:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No pending users with plan found"
-            )
- 
-        final_result = {}
- 
-        for user in users:
-            erp_id = user.erp_external_id or str(user.id)
- 
-            # Fetch related documents
-            tax_docs = (
-                db.query(CompanyTaxDocument)
-                .join(CompanyTaxInfo, CompanyTaxInfo.id == CompanyTaxDocument.company_tax_info_id)
-                .filter(CompanyTaxInfo.company_id == user.id)
-                .all()
-            )
- 
-            bank_docs = (
-                db.query(CompanyBankDocument)
-                .join(CompanyBankInfo, CompanyBankInfo.id == CompanyBankDocument.company_bank_info_id)
-                .filter(CompanyBankInfo.company_id == user.id)
-                .all()
-            )
- 
-            user_docs = (
-                db.query(UserDocument)
-                .filter(UserDocument.user_id == user.id)
-                .all()
+
+        for user_id, erp_external_id in users:
+            groups = (
+                (
+                    "bank_documents",
+                    CompanyBankDocument,
+                    db.query(CompanyBankDocument)
+                    .join(CompanyBankInfo, CompanyBankInfo.id == CompanyBankDocument.company_bank_info_id)
+                    .filter(CompanyBankInfo.company_id == user_id)
+                    .options(joinedload(CompanyBankDocument.document_type_detail)),
+                    lambda doc: (doc.file_name, doc.document_type_detail.name),
+                ),
+                (
+                    "tax_documents",
+                    CompanyTaxDocument,
+                    db.query(CompanyTaxDocument)
+                    .join(CompanyTaxInfo, CompanyTaxInfo.id == CompanyTaxDocument.company_tax_info_id)
+                    .filter(CompanyTaxInfo.company_id == user_id)
+                    .options(joinedload(CompanyTaxDocument.category_detail)),
+                    lambda doc: (doc.file_name, doc.category_detail.name),
+                ),
+                (
+                    "user_documents",
+                    UserDocument,
+                    db.query(UserDocument)
+                    .filter(UserDocument.user_id == user_id)
+                    .options(joinedload(UserDocument.categorydetails)),
+                    lambda doc: (doc.document_name, doc.categorydetails.name),
+                ),
             )
- 
-            # Prepare JSON lists
-            tax_docs_json = [
-                {
-                    "file_name": td.file_name,
-                    "file_data": td.file_data,
-                    "category_detail_name": td.category_detail.name,
-                    "folder_name": folder_name
-                }
-                for td in tax_docs
-            ]
- 
-            bank_docs_json = [
-                {
-                    "file_name": bd.file_name,
-                    "file_data": bd.file_data,
-                    "category_detail_name": bd.document_type_detail.name,
-                    "folder_name": folder_name
-                }
-                for bd in bank_docs
-            ]
- 
-            user_docs_json = [
-                {
-                    "file_name": ud.document_name,
-                    "file_data": ud.file_data,
-                    "category_detail_name": ud.categorydetails.name,
-                    "folder_name": folder_name
-                }
-                for ud in user_docs
-            ]
- 
-            final_result[erp_id] = {
-                "bank_documents": bank_docs_json,
-                "tax_documents": tax_docs_json,
-                "user_documents": user_docs_json
-            }
- 
-            # Mark all documents as synced
-            for doc in tax_docs + bank_docs + user_docs:
-                doc.erp_sync_status = "completed"
- 
-            # Mark user ERP sync as completed
-            user.erp_sync_status = "completed"
- 
-        db.commit()
-        return final_result
+
+            yield "{" + json.dumps("erp_id") + ": " + json.dumps(erp_external_id or str(user_id))
+
+            for key, model, query, describe in groups:
+                yield ", " + json.dumps(key) + ": ["
+
+                docs = query.options(defer(model.file_data)).all()
+                for i, doc in enumerate(docs):
+                    file_name, category_detail_name = describe(doc)
+                    file_data = db.query(model.file_data).filter(model.id == doc.id).scalar()
+
+                    yield (", " if i else "") + json.dumps({
+                        "file_name": file_name,
+                        "file_data": base64.b64encode(file_data).decode("ascii") if file_data else None,
+                        "category_detail_name": category_detail_name,
+                        "folder_name": folder_name,
+                    })
+                    del file_data
+
+                yield "]"
+
+            yield "}\n"
+
+            # Nothing is written; don't let the identity map grow per vendor
+            db.expunge_all()
+
     @classmethod
     def build_branchmast_json(cls, db: Session):
         """
@@ -538,103 +554,171 @@ class ERPSyncService:
  
  
  
+    # Document masters whose files go to partymastdoc once a vendor has
+    # uploaded every document of the master
+    PARTYMASTDOC_MASTERS = ("Company Documents", "Tax Documents", "Bank Document Types")
+
     @classmethod
-    async def fetch_and_insert_partymastdoc(cls, db: Session, folder_name: str = None):
-        users = db.query(User).filter(User.erp_external_id.isnot(None)).all()
-        inserted_results = []
- 
-        # Initialize ERP pool once
+    def _partymastdoc_plan(cls, db: Session) -> list:
+        """
+        Documents to sync (metadata only, no file_data): those of vendors
+        with an ERP id, in each master the vendor has completed.
+        Completeness is counted for all vendors at once (GROUP BY).
+        """
+        master_ids = [
+            master_id for (master_id,) in db.query(CategoryMaster.id)
+            .filter(CategoryMaster.name.in_(cls.PARTYMASTDOC_MASTERS))
+            .all()
+        ]
+        if not master_ids:
+            return []
+
+        required = dict(
+            db.query(CategoryDetails.category_master_id, func.count(CategoryDetails.id))
+            .filter(CategoryDetails.category_master_id.in_(master_ids))
+            .group_by(CategoryDetails.category_master_id)
+            .all()
+        )
+
+        uploaded = (
+            db.query(UserDocument.user_id, CategoryDetails.category_master_id, func.count(UserDocument.id))
+            .join(CategoryDetails, UserDocument.category_detail_id == CategoryDetails.id)
+            .join(User, User.id == UserDocument.user_id)
+            .filter(
+                User.erp_external_id.isnot(None),
+                CategoryDetails.category_master_id.in_(master_ids),
+                UserDocument.is_active == True
+            )
+            .group_by(UserDocument.user_id, CategoryDetails.category_master_id)
+            .all()
+        )
+        complete = {
+            (user_id, master_id)
+            for user_id, master_id, count in uploaded
+            if count == required.get(master_id, 0)
+        }
+        if not complete:
+            return []
+
+        docs = (
+            db.query(
+                UserDocument.id,
+                UserDocument.user_id,
+                UserDocument.document_name,
+                UserDocument.content_type,
+                CategoryDetails.name.label("doctype"),
+                CategoryDetails.category_master_id,
+                User.erp_external_id,
+            )
+            .join(CategoryDetails, UserDocument.category_detail_id == CategoryDetails.id)
+            .join(User, User.id == UserDocument.user_id)
+            .filter(
+                User.erp_external_id.isnot(None),
+                CategoryDetails.category_master_id.in_(master_ids)
+            )
+            .order_by(UserDocument.user_id)
+            .all()
+        )
+        return [doc for doc in docs if (doc.user_id, doc.category_master_id) in complete]
+
+    @classmethod
+    async def fetch_and_insert_partymastdoc(cls, db: Session, folder_name: str = None, report=None):
+        """
+        Upload the documents of every ERP vendor's completed masters
+        (company / tax / bank) to Mongo and register them in partymastdoc.
+
+        Pipelined over bounded queues so reading, uploading and ERP
+        writes overlap:
+          reader   → file_data of ERP_DOC_SYNC_BATCH_SIZE documents per query
+          uploader → MongoService.insert_many in the thread pool
+                     (ERP_DOC_SYNC_UPLOADERS in parallel)
+          writer   → one insert_data per batch of partymastdoc rows
+        At most ERP_DOC_SYNC_QUEUE_SIZE batches wait between two stages,
+        which bounds memory. report: optional async callback(done, total).
+        """
         await ERPService.init_pool()
- 
-        # Helper to get master ID
-        def get_master_id(name):
-            return db.query(CategoryMaster.id).filter(CategoryMaster.name == name).scalar()
- 
-        company_master_id = get_master_id("Company Documents")
-        tax_master_id = get_master_id("Tax Documents")
-        bank_master_id = get_master_id("Bank Document Types")
- 
-        for user in users:
-            erp_id = user.erp_external_id
-            user_id = user.id
- 
-            # Check if master is complete
-            def is_master_complete(master_id):
-                required_count = db.query(func.count(CategoryDetails.id)).filter(
-                    CategoryDetails.category_master_id == master_id
-                ).scalar()
-                uploaded_count = db.query(func.count(UserDocument.id)).join(
-                    CategoryDetails, UserDocument.category_detail_id == CategoryDetails.id
-                ).filter(
-                    UserDocument.user_id == user_id,
-                    CategoryDetails.category_master_id == master_id,
-                    UserDocument.is_active == True
-                ).scalar()
-                return uploaded_count == required_count
- 
-            include_company = is_master_complete(company_master_id)
-            include_tax = is_master_complete(tax_master_id)
-            include_bank = is_master_complete(bank_master_id)
- 
-            if not any([include_company, include_tax, include_bank]):
-                continue
- 
-            all_docs = db.query(UserDocument, CategoryDetails).join(
-                CategoryDetails, UserDocument.category_detail_id == CategoryDetails.id
-            ).filter(
-                UserDocument.user_id == user_id,
-                CategoryDetails.category_master_id.in_([
-                    company_master_id if include_company else -1,
-                    tax_master_id if include_tax else -1,
-                    bank_master_id if include_bank else -1
-                ])
-            ).all()
- 
-            for doc, cat in all_docs:
-                # Convert file_data to Mongo Binary
-                mongo_binary = None
-                if doc.file_data:
-                    if isinstance(doc.file_data, memoryview):
-                        file_bytes = bytes(doc.file_data)
-                    else:
-                        file_bytes = doc.file_data
-                    mongo_binary = Binary(file_bytes)
- 
-                mongo_payload = {
-                    "filename": doc.document_name,
-                    "filetype": getattr(doc, "content_type", None),  # fixed field
-                    "fileContent": mongo_binary,
-                    "foldername": folder_name
-                }
- 
-                # Insert into Mongo (sync call; safe if fast)
+
+        plan = await run_in_threadpool(cls._partymastdoc_plan, db)
+        total = len(plan)
+        inserted_results = []
+        if not plan:
+            return inserted_results
+
+        batch_size = max(1, ERP_DOC_SYNC_BATCH_SIZE)
+        uploaders = max(1, ERP_DOC_SYNC_UPLOADERS)
+        to_upload = asyncio.Queue(maxsize=ERP_DOC_SYNC_QUEUE_SIZE)
+        to_write = asyncio.Queue(maxsize=ERP_DOC_SYNC_QUEUE_SIZE)
+
+        def load_files(batch):
+            file_data = dict(
+                db.query(UserDocument.id, UserDocument.file_data)
+                .filter(UserDocument.id.in_([doc.id for doc in batch]))
+                .all()
+            )
+            return [(doc, file_data.get(doc.id)) for doc in batch]
+
+        async def reader():
+            for start in range(0, total, batch_size):
+                await to_upload.put(await run_in_threadpool(load_files, plan[start:start + batch_size]))
+            for _ in range(uploaders):
+                await to_upload.put(None)
+
+        async def uploader():
+            while (batch := await to_upload.get()) is not None:
+                mongo_payloads = [
+                    {
+                        "filename": doc.document_name,
+                        "filetype": doc.content_type,
+                        "fileContent": Binary(bytes(file_data)) if file_data else None,
+                        "foldername": folder_name
+                    }
+                    for doc, file_data in batch
+                ]
                 try:
-                    mongo_result = MongoService.insert(mongo_payload)
+                    mongo_ids = await run_in_threadpool(MongoService.insert_many, mongo_payloads)
                 except Exception as e:
                     raise HTTPException(
                         status_code=500,
                         detail=f"Mongo insert failed: {str(e)}"
-                    )   
-                mongo_id = mongo_result.get("id") or str(mongo_result.get("_id"))
- 
-                partymastdoc_payload = [{
-                    "partymastdoc": {
-                        "partymastdocid": None,
-                        "partymastid": int(erp_id),
-                        "doctype": cat.name,
-                        "objectid": mongo_id,
-                        "attachfilename": mongo_payload["filename"]
+                    )
+
+                await to_write.put([
+                    {
+                        "partymastdoc": {
+                            "partymastdocid": None,
+                            "partymastid": int(doc.erp_external_id),
+                            "doctype": doc.doctype,
+                            "objectid": mongo_id,
+                            "attachfilename": doc.document_name
+                        }
                     }
-                }]
- 
-                # Insert into ERP asynchronously
-                insert_response = await ERPService.insert_data(partymastdoc_payload)
-                inserted_results.extend(insert_response)
- 
+                    for (doc, _), mongo_id in zip(batch, mongo_ids)
+                ])
+            await to_write.put(None)
+
+        async def writer():
+            finished = 0
+            while finished < uploaders:
+                rows = await to_write.get()
+                if rows is None:
+                    finished += 1
+                    continue
+                inserted_results.extend(await ERPService.insert_data(rows))
+                if report:
+                    await report(len(inserted_results), total)
+
+        tasks = [asyncio.create_task(reader()), asyncio.create_task(writer())]
+        tasks += [asyncio.create_task(uploader()) for _ in range(uploaders)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # A failed stage must not leave the others blocked on the queues
+            for task in tasks:
+                task.cancel()
+
         return inserted_results
- 
- 
- 
+
+
     @classmethod
     def build_omdetail(cls, db: Session, ombasic_id: str, company_id: UUID):
         """
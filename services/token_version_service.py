@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import config
+from models import UserTokenVersion
+
+
+class TokenVersionService:
+    """
+    Permission versions used to trust signed access-token claims.
+
+    The whole user_token_versions table is small (one int per user that
+    was issued a token) so it is snapshotted in memory and refreshed every
+    TOKEN_VERSION_CACHE_TTL_SECONDS. Bumps are applied to the local
+    snapshot immediately; other workers see them on their next refresh.
+
+    A user without a row has no trusted version: issuing a token creates
+    the row, and deleting the user removes it (ON DELETE CASCADE), so a
+    deleted user's tokens fall back to the DB lookup.
+    """
+
+    _lock = threading.Lock()
+    _versions: Dict[str, int] = {}
+    # Local writes (version, monotonic time) not yet known to be in a snapshot
+    _local: Dict[str, Tuple[Optional[int], float]] = {}
+    _loaded_at: float = 0.0
+
+    # ---------------------------------------------------------
+    # READ
+    # ---------------------------------------------------------
+    @classmethod
+    def get_version(cls, db: Session, user_id) -> Optional[int]:
+        """Current version, or None when the user has no version row."""
+        now = time.monotonic()
+
+        if not cls._loaded_at or now - cls._loaded_at >= config.TOKEN_VERSION_CACHE_TTL_SECONDS:
+            rows = db.query(UserTokenVersion.user_id, UserTokenVersion.version).all()
+            with cls._lock:
+                versions = {str(r.user_id): r.version for r in rows}
+
+                # Local writes made while the query ran may be missing from
+                # it; older ones were committed before it and are included
+                for key, (version, written_at) in cls._local.items():
+                    if written_at < now:
+                        continue
+                    if version is None:
+                        versions.pop(key, None)
+                    else:
+                        versions[key] = max(version, versions.get(key, 0))
+                cls._local = {k: v for k, v in cls._local.items() if v[1] >= now}
+
+                cls._versions = versions
+                cls._loaded_at = now
+
+        return cls._versions.get(str(user_id))
+
+    @classmethod
+    def is_current(cls, db: Session, user_id, version: Optional[int]) -> bool:
+        """True when a token's "pv" claim matches the user's current version."""
+        if version is None:
+            return False
+        current = cls.get_version(db, user_id)
+        return current is not None and version == current
+
+    # ---------------------------------------------------------
+    # WRITE
+    # ---------------------------------------------------------
+    @classmethod
+    def _remember(cls, user_id, version: Optional[int]):
+        key = str(user_id)
+        with cls._lock:
+            if version is None:
+                cls._versions.pop(key, None)
+            else:
+                cls._versions[key] = version
+            cls._local[key] = (version, time.monotonic())
+
+    @classmethod
+    def issue_version(cls, db: Session, user_id) -> int:
+        """Version to embed in a new token; creates the user's row if missing."""
+        version = cls.get_version(db, user_id)
+        if version is not None:
+            return version
+
+        row = db.get(UserTokenVersion, user_id)
+        if not row:
+            try:
+                row = UserTokenVersion(user_id=user_id, version=0)
+                db.add(row)
+                db.commit()
+            except IntegrityError:
+                # Concurrent login created it
+                db.rollback()
+                row = db.get(UserTokenVersion, user_id)
+
+        cls._remember(user_id, row.version)
+        return row.version
+
+    @classmethod
+    def bump(cls, db: Session, user_id) -> int:
+        """Invalidate every signed token issued to the user so far."""
+        row = db.get(UserTokenVersion, user_id)
+        if not row:
+            row = UserTokenVersion(user_id=user_id, version=0)
+            db.add(row)
+
+        row.version = (row.version or 0) + 1
+        db.commit()
+
+        cls._remember(user_id, row.version)
+        return row.version
+
+    @classmethod
+    def forget(cls, user_id):
+        """Stop trusting the user's tokens now (user deleted; the row cascades)."""
+        cls._remember(user_id, None)
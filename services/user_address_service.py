@@ -8,6 +8,7 @@ from models import User
 
 
 from utils.common_service import UTCDateTimeMixin
+from services.erp_change_outbox import record_change
 import uuid
 
 
@@ -74,6 +75,7 @@ class UserAddressService(UTCDateTimeMixin):
 
         # ---------------------------------------------------
 
+        record_change(db, "user", new_addr.user_id)
         db.commit()
         db.refresh(new_addr)
         return new_addr
@@ -156,6 +158,7 @@ class UserAddressService(UTCDateTimeMixin):
         # =================================================
 
         address.mts = cls._utc_now()
+        record_change(db, "user", address.user_id)
         db.commit()
         db.refresh(address)
         return address
@@ -167,6 +170,7 @@ class UserAddressService(UTCDateTimeMixin):
     def delete_user_address(cls, db: Session, address_id: int):
         address = cls.get_user_address(db, address_id)
         db.delete(address)
+        record_change(db, "user", address.user_id)
         db.commit()
         return {"detail": "Address deleted successfully"}
 
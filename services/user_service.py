@@ -9,7 +9,17 @@ from sqlalchemy import or_# <--- Import 'and_' for combined filtering
 
 import schemas
 from security_utils import get_password_hash
+from services.erp_change_outbox import record_change
+from services.token_version_service import TokenVersionService
 from utils.common_service import UTCDateTimeMixin
+
+# User fields embedded in access-token claims
+TOKEN_CLAIM_FIELDS = {"isactive", "plan_id"}
+# User columns that go into the ERP partymast payload (plan_id: only users
+# with a plan are synced)
+ERP_PARTY_FIELDS = {"firstname", "lastname", "email", "phone_number", "isactive", "plan_id"}
+
+
 class UserService(UTCDateTimeMixin):
 
     @classmethod
@@ -90,8 +100,12 @@ class UserService(UTCDateTimeMixin):
         for key, value in updates.items():
             setattr(db_user, key, value)
         db_user.mts = cls._utc_now(),
+        if ERP_PARTY_FIELDS & updates.keys():
+            record_change(db, "user", user_id)
         db.commit()
         db.refresh(db_user)
+        if TOKEN_CLAIM_FIELDS & updates.keys():
+            TokenVersionService.bump(db, user_id)
         return db_user
 
     def delete_user(cls,db: Session, user_id: uuid.UUID):
@@ -99,6 +113,9 @@ class UserService(UTCDateTimeMixin):
         if db_user:
             db.delete(db_user)
             db.commit()
+            # Its token version row is gone with it; stop trusting its
+            # signed claims in this worker right away
+            TokenVersionService.forget(user_id)
         return db_user
     @staticmethod
     def logout_user(db: Session, user_id: str, refresh_token: str | None = None) -> int:
@@ -123,6 +140,7 @@ class UserService(UTCDateTimeMixin):
             session.revoked_at = now
 
         db.commit()
+        TokenVersionService.bump(db, user_id)
         return len(sessions)
     
     @classmethod
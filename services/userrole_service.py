@@ -3,12 +3,19 @@ from typing import List, Set
 from uuid import UUID
 from sqlalchemy.orm import Session
 from models import UserRole, User, Role
+from services.token_version_service import TokenVersionService
+from utils.privilege_cache import privilege_cache
 
 
 class UserRoleService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _roles_changed(self, user_id: UUID):
+        """Drop cached privileges and outdate the user's token claims."""
+        privilege_cache.invalidate_user(user_id)
+        TokenVersionService.bump(self.db, user_id)
+
     # ----------------- CREATE / ASSIGN SINGLE -----------------
     def assign_role_to_user(self, user_id: UUID, role_id: int) -> UserRole:
         # Remove user from any other roles
@@ -22,6 +29,7 @@ class UserRoleService:
             self.db.add(user_role)
             self.db.commit()
             self.db.refresh(user_role)
+        self._roles_changed(user_id)
         return user_role
 
     # ----------------- CREATE / ASSIGN BULK -----------------
@@ -41,6 +49,8 @@ class UserRoleService:
                 self.db.refresh(user_role)
                 results.append(user_role)
 
+            self._roles_changed(user_id)
+
         return results
 
     # ----------------- READ -----------------
@@ -68,6 +78,7 @@ class UserRoleService:
         assignment.role_id = new_role_id
         self.db.commit()
         self.db.refresh(assignment)
+        self._roles_changed(assignment.user_id)
         return assignment
 
     # ----------------- DELETE / UNASSIGN -----------------
@@ -76,12 +87,14 @@ class UserRoleService:
         if user_role:
             self.db.delete(user_role)
             self.db.commit()
+        self._roles_changed(user_id)
         return True
 
     def unassign_role_from_user_by_id(self, user_role_id: int) -> bool:
         assignment = self.get_user_role(user_role_id)
         self.db.delete(assignment)
         self.db.commit()
+        self._roles_changed(assignment.user_id)
         return True
 
     # ----------------- SYNC -----------------
@@ -1,7 +1,20 @@
+import asyncio
+import json
+import os
+import threading
 import time
-import requests
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
 from fastapi import HTTPException
 import config
+from services.zoho_transport import zoho_http, zoho_timeout
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, store is still shared
+    fcntl = None
 
 # ------------------------------
 # Module-level token cache
@@ -9,19 +22,85 @@ import config
 _access_token: str | None = None
 _expiry_time: float = 0
 
+# One refresh in flight per process; other threads wait on it
+_refresh_lock = threading.Lock()
+_refresher_task: Optional[asyncio.Task] = None
+
+# Reuse a token only if it is valid for at least this long
+MIN_TOKEN_TTL_SECONDS = 60
+
+
+def _token_is_fresh(min_ttl: float = MIN_TOKEN_TTL_SECONDS) -> bool:
+    return bool(_access_token) and time.time() < (_expiry_time - min_ttl)
+
 
 def get_zoho_access_token() -> str:
     """
     Return a cached Zoho access token or refresh it if expired.
     Uses application-level OAuth.
+    Single-flight: concurrent callers wait for one refresh.
     """
-    global _access_token, _expiry_time
-
     # Reuse token if still valid (60s buffer)
-    if _access_token and time.time() < (_expiry_time - 60):
+    if _token_is_fresh():
+        return _access_token
+
+    with _refresh_lock:
+        # Another thread may have refreshed while we waited
+        if not _token_is_fresh():
+            _refresh_access_token(MIN_TOKEN_TTL_SECONDS)
+
+    return _access_token
+
+
+async def get_zoho_access_token_async() -> str:
+    """
+    Async-friendly accessor: returns the cached token without blocking,
+    and runs the (rare) refresh in the threadpool.
+    """
+    if _token_is_fresh():
         return _access_token
 
-    response = requests.post(
+    return await run_in_threadpool(get_zoho_access_token)
+
+
+def refresh_zoho_access_token_if_due() -> float:
+    """
+    Proactive refresh: renew the token once it is within
+    ZOHO_TOKEN_REFRESH_MARGIN_SECONDS of expiry.
+    Returns the current token's expiry time.
+    """
+    margin = config.ZOHO_TOKEN_REFRESH_MARGIN_SECONDS
+    if not _token_is_fresh(margin):
+        with _refresh_lock:
+            if not _token_is_fresh(margin):
+                _refresh_access_token(margin)
+    return _expiry_time
+
+
+# ------------------------------
+# Refresh (caller holds _refresh_lock)
+# ------------------------------
+def _refresh_access_token(min_ttl: float):
+    """
+    Adopt a token another worker stored if it is valid for min_ttl,
+    otherwise request a new one and store it for the other workers.
+    """
+    global _access_token, _expiry_time
+
+    with _shared_store_lock():
+        stored = _read_shared_token()
+        if stored and time.time() < stored["expiry_time"] - min_ttl:
+            _access_token, _expiry_time = stored["access_token"], stored["expiry_time"]
+            return
+
+        access_token, expiry_time = _request_access_token()
+        _write_shared_token(access_token, expiry_time)
+
+    _access_token, _expiry_time = access_token, expiry_time
+
+
+def _request_access_token() -> tuple[str, float]:
+    response = zoho_http.post(
         f"{config.ZOHO_ACCOUNTS_BASE}/oauth/v2/token",
         params={
             "refresh_token": config.ZOHO_REFRESH_TOKEN,
@@ -29,7 +108,7 @@ def get_zoho_access_token() -> str:
             "client_secret": config.ZOHO_CLIENT_SECRET,
             "grant_type": "refresh_token"
         },
-        timeout=10
+        timeout=zoho_timeout("oauth")
     )
 
     if response.status_code != 200:
@@ -49,7 +128,87 @@ def get_zoho_access_token() -> str:
             detail="Zoho response missing access_token"
         )
 
-    _access_token = data["access_token"]
-    _expiry_time = time.time() + int(data.get("expires_in", 3600))
+    return data["access_token"], time.time() + int(data.get("expires_in", 3600))
 
-    return _access_token
+
+# ------------------------------
+# Shared token store (one token for all workers on the host)
+# ------------------------------
+@contextmanager
+def _shared_store_lock():
+    """
+    Cross-process lock around read-or-refresh, so only one worker
+    calls Zoho when the shared token runs out.
+    """
+    path = config.ZOHO_TOKEN_STORE_PATH
+    if not path or fcntl is None:
+        yield
+        return
+
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_shared_token() -> Optional[dict]:
+    path = config.ZOHO_TOKEN_STORE_PATH
+    if not path:
+        return None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return {
+            "access_token": data["access_token"],
+            "expiry_time": float(data["expiry_time"]),
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_shared_token(access_token: str, expiry_time: float):
+    path = config.ZOHO_TOKEN_STORE_PATH
+    if not path:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"access_token": access_token, "expiry_time": expiry_time}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[WARN] Could not write Zoho token store {path}: {e}")
+
+
+# ------------------------------
+# Background refresher (started with the app)
+# ------------------------------
+async def _run_token_refresher():
+    while True:
+        try:
+            expiry_time = await run_in_threadpool(refresh_zoho_access_token_if_due)
+            delay = expiry_time - config.ZOHO_TOKEN_REFRESH_MARGIN_SECONDS - time.time()
+        except Exception as e:
+            print(f"[WARN] Zoho token refresh failed: {e}")
+            delay = 0
+        # Wake up shortly before the token enters the refresh margin
+        await asyncio.sleep(min(max(delay, 30), 600))
+
+
+def start_zoho_token_refresher():
+    global _refresher_task
+    if _refresher_task is None:
+        _refresher_task = asyncio.create_task(_run_token_refresher())
+
+
+async def stop_zoho_token_refresher():
+    global _refresher_task
+    if _refresher_task is not None:
+        _refresher_task.cancel()
+        try:
+            await _refresher_task
+        except asyncio.CancelledError:
+            pass
+        _refresher_task = None
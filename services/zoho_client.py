@@ -1,13 +1,16 @@
-import requests
+from fastapi import HTTPException, status
+
 import config
-from services.zoho_auth_service import get_zoho_access_token
+from services.zoho_auth_service import get_zoho_access_token, get_zoho_access_token_async
+from services.zoho_transport import zoho_async_http, zoho_async_timeout, zoho_http, zoho_timeout
 #from services.zoho_token_service import get_zoho_access_token
 
 
-def zoho_request(method: str, path: str, *, params=None, json=None):
+def zoho_request(method: str, path: str, *, params=None, json=None, timeout_kind: str = "default"):
     """
     Generic Zoho Books API caller
     Automatically handles OAuth token
+    Uses the shared keep-alive transport (services.zoho_transport)
     """
 
     access_token = get_zoho_access_token()
@@ -17,13 +20,73 @@ def zoho_request(method: str, path: str, *, params=None, json=None):
         "Content-Type": "application/json"
     }
 
-    response = requests.request(
+    response = zoho_http.request(
         method=method,
         url=f"{config.ZOHO_API_BASE}/books/v3{path}",
         headers=headers,
         params=params,
         json=json,
-        timeout=15
+        timeout=zoho_timeout(timeout_kind)
     )
 
     return response
+
+
+async def zoho_request_async(method: str, path: str, *, params=None, json=None, timeout_kind: str = "default"):
+    """
+    Async counterpart of zoho_request (same arguments, httpx response)
+    """
+
+    access_token = await get_zoho_access_token_async()
+
+    headers = {
+        "Authorization": f"Zoho-oauthtoken {access_token}",
+        "Content-Type": "application/json"
+    }
+
+    response = await zoho_async_http.request(
+        method=method,
+        url=f"{config.ZOHO_API_BASE}/books/v3{path}",
+        headers=headers,
+        params=params,
+        json=json,
+        timeout=zoho_async_timeout(timeout_kind)
+    )
+
+    return response
+
+
+async def zoho_paginate_async(path: str, key: str, *, params=None, per_page: int = config.ZOHO_PAGE_SIZE, timeout_kind: str = "default"):
+    """
+    Async generator over a Zoho list endpoint, one page of records at a time
+    Follows page_context.has_more_page; only the current page is held in memory
+    Raises HTTPException if a page cannot be fetched
+    """
+
+    page = 1
+    while True:
+        response = await zoho_request_async(
+            method="GET",
+            path=path,
+            params={
+                "organization_id": config.ZOHO_ORG_ID,
+                **(params or {}),
+                "page": page,
+                "per_page": per_page
+            },
+            timeout_kind=timeout_kind
+        )
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"message": f"Failed to fetch {path} (page {page})", "zoho_response": response.text}
+            )
+
+        data = response.json()
+        yield data.get(key, [])
+
+        if not data.get("page_context", {}).get("has_more_page"):
+            break
+
+        page += 1
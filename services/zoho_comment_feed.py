@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+import config
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
+from utils.comment_meta_util import parse_comment_description
+
+# Zoho document path → id field in the returned comments
+COMMENT_DOCUMENTS = {
+    "estimates": "estimate_id",
+    "invoices": "invoice_id",
+    "salesorders": "salesorder_id",
+    "retainerinvoices": "retainerinvoice_id",
+}
+
+
+def format_comment(comment: dict, id_field: str, document_id: str, comment_type: Optional[str] = "client") -> Optional[dict]:
+    """
+    Portal view of a Zoho comment, or None for Zoho's own (system)
+    comments, which carry no [CUSTOM_META] block.
+    comment_type=None takes the type recorded in the meta block.
+    """
+    meta, description = parse_comment_description(comment.get("description", ""))
+    if meta is None:
+        return None
+
+    return {
+        "comment_id": comment.get("comment_id", ""),
+        id_field: document_id,
+        "description": description,
+        "commented_by": meta.get("customer_name", comment.get("commented_by", "")),
+        "commented_by_id": meta.get("customer_id", comment.get("commented_by_id", "")),
+        "comment_type": comment_type or meta.get("comment_type", comment.get("comment_type", "")),
+        "date": comment.get("date", ""),
+        "date_description": comment.get("date_description", ""),
+        "time": comment.get("time", ""),
+        "comments_html_format": comment.get("comments_html_format", "")
+    }
+
+
+class ZohoCommentFeed:
+    """
+    Cached comment threads of Zoho documents (estimates, invoices, ...).
+
+    - one entry per document, kept for ttl_seconds (LRU, max_entries);
+      the services invalidate it whenever they add/edit/delete a comment
+    - concurrent loads of the same thread share one Zoho call
+    - get_many() loads many threads at once, at most `concurrency`
+      Zoho calls in flight
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, concurrency: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.concurrency = concurrency
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[dict]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    async def get_comments(
+        self,
+        access_token: str,
+        document: str,
+        document_id: str,
+        *,
+        comment_type: Optional[str] = "client",
+        error_message: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Portal comments of one document (Zoho's system comments dropped).
+        """
+        comments = await self._get_raw(access_token, document, document_id, error_message)
+        id_field = COMMENT_DOCUMENTS[document]
+
+        result = []
+        for comment in comments:
+            formatted = format_comment(comment, id_field, document_id, comment_type)
+            if formatted is not None:
+                result.append(formatted)
+        return result
+
+    async def get_many(
+        self,
+        access_token: str,
+        document: str,
+        document_ids: List[str],
+        *,
+        comment_type: Optional[str] = "client",
+    ) -> Tuple[Dict[str, List[dict]], Dict[str, str]]:
+        """
+        Comment threads of many documents: ({id: comments}, {id: error}).
+        One failing document does not fail the others.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        unique_ids = list(dict.fromkeys(document_ids))
+
+        async def load(document_id: str):
+            async with semaphore:
+                return await self.get_comments(access_token, document, document_id, comment_type=comment_type)
+
+        results = await asyncio.gather(*(load(i) for i in unique_ids), return_exceptions=True)
+
+        threads, errors = {}, {}
+        for document_id, result in zip(unique_ids, results):
+            if isinstance(result, HTTPException):
+                errors[document_id] = result.detail.get("message") if isinstance(result.detail, dict) else str(result.detail)
+            elif isinstance(result, Exception):
+                errors[document_id] = str(result)
+            else:
+                threads[document_id] = result
+        return threads, errors
+
+    def invalidate(self, document: str, document_id: str):
+        key = (document, document_id)
+        self._entries.pop(key, None)
+        # A load already in flight may predate the change: don't cache it
+        self._inflight.pop(key, None)
+
+    # ---------------------------------------------------------
+    # CACHE / FETCH
+    # ---------------------------------------------------------
+    async def _get_raw(self, access_token: str, document: str, document_id: str, error_message: Optional[str]) -> List[dict]:
+        key = (document, document_id)
+
+        cached = self._entries.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(access_token, document, document_id, error_message))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(key, done))
+
+        return await asyncio.shield(task)
+
+    def _forget_inflight(self, key: Tuple[str, str], task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _fetch(self, access_token: str, document: str, document_id: str, error_message: Optional[str]) -> List[dict]:
+        response = await zoho_async_http.get(
+            f"{config.ZOHO_API_BASE}/books/v3/{document}/{document_id}/comments",
+            headers={"Authorization": f"Zoho-oauthtoken {access_token}"},
+            params={"organization_id": config.ZOHO_ORG_ID},
+            timeout=zoho_async_timeout()
+        )
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": error_message or f"Failed to fetch comments for {document} {document_id}",
+                    "zoho_response": response.json()
+                }
+            )
+
+        comments = response.json().get("comments", [])
+
+        key = (document, document_id)
+        if self._inflight.get(key) is not asyncio.current_task():
+            return comments  # invalidated while loading
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, comments)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return comments
+
+
+zoho_comment_feed = ZohoCommentFeed(
+    ttl_seconds=config.ZOHO_COMMENT_CACHE_TTL_SECONDS,
+    max_entries=config.ZOHO_COMMENT_CACHE_MAX_ENTRIES,
+    concurrency=config.ZOHO_COMMENT_FETCH_CONCURRENCY,
+)
@@ -1,23 +1,64 @@
+from typing import Optional
+
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+
 from routers import module
-from services.zoho_client import zoho_request
+from database import SessionLocal
+from models import User
+from services.zoho_client import zoho_request_async
+from utils.contact_cache import contact_cache
 import config
 
 
 class ZohoContactService:
 
-    def get_contact_id_by_email(self, email: str) -> str:
+    async def get_contact_id_by_email(self, email: str) -> dict:
+        """
+        Resolve a customer email to its Zoho Books contact
+
+        Lookup order:
+        1. in-process cache (utils.contact_cache, incl. cached misses)
+        2. users.zoho_erp_id (when ZOHO_CONTACT_PERSIST)
+        3. Zoho /contacts?email= (result cached and persisted)
+        """
+
+        hit, contact = contact_cache.get(email)
+        if hit:
+            if contact is None:
+                raise self._not_found(email)
+            return contact
+
+        contact = None
+        if config.ZOHO_CONTACT_PERSIST:
+            contact = await run_in_threadpool(self._load_persisted_contact, email)
+
+        if contact is None:
+            try:
+                contact = await self.fetch_contact_by_email(email)
+            except HTTPException as e:
+                if e.status_code == status.HTTP_404_NOT_FOUND:
+                    contact_cache.set_missing(email)
+                raise
+
+            if config.ZOHO_CONTACT_PERSIST:
+                await run_in_threadpool(self._persist_contact_id, email, contact.get("contact_id"))
+
+        return contact_cache.set(email, contact)
+
+    async def fetch_contact_by_email(self, email: str) -> dict:
         """
-        Fetch Zoho Books contact_id using customer email
+        Fetch Zoho Books contact using customer email (uncached)
         """
 
-        response = zoho_request(
+        response = await zoho_request_async(
             method="GET",
             path="/contacts",
             params={
                 "organization_id": config.ZOHO_ORG_ID,
                 "email": email,
-               
+
             }
         )
 
@@ -34,10 +75,56 @@ class ZohoContactService:
         contacts = data.get("contacts", [])
 
         if not contacts:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"No Zoho contact found for email: {email}"
-            )
+            raise self._not_found(email)
 
         # Return the first matching contact
         return contacts[0]
+
+    @staticmethod
+    def _not_found(email: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No Zoho contact found for email: {email}"
+        )
+
+    # -----------------------------
+    # Persisted mapping (users.zoho_erp_id)
+    # -----------------------------
+    @staticmethod
+    def _load_persisted_contact(email: str) -> Optional[dict]:
+        db = SessionLocal()
+        try:
+            user = (
+                db.query(User.email, User.firstname, User.lastname, User.zoho_erp_id)
+                .filter(func.lower(User.email) == contact_cache.normalize(email))
+                .first()
+            )
+            if not user or not user.zoho_erp_id:
+                return None
+
+            return {
+                "contact_id": user.zoho_erp_id,
+                "contact_name": " ".join(p for p in (user.firstname, user.lastname) if p) or None,
+                "email": user.email,
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def _persist_contact_id(email: str, contact_id: Optional[str]):
+        if not contact_id:
+            return
+
+        db = SessionLocal()
+        try:
+            # Never overwrite an existing mapping (owned by the Zoho user sync)
+            db.query(User).filter(
+                func.lower(User.email) == contact_cache.normalize(email),
+                User.zoho_erp_id.is_(None)
+            ).update({User.zoho_erp_id: contact_id}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[WARN] Could not persist zoho_erp_id for {email}: {e}")
+        finally:
+            db.close()
@@ -1,143 +1,126 @@
-from services.zoho_client import zoho_request
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from services.zoho_client import zoho_paginate_async
 import config
 
+# ------------------------------
+# Dashboard sources: name → (path, response key, id field)
+# ------------------------------
+DASHBOARD_SOURCES = {
+    "estimates": ("/estimates", "estimates", "estimate_id"),
+    "invoices": ("/invoices", "invoices", "invoice_id"),
+    "salesorders": ("/salesorders", "salesorders", "salesorder_id"),
+    "customerpayments": ("/customerpayments", "customerpayments", "payment_id"),
+    "retainerinvoices": ("/retainerinvoices", "retainerinvoices", "retainerinvoice_id"),
+}
 
-class ZohoDashboardService:
+# Only the fields the summary reads are kept in the cache
+SUMMARY_FIELDS = (
+    "status",
+    "total",
+    "balance",
+    "credits_applied",
+    "amount",
+    "date",
+    "last_modified_time",
+)
 
-    def _safe_list(self, path: str, contact_id: str, key: str):
-        """
-        Fetch list-based Zoho resources but NEVER fail.
-        Returns [] on any error.
-        """
-        try:
-            response = zoho_request(
-                method="GET",
-                path=path,
-                params={
-                    "organization_id": config.ZOHO_ORG_ID,
-                    "customer_id": contact_id
-                }
-            )
 
-            if response.status_code != 200:
-                print(f"[WARN] {path} returned {response.status_code}: {response.text}")
-                return []
+class DashboardAggregates:
+    """
+    Running dashboard totals, fed one record at a time so a customer's
+    lists never have to be held in memory.
+    """
 
-            data = response.json()
-            return data.get(key, [])
+    def __init__(self):
+        # Estimates
+        self.total_estimates_amount = 0.0
+        self.total_estimates_count = 0
+        self.pending_quotes = 0
 
-        except Exception as e:
-            print(f"[ERROR] Failed to fetch {path}: {e}")
-            return []
+        # Invoices
+        self.total_invoices_amount = 0.0
+        self.total_invoices_count = 0
+        self.outstanding_balance = 0.0
+        self.outstanding_count = 0
+        self.unused_credits = 0.0
 
-    # ----------- FETCHERS (safe) ------------
+        # Retainers
+        self.available_retainers = 0.0
+        self.available_retainer_count = 0
 
-    def get_quotes(self, contact_id: str):
-        return self._safe_list("/estimates", contact_id, "estimates")
+        # Sales orders (count per status)
+        self.sales_order_status: Dict[str, int] = {}
 
-    def get_invoices(self, contact_id: str):
-        return self._safe_list("/invoices", contact_id, "invoices")
+        # Payments
+        self.last_payment: Optional[dict] = None
 
-    def get_sales_orders(self, contact_id: str):
-        return self._safe_list("/salesorders", contact_id, "salesorders")
+    def add(self, source: str, record: dict):
+        if source == "estimates":
+            # -------- QUOTES SUMMARY --------
+            if record.get("status", "").lower() == "sent":
+                self.pending_quotes += 1
+            self.total_estimates_amount += float(record.get("total", 0) or 0)
+            self.total_estimates_count += 1
 
-    def get_payments(self, contact_id: str):
-        return self._safe_list("/customerpayments", contact_id, "customerpayments")
+        elif source == "invoices":
+            # -------- INVOICES SUMMARY --------
+            self.total_invoices_amount += float(record.get("total", 0) or 0)
+            self.total_invoices_count += 1
 
-    def get_retainer_invoices(self, contact_id: str):
-        return self._safe_list(
-            "/retainerinvoices",
-            contact_id,
-            "retainerinvoices"
-        )
+            balance = float(record.get("balance", 0) or 0)
+            if balance > 0:
+                self.outstanding_balance += balance
+                self.outstanding_count += 1
 
-    # ----------- MAIN SUMMARY BUILDER ------------
+            self.unused_credits += float(record.get("credits_applied", 0) or 0)
 
-    def build_dashboard_summary(self, contact_id: str) -> dict:
-
-        quotes = self.get_quotes(contact_id)
-        invoices = self.get_invoices(contact_id)
-        sales_orders = self.get_sales_orders(contact_id)
-        payments = self.get_payments(contact_id)
-        retainers = self.get_retainer_invoices(contact_id)
-
-        # -------- QUOTES SUMMARY --------
-        pending_quotes = len([
-            q for q in quotes
-            if q.get("status", "").lower() == "sent"
-        ])
-        total_estimates_amount = sum(
-            float(q.get("total", 0) or 0) for q in quotes
-        )
-        total_estimates_count = len(quotes)
+        elif source == "retainerinvoices":
+            # -------- AVAILABLE RETAINERS (CORRECT) --------
+            total = float(record.get("total", 0) or 0)
+            if record.get("status", "").lower() not in ("cancelled", "void") and total > 0:
+                self.available_retainers += total
+                self.available_retainer_count += 1
 
-        # -------- INVOICES SUMMARY --------
-        total_invoices_amount = sum(
-            float(i.get("total", 0) or 0) for i in invoices
-        )
-        total_invoices_count = len(invoices)
-
-        outstanding = [
-            i for i in invoices
-            if float(i.get("balance", 0) or 0) > 0
-        ]
-        outstanding_balance = sum(
-            float(i.get("balance", 0) or 0) for i in outstanding
-        )
-        outstanding_count = len(outstanding)
+        elif source == "salesorders":
+            # -------- SALES ORDERS SUMMARY --------
+            order_status = record.get("status", "").lower()
+            self.sales_order_status[order_status] = self.sales_order_status.get(order_status, 0) + 1
 
-        unused_credits = sum(
-            float(i.get("credits_applied", 0) or 0) for i in invoices
-        )
+        elif source == "customerpayments":
+            # -------- LAST PAYMENT --------
+            if self.last_payment is None or record.get("date", "") > self.last_payment.get("date", ""):
+                self.last_payment = record
 
-        # -------- AVAILABLE RETAINERS (CORRECT) --------
-        active_retainers = [
-            r for r in retainers
-            if r.get("status", "").lower() not in ("cancelled", "void")
-            and float(r.get("total", 0) or 0) > 0
-        ]
-
-        available_retainers = sum(
-            float(r.get("total", 0) or 0) for r in active_retainers
-        )
-        available_retainer_count = len(active_retainers)
-
-        # -------- SALES ORDERS SUMMARY --------
-        open_so = len([o for o in sales_orders if o.get("status", "").lower() == "open"])
-        packed_so = len([o for o in sales_orders if o.get("status", "").lower() == "packed"])
-        shipped_so = len([o for o in sales_orders if o.get("status", "").lower() == "shipped"])
-        draft_so = len([o for o in sales_orders if o.get("status", "").lower() == "draft"])
-
-        # -------- LAST PAYMENT --------
-        payments_sorted = sorted(
-            payments,
-            key=lambda x: x.get("date", ""),
-            reverse=True
-        )
-        last_payment = payments_sorted[0] if payments_sorted else None
+    def result(self) -> dict:
+        last_payment = self.last_payment
 
         return {
             # Estimates
-            "total_estimates_amount": total_estimates_amount,
-            "total_estimates_count": total_estimates_count,
-            "pending_quotes": pending_quotes,
+            "total_estimates_amount": self.total_estimates_amount,
+            "total_estimates_count": self.total_estimates_count,
+            "pending_quotes": self.pending_quotes,
 
             # Invoices
-            "total_invoices_amount": total_invoices_amount,
-            "total_invoices_count": total_invoices_count,
-            "outstanding_invoice_balance": outstanding_balance,
-            "outstanding_invoice_count": outstanding_count,
-            "unused_credits": unused_credits,
+            "total_invoices_amount": self.total_invoices_amount,
+            "total_invoices_count": self.total_invoices_count,
+            "outstanding_invoice_balance": self.outstanding_balance,
+            "outstanding_invoice_count": self.outstanding_count,
+            "unused_credits": self.unused_credits,
 
             # Available Retainers ✅
-            "available_retainers": available_retainers,
-            "available_retainer_count": available_retainer_count,
+            "available_retainers": self.available_retainers,
+            "available_retainer_count": self.available_retainer_count,
 
             # Sales Orders
-            "open_sales_orders": open_so,
-            "packed_sales_orders": packed_so,
-            "shipped_sales_orders": shipped_so,
-            "draft_sales_orders": draft_so,
+            "open_sales_orders": self.sales_order_status.get("open", 0),
+            "packed_sales_orders": self.sales_order_status.get("packed", 0),
+            "shipped_sales_orders": self.sales_order_status.get("shipped", 0),
+            "draft_sales_orders": self.sales_order_status.get("draft", 0),
 
             # Payments
             "last_payment_amount": last_payment.get("amount") if last_payment else None,
@@ -145,4 +128,237 @@ class ZohoDashboardService:
         }
 
 
+class DashboardCacheEntry:
+    """
+    Per-contact cached state: trimmed records per source (keyed by id),
+    the newest last_modified_time seen per source and the last summary.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict[str, dict]] = {name: {} for name in DASHBOARD_SOURCES}
+        self.cursors: Dict[str, Optional[str]] = {name: None for name in DASHBOARD_SOURCES}
+        self.summary: Optional[dict] = None
+        self.refreshed_at = 0.0
+        self.full_refreshed_at = 0.0
+
+
+class ZohoDashboardService:
+    """
+    Customer dashboard summaries.
+
+    Summaries are cached per contact:
+    - fresh for ZOHO_DASHBOARD_CACHE_TTL_SECONDS
+    - then served stale for up to ZOHO_DASHBOARD_STALE_SECONDS while a
+      background refresh runs
+    - refreshes are incremental (last_modified_time filter, changed records
+      folded into the cached ones); a full re-pull every
+      ZOHO_DASHBOARD_FULL_REFRESH_SECONDS picks up deletions
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = config.ZOHO_DASHBOARD_CACHE_TTL_SECONDS,
+        stale_seconds: float = config.ZOHO_DASHBOARD_STALE_SECONDS,
+        full_refresh_seconds: float = config.ZOHO_DASHBOARD_FULL_REFRESH_SECONDS,
+        max_contacts: int = config.ZOHO_DASHBOARD_CACHE_MAX_CONTACTS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.max_contacts = max_contacts
+        self._cache: "OrderedDict[str, DashboardCacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def _stream_source(
+        self,
+        source: str,
+        contact_id: str,
+        params: Optional[dict],
+        on_record: Callable[[dict], None],
+    ) -> bool:
+        """
+        Stream every page of a list-based Zoho resource into on_record
+        but NEVER fail. Returns False on any error.
+        """
+        path, key, _ = DASHBOARD_SOURCES[source]
+        try:
+            async for records in zoho_paginate_async(
+                path,
+                key,
+                params={"customer_id": contact_id, **(params or {})}
+            ):
+                for record in records:
+                    on_record(record)
+            return True
+
+        except Exception as e:
+            print(f"[ERROR] Failed to fetch {path}: {e}")
+            return False
+
+    # ----------- MAIN SUMMARY BUILDER ------------
+
+    async def _with_budget(self, source: str, fetch, timed_out: list):
+        """
+        Run one fetcher within the per-source time budget.
+        Returns False (and records the source) on timeout.
+        """
+        try:
+            return await asyncio.wait_for(
+                fetch,
+                timeout=config.ZOHO_DASHBOARD_SOURCE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            print(f"[WARN] dashboard source {source} timed out")
+            timed_out.append(source)
+            return False
+
+    async def _fetch_sources(
+        self,
+        contact_id: str,
+        sink: Callable[[str], Callable[[dict], None]],
+        cursors: Optional[dict] = None,
+    ):
+        """
+        Stream all five sources concurrently; latency ≈ slowest source.
+        sink(source) returns the per-record callback for that source.
+        With cursors, each source only returns records modified since
+        its cursor (Zoho last_modified_time filter).
+        Returns ({source: completed}, timed_out).
+        """
+        cursors = cursors or {}
+        timed_out: list[str] = []
+        results = await asyncio.gather(*(
+            self._with_budget(
+                name,
+                self._stream_source(
+                    name,
+                    contact_id,
+                    {"last_modified_time": cursors[name]} if cursors.get(name) else None,
+                    sink(name)
+                ),
+                timed_out
+            )
+            for name in DASHBOARD_SOURCES
+        ))
+        return dict(zip(DASHBOARD_SOURCES, results)), timed_out
+
+    # ----------- CACHED SUMMARY ------------
+
+    async def get_dashboard_summary(self, contact_id: str) -> dict:
+        """
+        Cached summary with stale-while-revalidate:
+        fresh → cached, stale → cached + background refresh,
+        expired / missing → refresh and wait.
+        """
+        entry = self._cache.get(contact_id)
+        if entry and entry.summary is not None:
+            self._cache.move_to_end(contact_id)
+            age = time.monotonic() - entry.refreshed_at
+            if age < self.ttl_seconds:
+                return entry.summary
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._refresh_in_background(contact_id)
+                return entry.summary
+
+        return await asyncio.shield(self._refresh_in_background(contact_id))
+
+    def invalidate(self, contact_id: Optional[str] = None):
+        """
+        Drop one contact's cached summary (or all of them), after a write
+        through the portal. A refresh already running may have read the
+        old data: it is detached, so its result is neither shared nor
+        stored.
+        """
+        if contact_id is None:
+            self._cache.clear()
+            self._inflight.clear()
+        else:
+            self._cache.pop(contact_id, None)
+            self._inflight.pop(contact_id, None)
+
+    def _refresh_in_background(self, contact_id: str) -> asyncio.Task:
+        """
+        Single-flight refresh per contact; concurrent callers share the task.
+        """
+        task = self._inflight.get(contact_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(contact_id))
+            self._inflight[contact_id] = task
+            task.add_done_callback(
+                lambda done: self._inflight.get(contact_id) is done and self._inflight.pop(contact_id)
+            )
+        return task
+
+    async def _refresh(self, contact_id: str) -> dict:
+        now = time.monotonic()
+        entry = self._cache.get(contact_id) or DashboardCacheEntry()
+        incremental = (
+            entry.summary is not None
+            and now - entry.full_refreshed_at < self.full_refresh_seconds
+        )
+
+        # Trimmed records are staged per source and only applied if the
+        # source completed; failed / timed-out sources keep the old ones
+        staged: Dict[str, Dict[str, dict]] = {name: {} for name in DASHBOARD_SOURCES}
+
+        def sink(name: str):
+            _, _, id_field = DASHBOARD_SOURCES[name]
+
+            def on_record(record: dict):
+                record_id = record.get(id_field)
+                if record_id:
+                    staged[name][record_id] = {
+                        f: record[f] for f in SUMMARY_FIELDS if f in record
+                    }
+
+            return on_record
+
+        completed, timed_out = await self._fetch_sources(
+            contact_id,
+            sink,
+            entry.cursors if incremental else None
+        )
+
+        for name, ok in completed.items():
+            if not ok:
+                continue
+
+            newest = max(
+                (r["last_modified_time"] for r in staged[name].values() if r.get("last_modified_time")),
+                default=None
+            )
+            if incremental:
+                entry.records[name].update(staged[name])
+                if newest and (entry.cursors[name] is None or newest > entry.cursors[name]):
+                    entry.cursors[name] = newest
+            else:
+                entry.records[name] = staged[name]
+                entry.cursors[name] = newest
+
+        aggregates = DashboardAggregates()
+        for name, records in entry.records.items():
+            for record in records.values():
+                aggregates.add(name, record)
+
+        summary = aggregates.result()
+        summary["timed_out_sources"] = timed_out
+        summary["refreshed_at"] = datetime.now(timezone.utc).isoformat()
+
+        if self._inflight.get(contact_id) is not asyncio.current_task():
+            # Invalidated while refreshing
+            return summary
+
+        entry.summary = summary
+        entry.refreshed_at = now
+        if not incremental:
+            entry.full_refreshed_at = now
+
+        self._cache[contact_id] = entry
+        self._cache.move_to_end(contact_id)
+        while len(self._cache) > self.max_contacts:
+            self._cache.popitem(last=False)
+
+        return summary
+
+
 zoho_dashboard_service = ZohoDashboardService()
@@ -0,0 +1,223 @@
+import asyncio
+import bisect
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from services.zoho_client import zoho_paginate_async, zoho_request_async
+from services.zoho_rate_limiter import zoho_bulk_priority
+import config
+
+
+class ZohoItemCatalog:
+    """
+    In-process mirror of the Zoho Books item catalog.
+
+    - full load by the background task started at app startup; until it
+      completes (loaded is False) callers go to Zoho directly instead of
+      waiting for it. Then incremental refreshes every
+      ZOHO_ITEM_CATALOG_REFRESH_SECONDS (last_modified_time filter, all
+      statuses so deactivated items drop out)
+    - a full re-pull every ZOHO_ITEM_CATALOG_FULL_REFRESH_SECONDS picks up
+      deleted items
+    - search: prefix matches on name / SKU (bisect over a sorted index)
+      first, then substring matches
+    - taxes (/settings/taxes) are cached for the same refresh interval
+    """
+
+    def __init__(
+        self,
+        refresh_seconds: float = config.ZOHO_ITEM_CATALOG_REFRESH_SECONDS,
+        full_refresh_seconds: float = config.ZOHO_ITEM_CATALOG_FULL_REFRESH_SECONDS,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+
+        self._items: Dict[str, dict] = {}
+        self._keys: Dict[str, Tuple[str, str]] = {}
+        self._ordered: List[dict] = []
+        self._prefix_index: List[tuple] = []
+        self._cursor: Optional[str] = None
+        self._loaded_at = 0.0
+        self._full_loaded_at = 0.0
+
+        self._taxes: Optional[dict] = None
+        self._taxes_loaded_at = 0.0
+
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._full_loaded_at > 0
+
+    # ---------------------------------------------------------
+    # LOOKUPS
+    # ---------------------------------------------------------
+    def get(self, item_id: str) -> Optional[dict]:
+        return self._items.get(item_id)
+
+    async def search(self, search_text: Optional[str] = None, page: int = 1, per_page: int = 200) -> dict:
+        """
+        Active items matching search_text (name / SKU), in the shape of
+        Zoho's GET /items response. Check loaded first: before the first
+        load completes this would return no items.
+        """
+        matches = self._match(search_text) if search_text else self._ordered
+        start = (page - 1) * per_page
+        items = matches[start:start + per_page]
+
+        return {
+            "code": 0,
+            "message": "success",
+            "items": items,
+            "page_context": {
+                "page": page,
+                "per_page": per_page,
+                "has_more_page": start + per_page < len(matches),
+                "search_text": search_text,
+            },
+        }
+
+    async def get_taxes(self) -> dict:
+        """
+        Cached /settings/taxes response.
+        """
+        if self._taxes is None or time.monotonic() - self._taxes_loaded_at >= self.refresh_seconds:
+            response = await zoho_request_async(
+                method="GET",
+                path="/settings/taxes",
+                params={"organization_id": config.ZOHO_ORG_ID}
+            )
+            if response.status_code != 200:
+                if self._taxes is not None:
+                    return self._taxes
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "message": "Failed to fetch taxes from Zoho Books",
+                        "zoho_response": response.json()
+                    }
+                )
+            self._taxes = response.json()
+            self._taxes_loaded_at = time.monotonic()
+
+        return self._taxes
+
+    def _match(self, search_text: str) -> List[dict]:
+        needle = search_text.strip().lower()
+        if not needle:
+            return self._ordered
+
+        # Prefix matches (name or SKU) via the sorted index
+        seen = set()
+        prefix = []
+        i = bisect.bisect_left(self._prefix_index, (needle,))
+        while i < len(self._prefix_index) and self._prefix_index[i][0].startswith(needle):
+            item_id = self._prefix_index[i][1]
+            if item_id not in seen:
+                seen.add(item_id)
+                prefix.append(self._items[item_id])
+            i += 1
+        prefix.sort(key=lambda item: self._sort_key(self._keys, item))
+
+        # Then substring matches
+        keys = self._keys
+        contains = [
+            item for item in self._ordered
+            if item["item_id"] not in seen
+            and (needle in keys[item["item_id"]][0] or needle in keys[item["item_id"]][1])
+        ]
+
+        return prefix + contains
+
+    @staticmethod
+    def _sort_key(keys: Dict[str, Tuple[str, str]], item: dict):
+        return keys[item["item_id"]][0], item["item_id"]
+
+    # ---------------------------------------------------------
+    # SYNC
+    # ---------------------------------------------------------
+    async def refresh(self, full: bool = False):
+        async with self._lock:
+            await self._refresh(full)
+
+    async def _refresh(self, full: bool):
+        now = time.monotonic()
+        full = full or not self.loaded or now - self._full_loaded_at >= self.full_refresh_seconds
+
+        params = {"filter_by": "Status.All"}
+        if not full and self._cursor:
+            params["last_modified_time"] = self._cursor
+
+        items = {} if full else dict(self._items)
+        cursor = None if full else self._cursor
+
+        async for page in zoho_paginate_async("/items", "items", params=params):
+            for item in page:
+                item_id = item.get("item_id")
+                if not item_id:
+                    continue
+
+                modified = item.get("last_modified_time")
+                if modified and (cursor is None or modified > cursor):
+                    cursor = modified
+
+                if item.get("status", "active") != "active":
+                    items.pop(item_id, None)
+                    continue
+
+                items[item_id] = item
+
+        self._rebuild(items)
+        self._cursor = cursor
+        self._loaded_at = now
+        if full:
+            self._full_loaded_at = now
+
+    def _rebuild(self, items: Dict[str, dict]):
+        keys = {
+            item_id: ((item.get("name") or "").lower(), (item.get("sku") or "").lower())
+            for item_id, item in items.items()
+        }
+        ordered = sorted(items.values(), key=lambda item: self._sort_key(keys, item))
+
+        prefix_index = []
+        for item_id, (name, sku) in keys.items():
+            prefix_index.append((name, item_id))
+            if sku:
+                prefix_index.append((sku, item_id))
+        prefix_index.sort()
+
+        # Swap in one go so readers never see a half-built index
+        self._items, self._keys = items, keys
+        self._ordered, self._prefix_index = ordered, prefix_index
+
+    # ---------------------------------------------------------
+    # BACKGROUND REFRESH
+    # ---------------------------------------------------------
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                with zoho_bulk_priority():
+                    await self.refresh()
+            except Exception as e:
+                print(f"[WARN] Zoho item catalog refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+zoho_item_catalog = ZohoItemCatalog()
@@ -1,6 +1,10 @@
+import asyncio
+
 from fastapi import HTTPException, status
 import config
 from services.zoho_client import zoho_request
+from services.zoho_item_catalog import zoho_item_catalog
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
 
 
 class ZohoItemService:
@@ -63,4 +67,67 @@ class ZohoItemService:
                 }
             )
 
-        return response.json()
\ No newline at end of file
+        return response.json()
+
+    # -----------------------------
+    # Line item resolution (quotes / invoices / sales orders)
+    # -----------------------------
+    async def get_items_by_ids(self, access_token: str, item_ids) -> dict:
+        """
+        Fetch several items in one pass: unique ids, requested concurrently
+        (at most ZOHO_ITEM_LOOKUP_CONCURRENCY in flight).
+        Returns {item_id: item}. Raises 400 if any item cannot be fetched.
+        """
+        headers = {"Authorization": f"Zoho-oauthtoken {access_token}"}
+        semaphore = asyncio.Semaphore(config.ZOHO_ITEM_LOOKUP_CONCURRENCY)
+
+        async def fetch(item_id: str):
+            async with semaphore:
+                response = await zoho_async_http.get(
+                    f"{config.ZOHO_API_BASE}/books/v3/items/{item_id}",
+                    headers=headers,
+                    params={"organization_id": config.ZOHO_ORG_ID},
+                    timeout=zoho_async_timeout()
+                )
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "message": f"Failed to fetch item {item_id}",
+                        "zoho_response": response.json()
+                    }
+                )
+            return item_id, response.json().get("item", {})
+
+        unique_ids = list(dict.fromkeys(item_ids))
+        return dict(await asyncio.gather(*(fetch(item_id) for item_id in unique_ids)))
+
+    async def build_line_items(self, access_token: str, items) -> list[dict]:
+        """
+        Zoho line_items for payload items (item_id + quantity),
+        priced from the local item catalog; items it doesn't have
+        are fetched from Zoho.
+        """
+        catalog = {}
+        if config.ZOHO_ITEM_CATALOG_ENABLED and zoho_item_catalog.loaded:
+            for item in items:
+                cached = zoho_item_catalog.get(item.item_id)
+                if cached:
+                    catalog[item.item_id] = cached
+
+        missing = [item.item_id for item in items if item.item_id not in catalog]
+        if missing:
+            catalog.update(await self.get_items_by_ids(access_token, missing))
+
+        line_items = []
+        for item in items:
+            item_data = catalog[item.item_id]
+            line_items.append({
+                "item_id": item.item_id,
+                "quantity": item.quantity,
+                "rate": item_data.get("rate", 0),
+                "name": item_data.get("name", ""),
+                "tax_id": "",
+                "tax_exemption_code": "NON"
+            })
+        return line_items
@@ -0,0 +1,225 @@
+from typing import Optional
+
+import anyio
+import httpx
+from fastapi import HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+import config
+from services.zoho_pdf_cache import zoho_pdf_cache
+from services.zoho_transport import zoho_async_http, zoho_async_timeout
+
+# Zoho response headers passed through to the client
+PASSTHROUGH_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+# Cached PDFs: browsers keep them but revalidate (If-None-Match → 304)
+CACHED_PDF_CACHE_CONTROL = "private, no-cache"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+class ZohoPdfStream:
+    """
+    An open Zoho PDF response whose body has not been read yet.
+    to_response() pipes it to the client chunk by chunk, so memory per
+    download stays constant however large the document is.
+    """
+
+    def __init__(self, response: httpx.Response, cache_key: Optional[str] = None):
+        self.response = response
+        self.cache_key = cache_key
+
+    @property
+    def headers(self) -> dict:
+        headers = {
+            name: self.response.headers[name]
+            for name in PASSTHROUGH_HEADERS
+            if name in self.response.headers
+        }
+        # aiter_bytes() yields decoded bytes: the upstream length only
+        # matches when Zoho didn't compress the body
+        if "Content-Length" in self.response.headers and "Content-Encoding" not in self.response.headers:
+            headers["Content-Length"] = self.response.headers["Content-Length"]
+        if self.cache_key:
+            headers["ETag"] = zoho_pdf_cache.etag_for(self.cache_key)
+            headers["Cache-Control"] = CACHED_PDF_CACHE_CONTROL
+        return headers
+
+    async def _body(self):
+        if not self.cache_key:
+            async for chunk in self.response.aiter_bytes():
+                yield chunk
+            return
+
+        # Tee into the PDF cache; only a complete download is kept. File
+        # writes, the rename and eviction run in the threadpool
+        temp = await run_in_threadpool(zoho_pdf_cache.open_temp)
+        complete = False
+        try:
+            async for chunk in self.response.aiter_bytes():
+                await run_in_threadpool(temp.write, chunk)
+                yield chunk
+            complete = True
+        finally:
+            # Shielded: a client disconnect must still close and drop the temp file
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(self._finish_cache, temp, complete)
+
+    def _finish_cache(self, temp, complete: bool):
+        temp.close()
+        if complete:
+            zoho_pdf_cache.commit(self.cache_key, temp.name)
+        else:
+            zoho_pdf_cache.discard(temp.name)
+
+    def to_response(self, headers: Optional[dict] = None) -> StreamingResponse:
+        return StreamingResponse(
+            self._body(),
+            media_type="application/pdf",
+            headers={**self.headers, **(headers or {})},
+            background=BackgroundTask(self.response.aclose),
+        )
+
+    async def aclose(self):
+        await self.response.aclose()
+
+
+class CachedPdf:
+    """
+    A PDF served from the local PDF cache.
+    """
+
+    def __init__(self, path: str, etag: str):
+        self.path = path
+        self.etag = etag
+
+    def to_response(self, headers: Optional[dict] = None) -> FileResponse:
+        return FileResponse(
+            self.path,
+            media_type="application/pdf",
+            headers={"ETag": self.etag, "Cache-Control": CACHED_PDF_CACHE_CONTROL, **(headers or {})},
+        )
+
+
+class NotModifiedPdf:
+    """
+    The client's copy (If-None-Match) is current.
+    """
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+    def to_response(self, headers: Optional[dict] = None) -> Response:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": self.etag, "Cache-Control": CACHED_PDF_CACHE_CONTROL},
+        )
+
+
+async def zoho_document_version(url: str, *, headers: dict, document_key: str) -> Optional[str]:
+    """
+    last_modified_time of a Zoho document (JSON, no PDF render), or None.
+    """
+    try:
+        response = await zoho_async_http.get(
+            url,
+            headers=headers,
+            params={"organization_id": config.ZOHO_ORG_ID},
+            timeout=zoho_async_timeout()
+        )
+        if response.status_code != 200:
+            return None
+        return response.json().get(document_key, {}).get("last_modified_time")
+    except Exception as e:
+        print(f"[WARN] Could not read version of {url}: {e}")
+        return None
+
+
+async def fetch_zoho_pdf(
+    url: str,
+    *,
+    headers: dict,
+    params: dict,
+    error_message: str,
+    stream: bool = False,
+    document_key: Optional[str] = None,
+    cache_key: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+):
+    """
+    GET a Zoho PDF. Returns the bytes, or (stream=True) an object with
+    to_response(): ZohoPdfStream, CachedPdf or NotModifiedPdf.
+
+    With document_key (e.g. "invoice") the PDF is cached under
+    url + the document's last_modified_time; cache_key sets the key
+    directly (statements). Raises 400 (with Zoho's JSON error, if any)
+    on a non-200 response.
+    """
+    if config.ZOHO_PDF_CACHE_ENABLED:
+        if document_key and not cache_key:
+            version = await zoho_document_version(url, headers=headers, document_key=document_key)
+            cache_key = f"{url}:{version}" if version else None
+
+        if cache_key:
+            etag = zoho_pdf_cache.etag_for(cache_key)
+            if stream and etag_matches(if_none_match, etag):
+                return NotModifiedPdf(etag)
+
+            cached_path = await run_in_threadpool(zoho_pdf_cache.get, cache_key)
+            if cached_path:
+                if stream:
+                    return CachedPdf(cached_path, etag)
+                return await run_in_threadpool(_read_file, cached_path)
+    else:
+        cache_key = None
+
+    request = zoho_async_http.build_request(
+        "GET",
+        url,
+        headers=headers,
+        params=params,
+        timeout=zoho_async_timeout("pdf")
+    )
+    response = await zoho_async_http.send(request, stream=True)
+
+    if response.status_code != 200:
+        await response.aread()
+        await response.aclose()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": error_message,
+                "zoho_response": response.json()
+                if "application/json" in response.headers.get("Content-Type", "")
+                else None
+            }
+        )
+
+    if stream:
+        return ZohoPdfStream(response, cache_key=cache_key)
+
+    try:
+        content = await response.aread()  # raw PDF bytes
+    finally:
+        await response.aclose()
+
+    if cache_key:
+        await run_in_threadpool(zoho_pdf_cache.put, cache_key, content)
+    return content
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+
+import config
+
+
+class ZohoPdfCache:
+    """
+    On-disk cache of rendered Zoho PDFs.
+
+    - entries are addressed by a version key (document id +
+      last_modified_time), so a changed document simply gets a new entry
+    - LRU by total size: hits touch the file's mtime, and the oldest files
+      are removed once the directory exceeds max_bytes
+    - writes go to a temp file that is renamed into place, so readers
+      (and other workers sharing the directory) never see partial PDFs
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def etag_for(key: str) -> str:
+        return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Path of the cached PDF for key, or None.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)  # LRU touch
+        except OSError:
+            return None
+        return path
+
+    def open_temp(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return open(os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp"), "wb")
+
+    def commit(self, key: str, temp_path: str):
+        """
+        Move a fully written temp file into the cache.
+        """
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, self._path(key))
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+            over = self._total_bytes is None or self._total_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def discard(self, temp_path: str):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+    def put(self, key: str, content: bytes):
+        with self.open_temp() as f:
+            f.write(content)
+        self.commit(key, f.name)
+
+    def _evict(self):
+        """
+        Rescan the directory (other workers write to it too) and delete
+        least recently used PDFs until the total fits in max_bytes.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+            self._total_bytes = total
+
+
+def statement_version(start_date: Optional[str], end_date: Optional[str]) -> str:
+    """
+    Statements have no last_modified_time: version them by date range
+    plus a time bucket of ZOHO_PDF_STATEMENT_TTL_SECONDS.
+    """
+    bucket = int(time.time() // config.ZOHO_PDF_STATEMENT_TTL_SECONDS)
+    return f"{start_date or ''}:{end_date or ''}:{bucket}"
+
+
+zoho_pdf_cache = ZohoPdfCache(
+    directory=config.ZOHO_PDF_CACHE_DIR,
+    max_bytes=config.ZOHO_PDF_CACHE_MAX_BYTES,
+)
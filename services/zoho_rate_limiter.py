@@ -0,0 +1,153 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import config
+
+# ------------------------------
+# Priority lanes
+# ------------------------------
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+_zoho_priority: ContextVar[str] = ContextVar("zoho_priority", default=PRIORITY_INTERACTIVE)
+
+
+def current_zoho_priority() -> str:
+    return _zoho_priority.get()
+
+
+@contextmanager
+def zoho_bulk_priority():
+    """
+    Mark Zoho calls made inside the block (and in threads/tasks started
+    from it) as bulk traffic, e.g. customer sync or catalog refresh.
+    """
+    token = _zoho_priority.set(PRIORITY_BULK)
+    try:
+        yield
+    finally:
+        _zoho_priority.reset(token)
+
+
+class ZohoRateLimiter:
+    """
+    Token bucket shared by every Zoho Books call in the process
+    (sync threads and async tasks alike).
+
+    - refills at rate_per_minute, holds at most `burst` tokens
+    - bulk calls may not take the last `bulk_reserve` tokens, and wait
+      entirely while interactive calls are queued, so portal requests
+      keep moving during a sync
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, bulk_reserve: int):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.bulk_reserve = min(bulk_reserve, max(burst - 1, 0))
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._interactive_waiting = 0
+
+    def _try_acquire(self, priority: str) -> float:
+        """
+        Take a token; returns 0 on success, otherwise seconds to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+
+            if priority == PRIORITY_INTERACTIVE:
+                floor = 0
+            elif self._interactive_waiting:
+                floor = self.burst
+            else:
+                floor = self.bulk_reserve
+
+            if self._tokens - 1 >= floor:
+                self._tokens -= 1
+                return 0.0
+
+            return max((1 + floor - self._tokens) / self.rate_per_second, 0.01)
+
+    def _wait_started(self, priority: str):
+        if priority == PRIORITY_INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += 1
+
+    def _wait_finished(self, priority: str):
+        if priority == PRIORITY_INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting -= 1
+
+    def acquire(self, priority: Optional[str] = None):
+        priority = priority or current_zoho_priority()
+        delay = self._try_acquire(priority)
+        if not delay:
+            return
+
+        self._wait_started(priority)
+        try:
+            while delay:
+                time.sleep(delay)
+                delay = self._try_acquire(priority)
+        finally:
+            self._wait_finished(priority)
+
+    async def acquire_async(self, priority: Optional[str] = None):
+        priority = priority or current_zoho_priority()
+        delay = self._try_acquire(priority)
+        if not delay:
+            return
+
+        self._wait_started(priority)
+        try:
+            while delay:
+                await asyncio.sleep(delay)
+                delay = self._try_acquire(priority)
+        finally:
+            self._wait_finished(priority)
+
+
+# ------------------------------
+# Retry policy
+# ------------------------------
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def should_retry(method: str, status_code: int, attempt: int) -> bool:
+    """
+    429 is always retried (Zoho rejected the call before processing it);
+    5xx only for idempotent methods so a POST never creates a duplicate.
+    """
+    if attempt >= config.ZOHO_MAX_RETRIES:
+        return False
+    if status_code == 429:
+        return True
+    return status_code >= 500 and method.upper() in IDEMPOTENT_METHODS
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Retry-After when Zoho sends one, otherwise full-jitter exponential backoff.
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), config.ZOHO_BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    ceiling = min(config.ZOHO_BACKOFF_MAX_SECONDS, config.ZOHO_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+zoho_rate_limiter = ZohoRateLimiter(
+    rate_per_minute=config.ZOHO_RATE_LIMIT_PER_MINUTE,
+    burst=config.ZOHO_RATE_LIMIT_BURST,
+    bulk_reserve=config.ZOHO_RATE_LIMIT_BULK_RESERVE,
+)
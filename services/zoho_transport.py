@@ -0,0 +1,146 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+import config
+from services.zoho_rate_limiter import backoff_delay, should_retry, zoho_rate_limiter
+
+# ------------------------------
+# Read timeouts per endpoint kind
+# ------------------------------
+ZOHO_READ_TIMEOUTS = {
+    "default": config.ZOHO_TIMEOUT,
+    "pdf": config.ZOHO_PDF_TIMEOUT,
+    "upload": config.ZOHO_UPLOAD_TIMEOUT,
+    "oauth": config.ZOHO_OAUTH_TIMEOUT,
+}
+
+
+def zoho_timeout(kind: str = "default") -> tuple[float, float]:
+    """
+    (connect, read) timeout for a Zoho endpoint kind.
+    """
+    return (
+        config.ZOHO_CONNECT_TIMEOUT,
+        ZOHO_READ_TIMEOUTS.get(kind, config.ZOHO_TIMEOUT),
+    )
+
+
+def zoho_async_timeout(kind: str = "default") -> httpx.Timeout:
+    """
+    httpx equivalent of zoho_timeout().
+    """
+    connect, read = zoho_timeout(kind)
+    return httpx.Timeout(read, connect=connect)
+
+
+# ------------------------------
+# Rate limiting + retry (all Zoho traffic)
+# ------------------------------
+ZOHO_API_HOST = urlsplit(config.ZOHO_API_BASE).hostname
+
+
+def _is_rate_limited(url) -> bool:
+    """
+    Only Books API calls count against the org quota (not OAuth).
+    """
+    return urlsplit(str(url)).hostname == ZOHO_API_HOST
+
+
+class ZohoHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that takes a rate-limiter token before every Books call
+    and retries 429 / idempotent 5xx with jittered backoff.
+    """
+
+    def send(self, request, **kwargs):
+        attempt = 0
+        while True:
+            if _is_rate_limited(request.url):
+                zoho_rate_limiter.acquire()
+
+            response = super().send(request, **kwargs)
+            if not should_retry(request.method, response.status_code, attempt):
+                return response
+
+            delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            print(f"[WARN] Zoho {request.method} {request.url} returned {response.status_code}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+class ZohoAsyncTransport(httpx.AsyncHTTPTransport):
+    """
+    Async counterpart of ZohoHTTPAdapter.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            if _is_rate_limited(request.url):
+                await zoho_rate_limiter.acquire_async()
+
+            response = await super().handle_async_request(request)
+            if not should_retry(request.method, response.status_code, attempt):
+                return response
+
+            delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            print(f"[WARN] Zoho {request.method} {request.url} returned {response.status_code}, retrying in {delay:.1f}s")
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def build_zoho_session(pool_size: int = config.ZOHO_HTTP_POOL_SIZE) -> requests.Session:
+    """
+    requests.Session with a keep-alive connection pool sized for
+    concurrent worker threads (zohoapis + accounts hosts).
+    """
+    session = requests.Session()
+    adapter = ZohoHTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# ------------------------------
+# Shared transport for every Zoho call in the process
+# ------------------------------
+zoho_http = build_zoho_session()
+
+
+# ------------------------------
+# Async transport (async routers)
+# ------------------------------
+class ZohoAsyncClient(httpx.AsyncClient):
+    """
+    httpx.AsyncClient that drops None query params (requests semantics),
+    so services can pass the same params dicts to either transport.
+    """
+
+    async def request(self, method, url, *, params=None, **kwargs):
+        if isinstance(params, dict):
+            params = {k: v for k, v in params.items() if v is not None}
+        return await super().request(method, url, params=params, **kwargs)
+
+
+def build_zoho_async_client(pool_size: int = config.ZOHO_ASYNC_POOL_SIZE) -> ZohoAsyncClient:
+    """
+    Non-blocking keep-alive client for async routers.
+    """
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+    )
+    return ZohoAsyncClient(
+        transport=ZohoAsyncTransport(limits=limits),
+        timeout=zoho_async_timeout(),
+        follow_redirects=True,
+    )
+
+
+zoho_async_http = build_zoho_async_client()
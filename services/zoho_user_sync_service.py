@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from models import Role, User, UserRole
 from security_utils import get_password_hash
 from services.contact_service import ContactService
+from utils.contact_cache import contact_cache
 from utils.email_service import EmailService
 from utils.email_template_loader import render_welcome_email
 
@@ -139,6 +140,7 @@ class ZohoUserSyncService:
 
             if user:
                 user.zoho_erp_id = zoho_id
+                self._forget_cached_contacts(emails)
 
                 if user.erp_sync_status not in ("success", "completed"):
                     user.erp_sync_status = "completed"
@@ -162,6 +164,7 @@ class ZohoUserSyncService:
         user = User(**user_data)
         self.db.add(user)
         self.db.flush()
+        self._forget_cached_contacts(emails)
 
         # ✅ Assign VIEWER role
         viewer_role_id = self._get_viewer_role_id()
@@ -176,6 +179,12 @@ class ZohoUserSyncService:
 
         return user, "created"
 
+    @staticmethod
+    def _forget_cached_contacts(emails: list[str]):
+        # Drop cached (possibly negative) email → contact resolutions
+        for email in emails:
+            contact_cache.invalidate(email)
+
     # -------------------------------------------------
     # Email extraction
     # -------------------------------------------------
@@ -1,12 +1,12 @@
 # utils/comment_meta_util.py
 
 import re
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from services.zoho_contact_service import ZohoContactService
 
 _contact_service = ZohoContactService()
 
-def build_comment_meta(
+async def build_comment_meta(
     *,
     email: Optional[str],
     comment_type_if_found: str = "client",
@@ -29,7 +29,7 @@ def build_comment_meta(
     # -----------------------------
     if email:
         try:
-            contact = _contact_service.get_contact_id_by_email(email)
+            contact = await _contact_service.get_contact_id_by_email(email)
         except Exception:
             contact = None  # fail safe
 
@@ -62,30 +62,35 @@ def build_comment_meta(
     return f"[CUSTOM_META]\n{lines}\n[/CUSTOM_META]\n\n"
 # utils/comment_meta_util.py (same file)
 
+# Compiled once: comment lists run these for every comment
+_META_BLOCK_RE = re.compile(r"\[CUSTOM_META\](.*?)\[/CUSTOM_META\]\s*", re.S)
+_META_LINE_RE = re.compile(r"^[ \t]*([^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t\r]*$", re.M)
 
 
-
-def extract_comment_meta(description: str) -> dict:
+def parse_comment_description(description: str) -> Tuple[Optional[dict], str]:
+    """
+    Single pass over a comment description: (meta, text without meta).
+    meta is None when the comment has no [CUSTOM_META] block
+    (i.e. it was written by Zoho, not by the portal).
+    """
     if not description:
-        return {}
+        return None, ""
 
-    match = re.search(r"\[CUSTOM_META\](.*?)\[/CUSTOM_META\]", description, re.S)
-    if not match:
-        return {}
+    # split() with one group: [text, meta, text, meta, ..., text]
+    parts = _META_BLOCK_RE.split(description)
+    if len(parts) == 1:
+        return None, description.strip()
 
-    lines = match.group(1).strip().split("\n")
-    return {
+    meta = {
         k.strip(): v.strip()
-        for line in lines
-        if "=" in line
-        for k, v in [line.split("=", 1)]
+        for k, v in _META_LINE_RE.findall(parts[1].strip())
     }
+    return meta, "".join(parts[0::2]).strip()
+
+
+def extract_comment_meta(description: str) -> dict:
+    return parse_comment_description(description)[0] or {}
 
 
 def strip_comment_meta(description: str) -> str:
-    return re.sub(
-        r"\[CUSTOM_META\].*?\[/CUSTOM_META\]\s*",
-        "",
-        description or "",
-        flags=re.S
-    ).strip()
+    return parse_comment_description(description)[1]
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import config
+
+
+class ContactCache:
+    """
+    In-process LRU of customer email → Zoho contact.
+
+    - hits live for ttl_seconds
+    - "no contact for this email" is cached for negative_ttl_seconds so
+      unknown emails don't hit Zoho on every request
+    - only the fields callers read (contact_id, contact_name, email) are kept
+    """
+
+    CONTACT_FIELDS = ("contact_id", "contact_name", "email")
+
+    def __init__(self, ttl_seconds: int, negative_ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Optional[dict]]]" = OrderedDict()
+
+    @staticmethod
+    def normalize(email: str) -> str:
+        return (email or "").strip().lower()
+
+    def get(self, email: str) -> Tuple[bool, Optional[dict]]:
+        """
+        (hit, contact). A hit with contact None is a cached miss.
+        """
+        key = self.normalize(email)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if not cached:
+                return False, None
+            if cached[0] <= now:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, cached[1]
+
+    def set(self, email: str, contact: dict) -> dict:
+        """
+        Cache a resolved contact; returns the trimmed copy that was stored.
+        """
+        trimmed = {f: contact.get(f) for f in self.CONTACT_FIELDS}
+        self._store(email, trimmed, self.ttl_seconds)
+        return trimmed
+
+    def set_missing(self, email: str):
+        self._store(email, None, self.negative_ttl_seconds)
+
+    def invalidate(self, email: Optional[str] = None):
+        with self._lock:
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.normalize(email), None)
+
+    def _store(self, email: str, contact: Optional[dict], ttl: int):
+        key = self.normalize(email)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, contact)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+contact_cache = ContactCache(
+    ttl_seconds=config.ZOHO_CONTACT_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=config.ZOHO_CONTACT_NEGATIVE_TTL_SECONDS,
+    max_entries=config.ZOHO_CONTACT_CACHE_MAX_ENTRIES,
+)
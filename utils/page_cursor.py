@@ -0,0 +1,45 @@
+import base64
+import json
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+import config
+
+
+def encode_page_cursor(page: int, per_page: int) -> str:
+    """
+    Opaque cursor for the next page of a Zoho-backed list.
+    """
+    raw = json.dumps({"page": page, "per_page": per_page}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_page_cursor(cursor: Optional[str], per_page: int = config.ZOHO_PAGE_SIZE) -> Tuple[int, int]:
+    """
+    (page, per_page) from a cursor; the first page when cursor is empty.
+    Raises 400 on a malformed cursor.
+    """
+    if not cursor:
+        return 1, per_page
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        page, per_page = int(data["page"]), int(data["per_page"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if page < 1 or not 1 <= per_page <= config.ZOHO_PAGE_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    return page, per_page
+
+
+def next_page_cursor(page_context: dict, page: int, per_page: int) -> Optional[str]:
+    """
+    Cursor for the page after `page`, or None when Zoho has no more pages.
+    """
+    if not (page_context or {}).get("has_more_page"):
+        return None
+    return encode_page_cursor(page + 1, per_page)
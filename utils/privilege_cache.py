@@ -0,0 +1,189 @@
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import config
+from models import Module, RoleModulePrivilege, UserRole
+
+# --------------------------------------------------
+# Privilege columns on RoleModulePrivilege
+# --------------------------------------------------
+PRIVILEGE_ACTIONS = (
+    "can_view",
+    "can_add",
+    "can_edit",
+    "can_delete",
+    "can_search",
+    "can_import",
+    "can_export",
+)
+
+# --------------------------------------------------
+# Resolution outcomes
+# --------------------------------------------------
+ALLOWED = "allowed"
+MODULE_NOT_FOUND = "module_not_found"
+NO_ROLES = "no_roles"
+DENIED = "denied"
+
+
+class PrivilegeCache:
+    """
+    In-process cache of the role → module → action matrix.
+
+    - modules and role_module_privileges are compiled once per TTL
+      (two queries for the whole matrix)
+    - user → role ids is cached per user
+    - resolved (user_id, module path, action) decisions are memoised
+
+    Writes through RoleModulePrivilegeService, UserRoleService and
+    ModuleService call invalidate()/invalidate_user() in this worker.
+    Other workers pick up changes when their TTL runs out, which defaults
+    to the TokenVersionService refresh window (no decision outlives what
+    a revoked token would).
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = 0
+        self._matrix_loaded_at = 0.0
+        self._modules: Dict[str, int] = {}
+        self._privileges: Dict[Tuple[int, int], FrozenSet[str]] = {}
+        self._user_roles: Dict[str, Tuple[float, FrozenSet[int]]] = {}
+        self._resolved: Dict[Tuple[str, str, str], Tuple[float, str]] = {}
+
+    @property
+    def version(self) -> int:
+        """Bumped on every invalidation."""
+        return self._version
+
+    # ---------------------------------------------------------
+    # RESOLVE
+    # ---------------------------------------------------------
+    def resolve(
+        self,
+        db: Session,
+        user_id,
+        module_path: str,
+        action: str,
+        role_ids: Optional[List[int]] = None,
+    ) -> str:
+        """
+        Return ALLOWED, MODULE_NOT_FOUND, NO_ROLES or DENIED.
+        role_ids may come from trusted token claims; otherwise they are
+        loaded (and cached) per user. The session is only used on a miss.
+        """
+        key = (str(user_id), module_path, action)
+        now = time.monotonic()
+
+        cached = self._resolved.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        version = self._version
+        modules, privileges = self._ensure_matrix(db, now)
+
+        module_id = modules.get(module_path)
+        if module_id is None:
+            outcome = MODULE_NOT_FOUND
+        else:
+            if role_ids is None:
+                role_ids = self._get_user_roles(db, key[0], now)
+            if not role_ids:
+                outcome = NO_ROLES
+            elif any(
+                action in privileges.get((role_id, module_id), ())
+                for role_id in role_ids
+            ):
+                outcome = ALLOWED
+            else:
+                outcome = DENIED
+
+        with self._lock:
+            # Don't store a decision computed from data invalidated meanwhile
+            if version == self._version:
+                if len(self._resolved) >= self.max_entries:
+                    self._resolved.clear()
+                self._resolved[key] = (now + self.ttl_seconds, outcome)
+
+        return outcome
+
+    def _ensure_matrix(self, db: Session, now: float):
+        """
+        The (modules, privileges) matrix, loaded when expired. A load that
+        raced an invalidate() is used for this call but not stored.
+        """
+        with self._lock:
+            if self._matrix_loaded_at and now - self._matrix_loaded_at < self.ttl_seconds:
+                return self._modules, self._privileges
+            version = self._version
+
+        modules = {
+            m.path: m.id
+            for m in db.query(Module.id, Module.path).all()
+            if m.path
+        }
+
+        privileges = {}
+        for priv in db.query(RoleModulePrivilege).all():
+            privileges[(priv.role_id, priv.module_id)] = frozenset(
+                action for action in PRIVILEGE_ACTIONS if getattr(priv, action)
+            )
+
+        with self._lock:
+            if version == self._version:
+                self._modules = modules
+                self._privileges = privileges
+                self._matrix_loaded_at = now
+
+        return modules, privileges
+
+    def _get_user_roles(self, db: Session, user_id: str, now: float) -> FrozenSet[int]:
+        cached = self._user_roles.get(user_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        version = self._version
+        role_ids = frozenset(
+            r.role_id
+            for r in db.query(UserRole.role_id).filter(UserRole.user_id == user_id).all()
+        )
+
+        with self._lock:
+            # Same guard as resolve(): don't cache roles read before an invalidate
+            if version == self._version:
+                self._user_roles[user_id] = (now + self.ttl_seconds, role_ids)
+
+        return role_ids
+
+    # ---------------------------------------------------------
+    # INVALIDATION
+    # ---------------------------------------------------------
+    def invalidate(self):
+        """Drop everything (privilege or module changes)."""
+        with self._lock:
+            self._version += 1
+            self._matrix_loaded_at = 0.0
+            self._modules = {}
+            self._privileges = {}
+            self._user_roles.clear()
+            self._resolved.clear()
+
+    def invalidate_user(self, user_id):
+        """Drop cached roles and decisions for a single user."""
+        user_id = str(user_id)
+        with self._lock:
+            self._version += 1
+            self._user_roles.pop(user_id, None)
+            for key in [k for k in self._resolved if k[0] == user_id]:
+                self._resolved.pop(key, None)
+
+
+privilege_cache = PrivilegeCache(
+    ttl_seconds=config.PRIVILEGE_CACHE_TTL_SECONDS,
+    max_entries=config.PRIVILEGE_CACHE_MAX_ENTRIES,
+)